@@ -0,0 +1,132 @@
+"""Fixtures of the benchmark suite.
+
+Benchmarks run against moto's in-process S3 and KMS. Object sizes range from 1 KiB to 1 GiB; sizes above
+``--max-object-size`` (default 16 MiB) are skipped so that a default run stays quick.
+"""
+import re
+import sys
+import tracemalloc
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import boto3
+import pytest
+from moto import mock_kms, mock_s3
+
+from s3_encryption_sdk.materials_providers import KmsMaterialsProvider
+
+KIB = 1024
+MIB = 1024 * KIB
+GIB = 1024 * MIB
+
+OBJECT_SIZES = (KIB, 64 * KIB, MIB, 16 * MIB, 256 * MIB, GIB)
+
+# Operations on objects of at least this size are timed over a fixed number of rounds instead of calibrated ones.
+LARGE_OBJECT_SIZE = 64 * MIB
+LARGE_OBJECT_ROUNDS = 3
+
+_SIZE_PATTERN = re.compile(r"^(\d+)\s*([KMG]i?B?)?$", re.IGNORECASE)
+_UNITS = {"": 1, "K": KIB, "M": MIB, "G": GIB}
+
+
+def _parse_size(value: str) -> int:
+    match = _SIZE_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError("Invalid size %r" % value)
+    return int(match.group(1)) * _UNITS[(match.group(2) or "")[:1].upper()]
+
+
+def _size_id(size: int) -> str:
+    for unit, factor in (("GiB", GIB), ("MiB", MIB), ("KiB", KIB)):
+        if size >= factor:
+            return "%d%s" % (size // factor, unit)
+    return "%dB" % size
+
+
+def _max_rss() -> Optional[int]:
+    """Peak resident set size of the process in bytes, or None where it is not available."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return max_rss if sys.platform == "darwin" else max_rss * KIB
+
+
+def _peak_allocated(operation) -> int:
+    """Peak of the memory allocated by Python while running an operation once, in bytes."""
+    tracemalloc.start()
+    try:
+        operation()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--max-object-size",
+        default="16MiB",
+        help="Largest object size to benchmark, e.g. 256MiB or 1GiB (default: 16MiB)",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "object_size" in metafunc.fixturenames:
+        max_object_size = _parse_size(metafunc.config.getoption("--max-object-size"))
+        sizes = [size for size in OBJECT_SIZES if size <= max_object_size]
+        metafunc.parametrize("object_size", sizes, ids=[_size_id(size) for size in sizes])
+
+
+@pytest.fixture
+def measure(benchmark):
+    """Benchmark an operation that processes ``size`` bytes, recording throughput and memory use.
+
+    ``peak_allocated_mib`` is the peak of the memory allocated during one extra, untimed run of the operation;
+    ``peak_rss_mib`` is the high-water mark of the whole process so far, where the platform reports it.
+    """
+
+    def run(operation, size: int = 0):
+        if size >= LARGE_OBJECT_SIZE:
+            result = benchmark.pedantic(operation, rounds=LARGE_OBJECT_ROUNDS, iterations=1)
+        else:
+            result = benchmark(operation)
+
+        # Without statistics, e.g. with --benchmark-disable, the operation only ran once as a test.
+        if benchmark.stats is None:
+            return result
+
+        benchmark.extra_info["peak_allocated_mib"] = round(_peak_allocated(operation) / MIB, 1)
+        max_rss = _max_rss()
+        if max_rss is not None:
+            benchmark.extra_info["peak_rss_mib"] = round(max_rss / MIB, 1)
+        if size:
+            benchmark.extra_info["object_size"] = size
+            benchmark.extra_info["throughput_mib_s"] = round(size / benchmark.stats.stats.mean / MIB, 1)
+
+        return result
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def kms():
+    with mock_kms():
+        yield boto3.client("kms", region_name="us-east-1")
+
+
+@pytest.fixture(scope="session")
+def materials_provider(kms):
+    key = kms.create_key(KeyUsage="ENCRYPT_DECRYPT")
+    return KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms)
+
+
+@pytest.fixture(scope="session")
+def s3():
+    with mock_s3():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="benchmarks")
+        yield s3
@@ -0,0 +1,17 @@
+import os
+
+from s3_encryption_sdk import EncryptedClient
+
+
+def test_put_object(measure, object_size, s3, materials_provider):
+    crypto_s3 = EncryptedClient(client=s3, materials_provider=materials_provider)
+    body = os.urandom(object_size)
+
+    measure(lambda: crypto_s3.put_object(Bucket="benchmarks", Key="put-object", Body=body), object_size)
+
+
+def test_get_object(measure, object_size, s3, materials_provider):
+    crypto_s3 = EncryptedClient(client=s3, materials_provider=materials_provider)
+    crypto_s3.put_object(Bucket="benchmarks", Key="get-object", Body=os.urandom(object_size))
+
+    measure(lambda: crypto_s3.get_object(Bucket="benchmarks", Key="get-object")["Body"].read(), object_size)
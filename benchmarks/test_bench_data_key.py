@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher
+
+from s3_encryption_sdk.keys import DataKey, DataKeyAlgorithms
+
+
+def _data_key():
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+    return DataKey(algorithm=algorithm, key=algorithm.generate_data_key(), iv=algorithm.generate_iv())
+
+
+def test_encrypt(measure, object_size):
+    data_key = _data_key()
+    plaintext = os.urandom(object_size)
+
+    measure(lambda: data_key.encrypt(plaintext), object_size)
+
+
+def test_decrypt(measure, object_size):
+    data_key = _data_key()
+    ciphertext = data_key.encrypt(os.urandom(object_size))
+
+    measure(lambda: data_key.decrypt(ciphertext), object_size)
+
+
+def _cipher_per_call(data_key: DataKey, plaintext: bytes) -> bytes:
+    """Encrypt by building a ``Cipher`` per call, as ``DataKey`` did before it reused a prepared AEAD."""
+    encryptor = Cipher(
+        algorithm=data_key.algorithm.algorithm(data_key.key),
+        mode=data_key.algorithm.mode(data_key.iv),
+        backend=default_backend(),
+    ).encryptor()
+    return encryptor.update(plaintext) + encryptor.finalize() + encryptor.tag
+
+
+@pytest.mark.parametrize("size", [64, 1024, 16 * 1024, 256 * 1024], ids=["64B", "1KiB", "16KiB", "256KiB"])
+@pytest.mark.parametrize("mode", ["cipher-per-call", "prepared-aead"])
+def test_one_shot_encrypt(benchmark, measure, mode, size):
+    benchmark.group = "one-shot encrypt %d bytes" % size
+    data_key = _data_key()
+    plaintext = os.urandom(size)
+
+    if mode == "cipher-per-call":
+        measure(lambda: _cipher_per_call(data_key, plaintext), size)
+    else:
+        measure(lambda: data_key.encrypt(plaintext), size)
@@ -0,0 +1,37 @@
+import secrets
+
+import pytest
+
+from s3_encryption_sdk.keys import AesWrappingKey
+from s3_encryption_sdk.materials_providers import (
+    EncryptionContext,
+    HierarchicalMaterialsProvider,
+    WrappedMaterialsProvider,
+)
+
+
+@pytest.fixture(params=["wrapped", "kms", "hierarchical"])
+def provider(request):
+    if request.param == "wrapped":
+        return WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+    materials_provider = request.getfixturevalue("materials_provider")
+    if request.param == "hierarchical":
+        return HierarchicalMaterialsProvider(key_id=materials_provider.key_id, client=request.getfixturevalue("kms"))
+    return materials_provider
+
+
+def test_encryption_materials(measure, provider):
+    encryption_context = EncryptionContext(bucket_name="benchmarks", object_key="object")
+
+    measure(lambda: provider.encryption_materials(encryption_context))
+
+
+def test_decryption_materials(measure, provider):
+    materials = provider.encryption_materials(EncryptionContext(bucket_name="benchmarks", object_key="object"))
+    encryption_context = EncryptionContext(
+        bucket_name="benchmarks",
+        object_key="object",
+        s3_metadata=materials.metadata.generate(),
+    )
+
+    measure(lambda: provider.decryption_materials(encryption_context))
@@ -0,0 +1,34 @@
+import secrets
+
+from s3_encryption_sdk.keys import DataKeyAlgorithms
+from s3_encryption_sdk.materials import Metadata
+
+
+def _metadata():
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+    return Metadata(
+        wrapped_data_key=secrets.token_bytes(184),
+        iv=algorithm.generate_iv(),
+        material_description={"kms_cmk_id": "arn:aws:kms:us-east-1:123456789012:key/benchmark"},
+        key_wrapping_algorithm="kms",
+        content_encryption_algorithm=algorithm.name,
+        tag_length=algorithm.tag_len * 8,
+        unencrypted_content_length=4711,
+    )
+
+
+def test_generate(measure):
+    measure(lambda: _metadata().generate())
+
+
+def test_generate_with_iv(measure):
+    metadata = _metadata()
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+
+    measure(lambda: metadata.with_iv(algorithm.generate_iv(), 4711).generate())
+
+
+def test_from_s3_metadata(measure):
+    s3_metadata = _metadata().generate()
+
+    measure(lambda: Metadata.from_s3_metatdata(s3_metadata))
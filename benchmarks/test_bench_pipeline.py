@@ -0,0 +1,58 @@
+"""Throughput of encrypting many objects in single-thread, thread-pool and process-pool mode.
+
+Objects are encrypted through ``EncryptionPipeline`` by as many caller threads as there are workers, like
+``EncryptedBucket.put_objects`` does, but without S3 requests so that only the CPU-bound work is measured.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from s3_encryption_sdk.keys import DataKey, DataKeyAlgorithms
+from s3_encryption_sdk.pipeline import EncryptionPipeline, encrypt_body
+
+OBJECT_SIZE = 1024 * 1024
+OBJECT_COUNT = 32
+WORKERS = os.cpu_count() or 1
+
+
+def _data_keys(count: int):
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+    return [
+        DataKey(algorithm=algorithm, key=algorithm.generate_data_key(), iv=algorithm.generate_iv())
+        for _ in range(count)
+    ]
+
+
+@pytest.fixture(scope="module", params=["single-thread", "thread-pool", "process-pool"])
+def encrypt(request):
+    if request.param == "single-thread":
+        yield lambda data_key, body: encrypt_body(data_key, body, base64_encode=True), 1
+        return
+
+    if request.param == "thread-pool":
+        executor = ThreadPoolExecutor(max_workers=WORKERS)
+    else:
+        # Forking a process that runs threads, e.g. moto's, can deadlock the child.
+        executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+    with executor:
+        pipeline = EncryptionPipeline(executor, offload_threshold=0)
+        # Start the workers before measuring.
+        pipeline.encrypt(_data_keys(1)[0], bytes(OBJECT_SIZE)).close()
+        yield lambda data_key, body: pipeline.encrypt(data_key, body, base64_encode=True).close(), WORKERS
+
+
+def test_encrypt_objects(benchmark, measure, encrypt):
+    benchmark.group = "pipeline"
+    encrypt_object, callers = encrypt
+    bodies = [os.urandom(OBJECT_SIZE)] * OBJECT_COUNT
+    data_keys = _data_keys(OBJECT_COUNT)
+
+    def run():
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            for _ in executor.map(encrypt_object, data_keys, bodies):
+                pass
+
+    measure(run, OBJECT_SIZE * OBJECT_COUNT)
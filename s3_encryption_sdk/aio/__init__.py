@@ -0,0 +1,12 @@
+"""Asyncio support for use with aiobotocore clients."""
+from .client import AsyncEncryptedClient
+from .materials_providers import AsyncKmsMaterialsProvider, AsyncMaterialsProvider, ThreadedMaterialsProvider
+from .streams import AsyncDecryptionStreamingBody
+
+__all__ = (
+    "AsyncEncryptedClient",
+    "AsyncMaterialsProvider",
+    "AsyncKmsMaterialsProvider",
+    "ThreadedMaterialsProvider",
+    "AsyncDecryptionStreamingBody",
+)
@@ -0,0 +1,198 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from s3transfer.utils import ChunksizeAdjuster
+
+from ..materials_providers import EncryptionContext
+from ..streams import (
+    BODY_ENCODING_METADATA_KEY,
+    DEFAULT_CHUNK_SIZE,
+    EncryptionStreamingBody,
+    body_encoding,
+    is_base64_encoded,
+    plaintext_length,
+)
+from ..transfer import (
+    ABORT_MULTIPART_ARGS,
+    COMPLETE_MULTIPART_ARGS,
+    CREATE_MULTIPART_UPLOAD_ARGS,
+    UPLOAD_PART_ARGS,
+)
+from .materials_providers import AsyncMaterialsProvider
+from .streams import AsyncDecryptionStreamingBody
+
+
+def _select_args(kwargs: Dict, allowed: Tuple[str, ...]) -> Dict:
+    return {name: value for name, value in kwargs.items() if name in allowed}
+
+
+class AsyncEncryptedClient(object):
+    """Asynchronous counterpart of the ``EncryptedClient`` for aiobotocore S3 clients.
+
+    Encryption and decryption run on a thread pool, so that many transfers can be in flight on one event loop.
+    Requires Python 3.7 or later.
+    """
+
+    def __init__(
+        self,
+        client,
+        materials_provider: AsyncMaterialsProvider,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        base64_encode: bool = False,
+        executor: Optional[Executor] = None,
+        part_size: int = 8 * 1024 ** 2,
+    ) -> None:
+        """
+        :param client: aiobotocore S3 client
+        :param materials_provider: Asynchronous materials provider
+        :param int chunk_size: Size of the chunks bodies are encrypted and decrypted in
+        :param bool base64_encode: Store bodies in the legacy base64 format
+        :param executor: Executor for the cryptographic work; defaults to the event loop's default executor
+        :param int part_size: Size of the parts bodies are encrypted and uploaded in; larger bodies are uploaded with
+            a multipart upload
+        """
+        self._client = client
+        self._materials_provider = materials_provider
+        self._chunk_size = chunk_size
+        self._base64_encode = base64_encode
+        self._executor = executor
+        self._part_size = part_size
+
+    async def put_object(self, Bucket: str, Key: str, Body, **kwargs):
+        """Encrypt and upload a body.
+
+        The body is encrypted on the thread pool one part of ``part_size`` bytes at a time, while the previous part is
+        uploaded, so at most two parts are held in memory. A body that fits into one part is uploaded with a single
+        request, a larger one with a multipart upload. A multipart upload of a body of unknown length, e.g. an
+        iterator, carries no ``x-amz-unencrypted-content-length``, as the metadata is fixed when the upload is created.
+        """
+        unencrypted_content_length = plaintext_length(Body)
+
+        encryption_context = EncryptionContext(
+            bucket_name=Bucket,
+            object_key=Key,
+            unencrypted_content_length=unencrypted_content_length,
+        )
+
+        materials = await self._materials_provider.encryption_materials(encryption_context)
+
+        metadata = kwargs.pop("Metadata", {})
+
+        metadata.update(**materials.metadata.generate())
+
+        metadata[BODY_ENCODING_METADATA_KEY] = body_encoding(self._base64_encode)
+
+        body = EncryptionStreamingBody(
+            body=Body,
+            data_key=materials.data_key,
+            chunk_size=self._chunk_size,
+            base64_encode=self._base64_encode,
+        )
+
+        size = len(body) if unencrypted_content_length is not None else None
+        part_size = ChunksizeAdjuster().adjust_chunksize(self._part_size, size)
+        loop = asyncio.get_running_loop()
+
+        def read_part() -> Awaitable[bytes]:
+            return loop.run_in_executor(self._executor, body.read, part_size)
+
+        part = await read_part()
+
+        if len(part) < part_size:
+            if unencrypted_content_length is None:
+                metadata["x-amz-unencrypted-content-length"] = str(body.plaintext_bytes)
+
+            return await self._client.put_object(Bucket=Bucket, Key=Key, Body=part, Metadata=metadata, **kwargs)
+
+        return await self._put_parts(Bucket, Key, part, read_part, metadata, kwargs)
+
+    async def _put_parts(
+        self,
+        Bucket: str,
+        Key: str,
+        part: bytes,
+        read_part: Callable[[], Awaitable[bytes]],
+        metadata: Dict[str, str],
+        kwargs: Dict,
+    ):
+        """Upload an encrypted body with a multipart upload, encrypting each part while the previous one uploads.
+
+        The arguments of the put are split up like those of a managed upload: SSE-C keys, for example, go on every
+        request, object attributes only on the ``CreateMultipartUpload`` request.
+        """
+        upload = await self._client.create_multipart_upload(
+            Bucket=Bucket,
+            Key=Key,
+            Metadata=metadata,
+            **_select_args(kwargs, CREATE_MULTIPART_UPLOAD_ARGS),
+        )
+        upload_id = upload["UploadId"]
+        upload_part_args = _select_args(kwargs, UPLOAD_PART_ARGS)
+        parts = []
+
+        try:
+            while part:
+                next_part = asyncio.ensure_future(read_part())
+                try:
+                    response = await self._client.upload_part(
+                        Bucket=Bucket,
+                        Key=Key,
+                        UploadId=upload_id,
+                        PartNumber=len(parts) + 1,
+                        Body=part,
+                        **upload_part_args,
+                    )
+                finally:
+                    part = await next_part
+                parts.append({"ETag": response["ETag"], "PartNumber": len(parts) + 1})
+
+            return await self._client.complete_multipart_upload(
+                Bucket=Bucket,
+                Key=Key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+                **_select_args(kwargs, COMPLETE_MULTIPART_ARGS),
+            )
+        except BaseException:
+            await self._client.abort_multipart_upload(
+                Bucket=Bucket,
+                Key=Key,
+                UploadId=upload_id,
+                **_select_args(kwargs, ABORT_MULTIPART_ARGS),
+            )
+            raise
+
+    async def get_object(self, Bucket: str, Key: str, **kwargs):
+        """Download an object; its body decrypts as it is read."""
+        if "Range" in kwargs:
+            raise ValueError("Ranged gets are not supported by the AsyncEncryptedClient")
+
+        obj = await self._client.get_object(Bucket=Bucket, Key=Key, **kwargs)
+
+        encryption_context = EncryptionContext(
+            bucket_name=Bucket,
+            object_key=Key,
+            s3_metadata=obj["Metadata"],
+        )
+
+        materials = await self._materials_provider.decryption_materials(encryption_context)
+
+        obj["Body"] = AsyncDecryptionStreamingBody(
+            streaming_body=obj["Body"],
+            data_key=materials.data_key,
+            base64_encoded=is_base64_encoded(obj["Metadata"]),
+            chunk_size=self._chunk_size,
+            executor=self._executor,
+        )
+
+        return obj
+
+    def __getattr__(self, name: str):
+        """Catch any method/attribute lookups that are not defined in this class and try
+        to find them on the provided bridge object.
+        :param str name: Attribute name
+        :returns: Result of asking the provided client object for that attribute name
+        :raises AttributeError: if attribute is not found on provided bridge object
+        """
+        return getattr(self._client, name)
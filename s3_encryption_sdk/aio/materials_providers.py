@@ -0,0 +1,114 @@
+"""Asynchronous cryptographic materials providers."""
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Optional
+
+import botocore
+
+from ..exceptions import MaterialsProviderError
+from ..keys import DataKeyAlgorithms
+from ..materials import EncryptionMaterials
+from ..materials_providers import EncryptionContext, MaterialsProvider
+from ..materials_providers.kms import KmsMaterials
+
+
+class AsyncMaterialsProvider(ABC):
+    """Base class for all asynchronous cryptographic materials providers."""
+
+    @abstractmethod
+    async def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+
+    @abstractmethod
+    async def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+
+
+class ThreadedMaterialsProvider(AsyncMaterialsProvider):
+    """Asynchronous adapter that runs a synchronous materials provider on a thread pool.
+
+    Suited to providers that do local work only, such as the ``WrappedMaterialsProvider``, or that are mostly served
+    from a cache, such as the ``CachingMaterialsProvider``.
+    """
+
+    def __init__(self, materials_provider: MaterialsProvider, executor: Optional[Executor] = None) -> None:
+        """
+        :param materials_provider: Synchronous provider to adapt
+        :param executor: Executor to run the provider on; defaults to the event loop's default executor
+        """
+        self._materials_provider = materials_provider
+        self._executor = executor
+
+    async def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            self._materials_provider.decryption_materials,
+            encryption_context,
+        )
+
+    async def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            self._materials_provider.encryption_materials,
+            encryption_context,
+        )
+
+
+class AsyncKmsMaterialsProvider(AsyncMaterialsProvider):
+    """Asynchronous cryptographic materials provider for use with the AWS Key Management Service (KMS).
+
+    Takes an aiobotocore KMS client and produces the same materials as the ``KmsMaterialsProvider``.
+    """
+
+    def __init__(
+        self,
+        key_id: str,
+        client,
+        grant_tokens=None,
+        algorithm: DataKeyAlgorithms = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16,
+        accept_shared_data_keys: bool = False,
+    ) -> None:
+        """
+        :param key_id: Id or ARN of the KMS key that wraps the data keys
+        :param client: aiobotocore KMS client
+        :param grant_tokens: Grant tokens to send with every request
+        :param algorithm: Algorithm suite of new data keys
+        :param bool accept_shared_data_keys: Decrypt objects whose data key is shared by several objects of the
+            bucket, as written through a CachingMaterialsProvider
+        """
+        self._client = client
+        self._materials = KmsMaterials(
+            key_id=key_id,
+            grant_tokens=grant_tokens,
+            algorithm=algorithm,
+            accept_shared_data_keys=accept_shared_data_keys,
+        )
+
+    async def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+        kms_params = self._materials.decrypt_params(encryption_context)
+
+        try:
+            response = await self._client.decrypt(**kms_params)
+            initial_material = response["Plaintext"]
+        except (botocore.exceptions.ClientError, KeyError) as exc:
+            message = "Failed to unwrap AWS KMS protected materials"
+            raise MaterialsProviderError(message) from exc
+
+        return self._materials.decryption_materials(encryption_context, initial_material)
+
+    async def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+        kms_params = self._materials.generate_data_key_params(encryption_context)
+
+        try:
+            response = await self._client.generate_data_key(**kms_params)
+            initial_material, encrypted_initial_material = response["Plaintext"], response["CiphertextBlob"]
+        except (botocore.exceptions.ClientError, KeyError) as exc:
+            message = "Failed to generate materials using AWS KMS"
+            raise MaterialsProviderError(message) from exc
+
+        return self._materials.encryption_materials(encryption_context, initial_material, encrypted_initial_material)
@@ -0,0 +1,85 @@
+"""Asynchronous streaming bodies for encrypted S3 objects."""
+import asyncio
+from concurrent.futures import Executor
+from typing import AsyncIterator, Optional
+
+from ..keys import DataKey
+from ..streams import DEFAULT_CHUNK_SIZE, BodyDecryptor, _ReadBuffer
+
+
+class AsyncDecryptionStreamingBody(object):
+    """Asynchronous streaming body that decrypts an encrypted S3 object body as it is read.
+
+    Decryption runs on a thread pool so that it does not block the event loop. As with the synchronous
+    ``DecryptionStreamingBodyWrapper``, the authentication tag is checked once the body is exhausted.
+    """
+
+    def __init__(
+        self,
+        streaming_body,
+        data_key: DataKey,
+        base64_encoded: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._streaming_body = streaming_body
+        self._body_decryptor = BodyDecryptor(data_key=data_key, base64_encoded=base64_encoded)
+        self._tag_len = data_key.algorithm.tag_len
+        self._chunk_size = chunk_size
+        self._executor = executor
+        self._buffer = _ReadBuffer()
+        self._finished = False
+
+    async def _decrypt_next_chunk(self, amt: int) -> None:
+        raw = await self._streaming_body.read(amt)
+        loop = asyncio.get_running_loop()
+
+        if raw:
+            self._buffer.append(await loop.run_in_executor(self._executor, self._body_decryptor.update, raw))
+        else:
+            self._buffer.append(await loop.run_in_executor(self._executor, self._body_decryptor.finalize))
+            self._finished = True
+
+    async def read(self, amt: Optional[int] = None) -> bytes:
+        """Read at most amt bytes of plaintext, or everything that is left if amt is omitted."""
+        while not self._finished and (amt is None or amt < 0 or len(self._buffer) < amt):
+            await self._decrypt_next_chunk(self._chunk_size if amt is None or amt < 0 else max(amt, self._tag_len))
+
+        return self._buffer.read(amt)
+
+    async def iter_chunks(self, chunk_size: int = 1024) -> AsyncIterator[bytes]:
+        """Return an asynchronous iterator to yield chunks of chunk_size bytes of plaintext."""
+        while True:
+            chunk = await self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def iter_lines(self, chunk_size: int = 1024, keepends: bool = False) -> AsyncIterator[bytes]:
+        """Return an asynchronous iterator to yield lines of plaintext."""
+        pending = b""
+        async for chunk in self.iter_chunks(chunk_size):
+            lines = (pending + chunk).splitlines(True)
+            for line in lines[:-1]:
+                yield line.splitlines(keepends)[0]
+            pending = lines[-1]
+        if pending:
+            yield pending.splitlines(keepends)[0]
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self.iter_chunks()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._streaming_body.close()
+
+    def __getattr__(self, name: str):
+        """Catch any method/attribute lookups that are not defined in this class and try
+        to find them on the provided bridge object.
+        :param str name: Attribute name
+        :returns: Result of asking the provided streaming object for that attribute name
+        :raises AttributeError: if attribute is not found on provided bridge object
+        """
+        return getattr(self._streaming_body, name)
@@ -0,0 +1,157 @@
+"""Concurrent execution of batch operations on encrypted objects."""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class BatchResult(object):
+    """Outcome of one item of a batch operation."""
+
+    def __init__(self, key: str, response: Optional[Any] = None, error: Optional[BaseException] = None) -> None:
+        self._key = key
+        self._response = response
+        self._error = error
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def response(self) -> Optional[Any]:
+        """Response of the operation, or None if it failed."""
+        return self._response
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """Exception raised by the operation, or None if it succeeded."""
+        return self._error
+
+    @property
+    def ok(self) -> bool:
+        return self._error is None
+
+    def __repr__(self) -> str:
+        return "BatchResult(key=%r, ok=%r)" % (self._key, self.ok)
+
+
+def _result(key: str, future: Future) -> BatchResult:
+    error = future.exception()
+    if error is not None:
+        return BatchResult(key, error=error)
+    return BatchResult(key, response=future.result())
+
+
+class BatchResults(object):
+    """Results of a batch operation that runs in the background.
+
+    The operation starts when the batch is created and runs to completion whether or not the results are consumed.
+    Iterating yields the results as they become available, in the order of the items or as they complete; ``wait``
+    blocks until the batch is done. Results are kept, so a batch can be iterated more than once.
+    """
+
+    def __init__(
+        self,
+        operation: Callable[[Any], Any],
+        items: Iterable[Any],
+        key: Callable[[Any], str],
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+    ) -> None:
+        if max_workers is None:
+            max_workers = DEFAULT_MAX_WORKERS
+
+        self._ordered = ordered
+        self._submitted: List[Tuple[str, Future]] = []
+        self._completed: List[BatchResult] = []
+        self._finished = False
+        self._error: Optional[BaseException] = None
+        self._condition = threading.Condition()
+        # At most twice as many items as there are workers are in flight, so large batches are not read up front.
+        self._slots = threading.BoundedSemaphore(2 * max_workers)
+
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(operation, items, key, max_workers),
+            name="s3-encryption-batch",
+        )
+        self._thread.start()
+
+    def _run(
+        self,
+        operation: Callable[[Any], Any],
+        items: Iterable[Any],
+        key: Callable[[Any], str],
+        max_workers: int,
+    ) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for item in items:
+                    self._slots.acquire()
+                    item_key = key(item)
+                    future = executor.submit(operation, item)
+                    with self._condition:
+                        self._submitted.append((item_key, future))
+                        self._condition.notify_all()
+                    future.add_done_callback(lambda done, item_key=item_key: self._done(item_key, done))
+        except BaseException as exc:  # pylint: disable=broad-except
+            self._error = exc
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    def _done(self, key: str, future: Future) -> None:
+        with self._condition:
+            self._completed.append(_result(key, future))
+            self._condition.notify_all()
+        self._slots.release()
+
+    def __iter__(self) -> Iterator[BatchResult]:
+        index = 0
+        while True:
+            with self._condition:
+                results = self._submitted if self._ordered else self._completed
+                self._condition.wait_for(
+                    lambda: index < len(results) or (self._finished and len(self._completed) == len(self._submitted))
+                )
+                if index == len(results):
+                    break
+                entry = results[index]
+            index += 1
+            yield _result(*entry) if self._ordered else entry
+
+        if self._error is not None:
+            raise self._error
+
+    def wait(self) -> List[BatchResult]:
+        """Wait until all items were processed.
+
+        :returns: One result per item
+        :raises: The error raised while reading the items, if any
+        """
+        self._thread.join()
+        return list(self)
+
+
+def run_batch(
+    operation: Callable[[Any], Any],
+    items: Iterable[Any],
+    key: Callable[[Any], str],
+    max_workers: Optional[int] = None,
+    ordered: bool = True,
+) -> BatchResults:
+    """Run an operation for every item on a bounded thread pool.
+
+    The batch starts right away; see ``BatchResults``.
+
+    :param operation: Operation to run for every item
+    :param items: Items to process
+    :param key: Returns the object key of an item
+    :param int max_workers: Number of worker threads
+    :param bool ordered: Yield results in the order of the items rather than as they complete
+    :returns: One result per item; failures are reported on the result instead of being raised
+    """
+    return BatchResults(operation, items, key=key, max_workers=max_workers, ordered=ordered)
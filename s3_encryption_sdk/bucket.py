@@ -1,7 +1,16 @@
+import io
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
 from boto3.resources.base import ServiceResource
+from boto3.s3.transfer import TransferConfig
 
+from .batch import BatchResult, BatchResults, run_batch
+from .instruction_file import INSTRUCTION_FILE_SUFFIX, InstructionFiles
+from .instrumentation import Instrumentation
 from .materials_providers import MaterialsProvider
 from .object import EncryptedObject
+from .streams import DEFAULT_CHUNK_SIZE
 
 
 class EncryptedBucket(object):
@@ -9,14 +18,29 @@ class EncryptedBucket(object):
         self,
         bucket: ServiceResource,
         materials_provider: MaterialsProvider,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        base64_encode: bool = False,
+        executor: Optional[Executor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        instruction_files: Optional[InstructionFiles] = None,
     ) -> None:
         self._bucket = bucket
         self._materials_provider = materials_provider
+        self._chunk_size = chunk_size
+        self._base64_encode = base64_encode
+        self._executor = executor
+        self._instrumentation = instrumentation
+        self._instruction_files = instruction_files
 
     def put_object(self, Key: str, **kwargs):
         obj = EncryptedObject(
             materials_provider=self._materials_provider,
             obj=self._bucket.Object(Key),
+            chunk_size=self._chunk_size,
+            base64_encode=self._base64_encode,
+            executor=self._executor,
+            instrumentation=self._instrumentation,
+            instruction_files=self._instruction_files,
         )
         return obj.put(**kwargs)
 
@@ -24,6 +48,222 @@ class EncryptedBucket(object):
         return EncryptedObject(
             materials_provider=self._materials_provider,
             obj=self._bucket.Object(key),
+            chunk_size=self._chunk_size,
+            base64_encode=self._base64_encode,
+            executor=self._executor,
+            instrumentation=self._instrumentation,
+            instruction_files=self._instruction_files,
+        )
+
+    def upload_fileobj(
+        self,
+        Fileobj,
+        Key: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ):
+        return self.Object(Key).upload_fileobj(
+            Fileobj,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def upload_file(
+        self,
+        Filename: str,
+        Key: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ):
+        return self.Object(Key).upload_file(
+            Filename,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def download_file(
+        self,
+        Key: str,
+        Filename: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ) -> None:
+        return self.Object(Key).download_file(
+            Filename,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def download_fileobj(
+        self,
+        Key: str,
+        Fileobj,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ) -> None:
+        return self.Object(Key).download_fileobj(
+            Fileobj,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def put_objects(
+        self,
+        items: Iterable[Dict],
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+    ) -> BatchResults:
+        """Encrypt and upload many objects concurrently.
+
+        Materials, encryption and S3 requests of the items run on a bounded thread pool. Wrap the materials provider
+        in a ``CachingMaterialsProvider`` to let the batch share data keys instead of unwrapping one per object. With
+        a ``ProcessPoolExecutor`` passed as the bucket's ``executor``, in-memory bodies are encrypted on its processes.
+
+        :param items: ``put_object`` arguments per object, each including the ``Key``
+        :param int max_workers: Number of worker threads
+        :param bool ordered: Yield results in the order of the items rather than as they complete
+        :returns: ``BatchResults`` with one ``BatchResult`` per item, holding the response or the error of that item;
+            the uploads start right away, whether or not the results are consumed
+        """
+
+        def put(item: Dict):
+            item = dict(item)
+            return self.put_object(item.pop("Key"), **item)
+
+        return run_batch(put, items, key=lambda item: item["Key"], max_workers=max_workers, ordered=ordered)
+
+    def get_objects(
+        self,
+        keys: Iterable[Union[str, Dict]],
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+    ) -> BatchResults:
+        """Download and decrypt many objects concurrently.
+
+        Bodies are read and authenticated by the workers; the ``Body`` of each response is a file-like object over
+        the plaintext.
+
+        :param keys: Object keys, or ``get`` arguments per object including the ``Key``
+        :param int max_workers: Number of worker threads
+        :param bool ordered: Yield results in the order of the keys rather than as they complete
+        :returns: ``BatchResults`` with one ``BatchResult`` per key, holding the response or the error of that key;
+            the downloads start right away
+        """
+
+        def get(item: Dict):
+            item = dict(item)
+            response = self.Object(item.pop("Key")).get(**item)
+            response["Body"] = io.BytesIO(response["Body"].read())
+            return response
+
+        items = ({"Key": key} if isinstance(key, str) else key for key in keys)
+
+        return run_batch(get, items, key=lambda item: item["Key"], max_workers=max_workers, ordered=ordered)
+
+    def prefetch_materials(self, keys: Iterable[str], max_workers: Optional[int] = None) -> List[BatchResult]:
+        """Resolve the decryption materials of many objects ahead of their gets.
+
+        Only the metadata of the objects is requested, see ``EncryptedObject.prefetch_materials``. Wrap the materials
+        provider in a ``CachingMaterialsProvider`` to keep the data keys, so later gets skip the KMS requests.
+
+        :param keys: Object keys
+        :param int max_workers: Number of worker threads
+        :returns: One ``BatchResult`` per key, holding the error of that key if it failed
+        """
+
+        def prefetch(key: str):
+            return self.Object(key).prefetch_materials()
+
+        return run_batch(prefetch, keys, key=lambda key: key, max_workers=max_workers).wait()
+
+    def copy_prefix(
+        self,
+        Prefix: str,
+        DestinationPrefix: str,
+        SourceBucket: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+        Config: Optional[TransferConfig] = None,
+    ) -> BatchResults:
+        """Copy all encrypted objects under a prefix to another prefix of this bucket server-side.
+
+        The ciphertext is copied by S3 and only the data keys are wrapped again for the new keys, see
+        ``EncryptedObject.copy_from``; the objects are copied concurrently.
+
+        :param str Prefix: Key prefix of the objects to copy
+        :param str DestinationPrefix: Prefix that replaces ``Prefix`` in the keys of the copies
+        :param str SourceBucket: Bucket to copy from; defaults to this bucket
+        :param int max_workers: Number of worker threads
+        :param bool ordered: Yield results in the order the objects are listed rather than as they complete
+        :param Config: Transfer configuration of multipart copies
+        :returns: ``BatchResults`` with one ``BatchResult`` per source key, holding the response or the error of that
+            object; the copies start right away
+        """
+        source_bucket = SourceBucket if SourceBucket is not None else self._bucket.name
+
+        def copy(key: str):
+            copy_source = {"Bucket": source_bucket, "Key": key}
+            return self.Object(DestinationPrefix + key[len(Prefix) :]).copy_from(CopySource=copy_source, Config=Config)
+
+        return run_batch(
+            copy,
+            self._encrypted_keys(source_bucket, Prefix),
+            key=lambda key: key,
+            max_workers=max_workers,
+            ordered=ordered,
+        )
+
+    def rewrap_objects(
+        self,
+        materials_provider: MaterialsProvider,
+        Prefix: str = "",
+        max_workers: Optional[int] = None,
+        ordered: bool = True,
+        Config: Optional[TransferConfig] = None,
+    ) -> BatchResults:
+        """Wrap the data keys of all objects under a prefix under another materials provider, e.g. to rotate keys.
+
+        Only the metadata of the objects is replaced, see ``EncryptedObject.rewrap``; the objects are processed
+        concurrently.
+
+        :param materials_provider: Provider that wraps the data keys from now on
+        :param str Prefix: Key prefix of the objects
+        :param int max_workers: Number of worker threads
+        :param bool ordered: Yield results in the order the objects are listed rather than as they complete
+        :param Config: Transfer configuration of multipart copies
+        :returns: ``BatchResults`` with one ``BatchResult`` per object, holding its new metadata or the error of that
+            object; the objects are rewrapped right away
+        """
+
+        def rewrap(key: str):
+            return self.Object(key).rewrap(materials_provider, Config=Config)
+
+        return run_batch(
+            rewrap,
+            self._encrypted_keys(self._bucket.name, Prefix),
+            key=lambda key: key,
+            max_workers=max_workers,
+            ordered=ordered,
+        )
+
+    def _encrypted_keys(self, bucket: str, prefix: str) -> Iterator[str]:
+        """List the keys of the objects under a prefix, skipping instruction files, which are handled together with
+        their objects."""
+        suffix = self._instruction_files.suffix if self._instruction_files is not None else INSTRUCTION_FILE_SUFFIX
+        pages = self._bucket.meta.client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix)
+        return (
+            content["Key"]
+            for page in pages
+            for content in page.get("Contents", [])
+            if not content["Key"].endswith(suffix)
         )
 
     def __getattr__(self, name: str):
@@ -0,0 +1,100 @@
+"""Caches shared by materials providers and encrypted resources."""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class LruCache(object):
+    """Thread-safe cache that evicts the least recently used entries beyond its capacity."""
+
+    def __init__(
+        self,
+        capacity: int,
+        on_evict: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """
+        :param int capacity: Maximum number of entries
+        :param on_evict: Called with every value that is evicted, removed or replaced
+        """
+        if capacity < 1:
+            raise ValueError("Cache capacity must be at least 1")
+
+        self._capacity = capacity
+        self._on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._evicted(self._entries.pop(key))
+            self._entries[key] = value
+            while len(self._entries) > self._capacity:
+                _, evicted = self._entries.popitem(last=False)
+                self._evicted(evicted)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._evicted(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            while self._entries:
+                _, value = self._entries.popitem(last=False)
+                self._evicted(value)
+
+    def _evicted(self, value: Any) -> None:
+        if self._on_evict is not None:
+            self._on_evict(value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight(object):
+    """Shares one call among the threads that make it concurrently with the same key.
+
+    The first caller runs the function; callers that arrive while it runs wait for and receive its result or error.
+    Nothing is cached once the call has finished.
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run the function unless a call with the same key is in flight.
+
+        :returns: The result and whether it was shared with a call in flight
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            shared = future is not None
+            if not shared:
+                future = self._calls[key] = Future()
+
+        if shared:
+            return future.result(), True
+
+        try:
+            result = function()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
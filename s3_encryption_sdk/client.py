@@ -1,8 +1,43 @@
-import boto3
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from boto3.resources.base import ResourceMeta
+from boto3.s3.transfer import TransferConfig
 from botocore.client import BaseClient
 
+from .batch import BatchResult, run_batch
+from .instruction_file import InstructionFiles
+from .instrumentation import Instrumentation
 from .materials_providers import MaterialsProvider
 from .object import EncryptedObject
+from .streams import DEFAULT_CHUNK_SIZE
+
+
+class ClientObject(object):
+    """Minimal stand-in for an ``s3.Object`` resource that drives a low-level client directly.
+
+    Building a resource per request creates a new session, loads the service model and opens a new connection
+    pool; this keeps using the wrapped client with its configuration, credentials and connection pool instead.
+    """
+
+    def __init__(self, client: BaseClient, bucket_name: str, key: str) -> None:
+        self.meta = ResourceMeta("s3", client=client)
+        self._bucket_name = bucket_name
+        self._key = key
+
+    @property
+    def bucket_name(self) -> str:
+        return self._bucket_name
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    def put(self, **kwargs):
+        return self.meta.client.put_object(Bucket=self._bucket_name, Key=self._key, **kwargs)
+
+    def get(self, **kwargs):
+        return self.meta.client.get_object(Bucket=self._bucket_name, Key=self._key, **kwargs)
 
 
 class EncryptedClient(object):
@@ -10,23 +45,148 @@ class EncryptedClient(object):
         self,
         client: BaseClient,
         materials_provider: MaterialsProvider,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        base64_encode: bool = False,
+        executor: Optional[Executor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        instruction_files: Optional[InstructionFiles] = None,
     ) -> None:
         self._client = client
         self._materials_provider = materials_provider
+        self._chunk_size = chunk_size
+        self._base64_encode = base64_encode
+        self._executor = executor
+        self._instrumentation = instrumentation
+        self._instruction_files = instruction_files
+        self._multipart_uploads: Dict[str, EncryptedObject] = {}
 
-    def put_object(self, Bucket: str, Key: str, **kwargs):
-        obj = EncryptedObject(
+    def _object(self, bucket: str, key: str) -> EncryptedObject:
+        return EncryptedObject(
             materials_provider=self._materials_provider,
-            obj=boto3.resource("s3").Object(Bucket, Key),
+            obj=ClientObject(self._client, bucket, key),
+            chunk_size=self._chunk_size,
+            base64_encode=self._base64_encode,
+            executor=self._executor,
+            instrumentation=self._instrumentation,
+            instruction_files=self._instruction_files,
         )
-        return obj.put(**kwargs)
+
+    def put_object(self, Bucket: str, Key: str, **kwargs):
+        return self._object(Bucket, Key).put(**kwargs)
 
     def get_object(self, Bucket: str, Key: str, **kwargs):
-        obj = EncryptedObject(
-            materials_provider=self._materials_provider,
-            obj=boto3.resource("s3").Object(Bucket, Key),
+        return self._object(Bucket, Key).get(**kwargs)
+
+    def copy_object(self, Bucket: str, Key: str, CopySource, **kwargs):
+        """Copy an encrypted object server-side; only its data key is wrapped again for the new bucket and key."""
+        return self._object(Bucket, Key).copy_from(CopySource=CopySource, **kwargs)
+
+    def prefetch_materials(
+        self,
+        Bucket: str,
+        Keys: Iterable[str],
+        max_workers: Optional[int] = None,
+    ) -> List[BatchResult]:
+        """Resolve the decryption materials of many objects ahead of their gets.
+
+        Only the metadata of the objects is requested, see ``EncryptedObject.prefetch_materials``. Wrap the materials
+        provider in a ``CachingMaterialsProvider`` to keep the data keys, so later gets skip the KMS requests.
+
+        :returns: One ``BatchResult`` per key, holding the error of that key if it failed
+        """
+
+        def prefetch(key: str):
+            return self._object(Bucket, key).prefetch_materials()
+
+        return run_batch(prefetch, Keys, key=lambda key: key, max_workers=max_workers).wait()
+
+    def _multipart_upload(self, upload_id: str) -> EncryptedObject:
+        try:
+            return self._multipart_uploads[upload_id]
+        except KeyError:
+            raise ValueError("Unknown multipart upload %s; it must be created through this client" % upload_id)
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs):
+        obj = self._object(Bucket, Key)
+        response = obj.create_multipart_upload(**kwargs)
+        self._multipart_uploads[response["UploadId"]] = obj
+        return response
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, **kwargs):
+        return self._multipart_upload(UploadId).upload_part(UploadId=UploadId, **kwargs)
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs):
+        response = self._multipart_upload(UploadId).complete_multipart_upload(UploadId=UploadId, **kwargs)
+        del self._multipart_uploads[UploadId]
+        return response
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs):
+        obj = self._multipart_uploads.pop(UploadId, None) or self._object(Bucket, Key)
+        return obj.abort_multipart_upload(UploadId=UploadId, **kwargs)
+
+    def upload_fileobj(
+        self,
+        Fileobj,
+        Bucket: str,
+        Key: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ):
+        return self._object(Bucket, Key).upload_fileobj(
+            Fileobj,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def upload_file(
+        self,
+        Filename: str,
+        Bucket: str,
+        Key: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ):
+        return self._object(Bucket, Key).upload_file(
+            Filename,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def download_file(
+        self,
+        Bucket: str,
+        Key: str,
+        Filename: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ) -> None:
+        return self._object(Bucket, Key).download_file(
+            Filename,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
+        )
+
+    def download_fileobj(
+        self,
+        Bucket: str,
+        Key: str,
+        Fileobj,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ) -> None:
+        return self._object(Bucket, Key).download_fileobj(
+            Fileobj,
+            ExtraArgs=ExtraArgs,
+            Callback=Callback,
+            Config=Config,
         )
-        return obj.get(**kwargs)
 
     def __getattr__(self, name: str):
         """Catch any method/attribute lookups that are not defined in this class and try
@@ -0,0 +1,13 @@
+"""Exceptions raised by the S3 Encryption SDK."""
+
+
+class S3EncryptionError(Exception):
+    """Base class for the errors of the S3 Encryption SDK."""
+
+
+class MaterialsProviderError(S3EncryptionError):
+    """A materials provider failed to provide encryption or decryption materials."""
+
+
+class ThrottlingError(MaterialsProviderError):
+    """Requests to a key management service were still throttled after all retries."""
@@ -0,0 +1,145 @@
+"""Storage of encryption metadata in instruction files next to the encrypted objects.
+
+S3 limits user metadata to 2 KB, which rich material descriptions can exceed. Like the other S3 encryption
+clients, the metadata describing the encryption materials can instead be stored as JSON in an instruction file,
+a separate object named ``<key>.instruction``.
+"""
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from .caches import LruCache
+from .materials.metadata import METADATA_KEYS
+
+INSTRUCTION_FILE_SUFFIX = ".instruction"
+
+# Marks instruction files among the objects of a bucket.
+INSTRUCTION_FILE_METADATA_KEY = "x-amz-crypto-instr-file"
+
+# Kept in the metadata of the object itself, because it is needed to tell the encoding of the body.
+_OBJECT_METADATA_KEYS = ("x-amz-unencrypted-content-length",)
+
+_WRAPPED_DATA_KEY = "x-amz-key-v2"
+
+
+def has_envelope(s3_metadata: Dict[str, str]) -> bool:
+    """Tell whether S3 metadata describes the encryption materials itself."""
+    return _WRAPPED_DATA_KEY in s3_metadata
+
+
+def split_envelope(s3_metadata: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Split S3 metadata into the metadata of the object and the content of its instruction file."""
+    object_metadata, envelope = {}, {}
+    for name, value in s3_metadata.items():
+        if name in METADATA_KEYS and name not in _OBJECT_METADATA_KEYS:
+            envelope[name] = value
+        else:
+            object_metadata[name] = value
+
+    return object_metadata, envelope
+
+
+def load_instruction_file(client, bucket: str, key: str, suffix: str = INSTRUCTION_FILE_SUFFIX) -> Dict[str, str]:
+    """Read the instruction file of an object."""
+    response = client.get_object(Bucket=bucket, Key=key + suffix)
+
+    with response["Body"] as body:
+        return json.loads(body.read())
+
+
+class InstructionFiles(object):
+    """Stores the encryption metadata of objects in instruction files.
+
+    Instruction files are read concurrently with the object they belong to, and are cached by the bucket, key and
+    ETag of the object, so repeated reads of an unchanged object skip that request. Deleting an object does not
+    delete its instruction file.
+    """
+
+    def __init__(self, suffix: str = INSTRUCTION_FILE_SUFFIX, capacity: int = 1024, max_workers: int = 8) -> None:
+        """
+        :param suffix: Appended to the key of an object to name its instruction file
+        :param capacity: Maximum number of cached instruction files
+        :param max_workers: Maximum number of instruction files that are read concurrently
+        """
+        self._suffix = suffix
+        self._cache = LruCache(capacity)
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def suffix(self) -> str:
+        return self._suffix
+
+    def put(self, client, bucket: str, key: str, s3_metadata: Dict[str, str], **kwargs) -> Dict[str, str]:
+        """Write the instruction file of an object.
+
+        :param s3_metadata: Metadata that would be stored with the object without an instruction file
+        :returns: Metadata to store with the object itself
+        """
+        object_metadata, envelope = split_envelope(s3_metadata)
+
+        client.put_object(
+            Bucket=bucket,
+            Key=key + self._suffix,
+            Body=json.dumps(envelope).encode(),
+            Metadata={INSTRUCTION_FILE_METADATA_KEY: ""},
+            **kwargs,
+        )
+
+        return object_metadata
+
+    def prefetch(self, client, bucket: str, key: str) -> Optional[Future]:
+        """Start reading the instruction file of an object unless it may be cached."""
+        if self._cache.get((bucket, key)) is not None:
+            return None
+
+        return self._get_executor().submit(load_instruction_file, client, bucket, key, self._suffix)
+
+    def resolve(
+        self,
+        client,
+        bucket: str,
+        key: str,
+        etag: str,
+        s3_metadata: Dict[str, str],
+        prefetched: Optional[Future] = None,
+    ) -> Dict[str, str]:
+        """Complete the metadata of an object with its instruction file, if the metadata is not complete already.
+
+        :param etag: ETag of the object the metadata belongs to
+        :param prefetched: Result of ``prefetch``
+        """
+        if has_envelope(s3_metadata):
+            if prefetched is not None:
+                prefetched.cancel()
+            return s3_metadata
+
+        cached = self._cache.get((bucket, key))
+        if cached is not None and cached[0] == etag:
+            envelope = cached[1]
+        elif prefetched is not None:
+            envelope = prefetched.result()
+        else:
+            envelope = load_instruction_file(client, bucket, key, self._suffix)
+
+        self.remember(bucket, key, etag, envelope)
+
+        s3_metadata = dict(s3_metadata)
+        s3_metadata.update(envelope)
+
+        return s3_metadata
+
+    def remember(self, bucket: str, key: str, etag: str, envelope: Dict[str, str]) -> None:
+        """Cache the instruction file of an object with the given ETag."""
+        self._cache.put((bucket, key), (etag, envelope))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="s3-encryption-instruction-file",
+                )
+            return self._executor
@@ -0,0 +1,215 @@
+"""Opt-in instrumentation of the phases and counters of the encrypt and decrypt paths.
+
+Phases are timed in seconds:
+
+* ``materials``: acquiring encryption or decryption materials from the materials provider
+* ``kms.generate_data_key``, ``kms.decrypt`` and ``kms.encrypt``: KMS requests of the ``KmsMaterialsProvider``
+* ``cipher``: AES-GCM encryption or decryption of a body
+* ``encoding``: base64 encoding or decoding of a body
+* ``s3.put`` and ``s3.get``: S3 requests; a streamed put includes the ``cipher`` and ``encoding`` time of its body
+
+Counters are ``kms.calls``, ``kms.coalesced`` (decryptions that shared a KMS request in flight), ``kms.throttled``,
+``cache.hits``, ``cache.misses``, ``bytes.encrypted`` and ``bytes.decrypted``.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+MATERIALS = "materials"
+KMS_GENERATE_DATA_KEY = "kms.generate_data_key"
+KMS_DECRYPT = "kms.decrypt"
+KMS_ENCRYPT = "kms.encrypt"
+CIPHER = "cipher"
+ENCODING = "encoding"
+S3_PUT = "s3.put"
+S3_GET = "s3.get"
+
+KMS_CALLS = "kms.calls"
+KMS_COALESCED = "kms.coalesced"
+KMS_THROTTLED = "kms.throttled"
+CACHE_HITS = "cache.hits"
+CACHE_MISSES = "cache.misses"
+BYTES_ENCRYPTED = "bytes.encrypted"
+BYTES_DECRYPTED = "bytes.decrypted"
+
+
+class _NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def report(self) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Instrumentation(object):
+    """Receives phase timings and counters.
+
+    The base class discards everything without reading the clock, so disabled instrumentation costs next to nothing.
+    Subclasses set ``enabled`` and override ``record_phase`` and ``count``.
+    """
+
+    enabled = False
+
+    def phase(self, name: str):
+        """Context manager that times a phase."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _TimedPhase(self, name)
+
+    def timer(self, name: str):
+        """Context manager that sums the time of a phase over many blocks until its ``report`` is called."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return PhaseTimer(self, name)
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        """Report time spent in a phase."""
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increment a counter."""
+
+
+NO_INSTRUMENTATION = Instrumentation()
+
+
+class _TimedPhase(object):
+    __slots__ = ("_instrumentation", "_name", "_start")
+
+    def __init__(self, instrumentation: Instrumentation, name: str) -> None:
+        self._instrumentation = instrumentation
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self._instrumentation.record_phase(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class PhaseTimer(object):
+    """Sums the time of a phase that is spread over many short blocks, e.g. the chunks of a streamed body."""
+
+    __slots__ = ("_instrumentation", "_name", "_start", "seconds")
+
+    def __init__(self, instrumentation: Instrumentation, name: str) -> None:
+        self._instrumentation = instrumentation
+        self._name = name
+        self._start = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.seconds += time.perf_counter() - self._start
+        return False
+
+    def report(self) -> None:
+        """Report the summed time once and reset it."""
+        if self.seconds:
+            self._instrumentation.record_phase(self._name, self.seconds)
+            self.seconds = 0.0
+
+
+class CallbackInstrumentation(Instrumentation):
+    """Instrumentation that hands phase timings and counters to callbacks.
+
+    Callbacks may be called from several threads at once.
+    """
+
+    enabled = True
+
+    def __init__(
+        self,
+        on_phase: Optional[Callable[[str, float], None]] = None,
+        on_count: Optional[Callable[[str, int], None]] = None,
+    ) -> None:
+        """
+        :param on_phase: Called with the name of a phase and its duration in seconds
+        :param on_count: Called with the name of a counter and the increment
+        """
+        self._on_phase = on_phase
+        self._on_count = on_count
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        if self._on_phase is not None:
+            self._on_phase(name, seconds)
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self._on_count is not None:
+            self._on_count(name, value)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """Instrumentation that reports to OpenTelemetry.
+
+    Timed phases become spans, every phase duration is recorded in the ``s3_encryption_sdk.phase.duration``
+    histogram with a ``phase`` attribute, and counters become ``s3_encryption_sdk.<counter>`` counters. Requires
+    ``opentelemetry-api``, which the ``opentelemetry`` extra installs.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer=None, meter=None) -> None:
+        """
+        :param tracer: OpenTelemetry tracer; defaults to the tracer of the global tracer provider
+        :param meter: OpenTelemetry meter; defaults to the meter of the global meter provider
+        """
+        from opentelemetry import metrics, trace  # pylint: disable=import-outside-toplevel
+
+        self._tracer = tracer if tracer is not None else trace.get_tracer("s3_encryption_sdk")
+        self._meter = meter if meter is not None else metrics.get_meter("s3_encryption_sdk")
+        self._durations = self._meter.create_histogram(
+            "s3_encryption_sdk.phase.duration",
+            unit="s",
+            description="Duration of the phases of encrypted S3 operations",
+        )
+        self._counters: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name: str):
+        return _SpanPhase(self, name)
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        self._durations.record(seconds, {"phase": name})
+
+    def count(self, name: str, value: int = 1) -> None:
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.get(name)
+                if counter is None:
+                    counter = self._meter.create_counter("s3_encryption_sdk." + name)
+                    self._counters[name] = counter
+        counter.add(value)
+
+    def _start_span(self, name: str):
+        return self._tracer.start_as_current_span("s3_encryption_sdk." + name)
+
+
+class _SpanPhase(_TimedPhase):
+    __slots__ = ("_span",)
+
+    def __init__(self, instrumentation: OpenTelemetryInstrumentation, name: str) -> None:
+        super().__init__(instrumentation, name)
+        self._span = instrumentation._start_span(name)  # pylint: disable=protected-access
+
+    def __enter__(self):
+        self._span.__enter__()
+        return super().__enter__()
+
+    def __exit__(self, *exc_info) -> bool:
+        super().__exit__(*exc_info)
+        return bool(self._span.__exit__(*exc_info))
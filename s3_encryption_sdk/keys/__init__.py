@@ -1,11 +1,13 @@
 """Encryption keys."""
-from .data_key import DataKeyAlgorithms, DataKey
+from .data_key import DataKeyAlgorithms, DataKey, register_algorithm, resolve_algorithm
 from .wrapping_key import WrappingKey, AesWrappingKey
 
 
 __all__ = (
     "DataKeyAlgorithms",
     "DataKey",
+    "register_algorithm",
+    "resolve_algorithm",
     "WrappingKey",
     "AesWrappingKey",
 )
@@ -1,7 +1,36 @@
 import secrets
 from enum import Enum
+from typing import Dict, Tuple, Union
+
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Payloads up to this size are processed by a single call of the prepared AEAD, which saves setting up a cipher per
+# call. That saving is gone well before 16 MiB, where both run at memory speed, so larger payloads go through the
+# incremental cipher; AESGCM would reject payloads of 2 ** 31 bytes and more anyway.
+ONE_SHOT_THRESHOLD = 16 * 1024 ** 2
+
+_BLOCK_SIZE = 16
+
+
+def update_into(context, data, out) -> int:
+    """Process data with a cipher context, writing the output into a pre-allocated buffer.
+
+    Older cryptography releases need ``block size - 1`` bytes of headroom in the output of ``update_into``, so the
+    last block goes through ``update`` and the output buffer only has to be as large as the data.
+
+    :returns: Number of bytes written
+    """
+    with memoryview(data).cast("B") as data, memoryview(out).cast("B") as out:
+        head = max(len(data) - _BLOCK_SIZE, 0)
+        written = context.update_into(data[:head], out[: head + _BLOCK_SIZE - 1]) if head else 0
+
+        tail = context.update(data[head:])
+        out[written : written + len(tail)] = tail
+
+        return written + len(tail)
 
 
 class DataKeyAlgorithms(Enum):
@@ -56,6 +85,38 @@ class DataKeyAlgorithms(Enum):
         return self._tag_len
 
 
+_ALGORITHMS: Dict[Tuple[str, int, int], DataKeyAlgorithms] = {}
+
+
+def register_algorithm(algorithm: DataKeyAlgorithms) -> None:
+    """Make an algorithm suite resolvable from the metadata of the objects encrypted with it.
+
+    Suites are told apart by their content encryption algorithm name, data key length and tag length.
+    """
+    _ALGORITHMS[(algorithm.name, algorithm.data_key_length, algorithm.tag_len)] = algorithm
+
+
+def resolve_algorithm(name: str, data_key_length: int, tag_len: int) -> DataKeyAlgorithms:
+    """Find the registered algorithm suite an object was encrypted with.
+
+    :param name: Content encryption algorithm, e.g. ``AES/GCM/NoPadding``
+    :param data_key_length: Length of the data key in bytes
+    :param tag_len: Length of the authentication tag in bytes
+    :raises ValueError: if no such suite is registered
+    """
+    try:
+        return _ALGORITHMS[(name, data_key_length, tag_len)]
+    except KeyError:
+        raise ValueError(
+            "Unsupported content encryption algorithm %s with a %d-bit key and a %d-bit tag"
+            % (name, data_key_length * 8, tag_len * 8)
+        )
+
+
+for _algorithm in DataKeyAlgorithms:
+    register_algorithm(_algorithm)
+
+
 class DataKey(object):
     def __init__(
         self,
@@ -66,34 +127,165 @@ class DataKey(object):
         self._algorithm = algorithm
         self._key = key
         self._iv = iv
+        self._aead = None
+
+    def with_iv(self, iv: bytes) -> "DataKey":
+        """Create a data key for the same key material and another IV that shares the prepared AEAD."""
+        data_key = DataKey(algorithm=self._algorithm, key=self._key, iv=iv)
+        data_key._aead = self._aead  # pylint: disable=protected-access
+        return data_key
+
+    def _one_shot_aead(self, length: int):
+        """Return the prepared AEAD if a payload of the given length can be processed in a single call."""
+        if length > ONE_SHOT_THRESHOLD:
+            return None
+
+        if self._aead is None:
+            if self._algorithm.mode is not modes.GCM or self._algorithm.tag_len != 16:
+                return None
+            # Created once and reused, so repeated calls skip setting up the cipher and the key schedule.
+            self._aead = AESGCM(self._key)
+
+        return self._aead
+
+    def encrypt(self, plaintext) -> Union[bytes, bytearray]:
+        """Encrypt data.
+
+        :param plaintext: Bytes-like object, e.g. ``bytes``, ``bytearray``, ``memoryview`` or ``mmap``
+        :returns: ``ciphertext || tag``; a ``bytearray`` above ``ONE_SHOT_THRESHOLD``, which saves copying it
+        """
+        data = memoryview(plaintext).cast("B")
+
+        aead = self._one_shot_aead(len(data))
+        if aead is not None:
+            try:
+                return aead.encrypt(self._iv, plaintext if isinstance(plaintext, bytes) else data, None)
+            except TypeError:
+                # Older cryptography releases only take bytes, other buffers go through the incremental cipher.
+                pass
+
+        ciphertext = bytearray(len(data) + self._algorithm.tag_len)
+        self.encrypt_into(data, ciphertext)
+
+        return ciphertext
 
-    def encrypt(self, plaintext: bytes) -> bytes:
-        """Encrypt data."""
-        encryptor = Cipher(
+    def encrypt_into(self, plaintext, buffer) -> int:
+        """Encrypt data into a pre-allocated, writable bytes-like object.
+
+        :param buffer: Output buffer of at least ``len(plaintext) + tag_len`` bytes
+        :returns: Number of bytes written
+        """
+        data = memoryview(plaintext).cast("B")
+        out = memoryview(buffer).cast("B")
+        tag_len = self._algorithm.tag_len
+        if len(out) < len(data) + tag_len:
+            raise ValueError("Output buffer is too small")
+
+        encryptor = self.encryptor()
+        written = update_into(encryptor, data, out)
+        encryptor.finalize()
+        out[written : written + tag_len] = encryptor.tag
+
+        return written + tag_len
+
+    def encryptor(self):
+        """Create an incremental encryptor.
+
+        The authentication tag is available from the encryptor's ``tag`` attribute once it has been finalized.
+        """
+        return Cipher(
             algorithm=self._algorithm.algorithm(self._key),
             mode=self._algorithm.mode(self._iv),
             backend=default_backend(),
         ).encryptor()
 
-        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+    def decrypt(self, ciphertext) -> Union[bytes, bytearray]:
+        """Decrypt data.
+
+        :param ciphertext: Bytes-like object holding ``ciphertext || tag``
+        :returns: Plaintext; a ``bytearray`` above ``ONE_SHOT_THRESHOLD``, which saves copying it
+        """
+        data = memoryview(ciphertext).cast("B")
+
+        aead = self._one_shot_aead(len(data))
+        if aead is not None:
+            try:
+                return aead.decrypt(self._iv, ciphertext if isinstance(ciphertext, bytes) else data, None)
+            except TypeError:
+                # Older cryptography releases only take bytes, other buffers go through the incremental cipher.
+                pass
+
+        plaintext = bytearray(max(len(data) - self._algorithm.tag_len, 0))
+        self.decrypt_into(data, plaintext)
+
+        return plaintext
+
+    def decrypt_into(self, ciphertext, buffer) -> int:
+        """Decrypt data into a pre-allocated, writable bytes-like object.
+
+        The buffer holds unauthenticated plaintext if ``InvalidTag`` is raised and must be discarded then.
+
+        :param buffer: Output buffer of at least ``len(ciphertext) - tag_len`` bytes
+        :returns: Number of bytes written
+        :raises InvalidTag: if the ciphertext was tampered with or truncated
+        """
+        data = memoryview(ciphertext).cast("B")
+        out = memoryview(buffer).cast("B")
+        size = len(data) - self._algorithm.tag_len
+        if size < 0:
+            raise InvalidTag()
+        if len(out) < size:
+            raise ValueError("Output buffer is too small")
+
+        decryptor = self.decryptor()
+        written = update_into(decryptor, data[:size], out)
+        decryptor.finalize_with_tag(bytes(data[size:]))
 
-        return ciphertext + encryptor.tag
+        return written
 
-    def decrypt(self, ciphertext: bytes) -> bytes:
-        """Decrypt data."""
-        tag = ciphertext[-self._algorithm.tag_len:]
-        ciphertext = ciphertext[:-self._algorithm.tag_len]
+    def decryptor(self):
+        """Create an incremental decryptor.
+
+        The authentication tag is passed to the decryptor's ``finalize_with_tag`` once all ciphertext was processed.
+        """
+        return Cipher(
+            algorithm=self._algorithm.algorithm(self._key),
+            mode=self._algorithm.mode(self._iv),
+            backend=default_backend(),
+        ).decryptor()
+
+    def unauthenticated_decryptor(self, offset: int = 0):
+        """Create a decryptor that starts at an arbitrary offset of the ciphertext.
+
+        GCM encrypts with AES-CTR, starting at counter block ``IV || 2`` for 96-bit IVs, so the counter for any block
+        can be derived from the IV. The authentication tag covers the whole ciphertext and is therefore NOT checked.
+        """
+        if len(self._iv) != 12:
+            raise ValueError("Ranged decryption requires a 96-bit IV")
+
+        block_size = self._algorithm.algorithm.block_size // 8
+        block, skip = divmod(offset, block_size)
+        counter = self._iv + ((block + 2) % 2 ** 32).to_bytes(4, "big")
 
         decryptor = Cipher(
             algorithm=self._algorithm.algorithm(self._key),
-            mode=self._algorithm.mode(self._iv, tag),
+            mode=modes.CTR(counter),
             backend=default_backend(),
         ).decryptor()
 
-        plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+        # Advance the key stream to the offset within the first block.
+        decryptor.update(bytes(skip))
 
-        return plaintext
+        return decryptor
 
     @property
     def algorithm(self) -> DataKeyAlgorithms:
         return self._algorithm
+
+    @property
+    def key(self) -> bytes:
+        return self._key
+
+    @property
+    def iv(self) -> bytes:
+        return self._iv
@@ -17,6 +17,8 @@ class WrappingKey(ABC):
 
 
 class AesWrappingKey(WrappingKey):
+    ALGORITHM_NAME = "AESWrap"
+
     def __init__(
         self,
         wrapping_key: bytes,
@@ -37,4 +39,4 @@ class AesWrappingKey(WrappingKey):
 
     @property
     def algorithm_name(self) -> str:
-        return "AESWrap"
+        return self.ALGORITHM_NAME
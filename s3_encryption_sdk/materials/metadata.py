@@ -2,9 +2,37 @@ import base64
 import json
 from typing import Dict, Optional
 
+from ..keys import DataKeyAlgorithms, resolve_algorithm
+
+# S3 metadata entries that describe the encryption materials of an object.
+METADATA_KEYS = (
+    "x-amz-key-v2",
+    "x-amz-iv",
+    "x-amz-matdesc",
+    "x-amz-wrap-alg",
+    "x-amz-cek-alg",
+    "x-amz-tag-len",
+    "x-amz-unencrypted-content-length",
+)
+
 
 class Metadata(object):
-    """Encryption material metadata"""
+    """Encryption material metadata
+
+    Instances are immutable; the S3 metadata they generate is built once and reused.
+    """
+
+    __slots__ = (
+        "_wrapped_data_key",
+        "_iv",
+        "_material_description",
+        "_key_wrapping_algorithm",
+        "_content_encryption_algorithm",
+        "_tag_length",
+        "_unencrypted_content_length",
+        "_key_metadata",
+        "_s3_metadata",
+    )
 
     def __init__(
         self,
@@ -23,6 +51,8 @@ class Metadata(object):
         self._content_encryption_algorithm = content_encryption_algorithm
         self._tag_length = tag_length
         self._unencrypted_content_length = unencrypted_content_length
+        self._key_metadata: Optional[Dict[str, str]] = None
+        self._s3_metadata: Optional[Dict[str, str]] = None
 
     @classmethod
     def from_s3_metatdata(cls, s3_metadata: Dict[str, str]):
@@ -44,15 +74,41 @@ class Metadata(object):
             unencrypted_content_length=unencrypted_content_length,
         )
 
-    def generate(self) -> Dict[str, str]:
+    def with_iv(self, iv: bytes, unencrypted_content_length: Optional[int] = None) -> "Metadata":
+        """Metadata of another object encrypted under the same data key.
+
+        The IV independent part of the generated S3 metadata is shared instead of being encoded again.
+        """
+        metadata = Metadata(
+            wrapped_data_key=self._wrapped_data_key,
+            iv=iv,
+            material_description=self._material_description,
+            key_wrapping_algorithm=self._key_wrapping_algorithm,
+            content_encryption_algorithm=self._content_encryption_algorithm,
+            tag_length=self._tag_length,
+            unencrypted_content_length=unencrypted_content_length,
+        )
+        metadata._key_metadata = self._generate_key_metadata()  # pylint: disable=protected-access
+        return metadata
+
+    def algorithm(self, data_key_length: int) -> DataKeyAlgorithms:
+        """Resolve the algorithm suite the object was encrypted with.
+
+        The metadata does not name the key size, so it is taken from the unwrapped data key.
+
+        :raises ValueError: if the suite is not registered
+        """
+        return resolve_algorithm(self._content_encryption_algorithm, data_key_length, self._tag_length // 8)
+
+    def _generate_key_metadata(self) -> Dict[str, str]:
+        if self._key_metadata is not None:
+            return self._key_metadata
+
         metadata = {}
 
         # CEK in key wrapped form.
         metadata["x-amz-key-v2"] = base64.b64encode(self._wrapped_data_key).decode()
 
-        # Randomly generated IV(per S3 object), base64 encoded.
-        metadata["x-amz-iv"] = base64.b64encode(self._iv).decode()
-
         # Customer provided material description in JSON format.
         if self._material_description:
             metadata["x-amz-matdesc"] = json.dumps(self._material_description)
@@ -69,11 +125,24 @@ class Metadata(object):
         if self._tag_length:
             metadata["x-amz-tag-len"] = str(self._tag_length)
 
-        if self._unencrypted_content_length:
-            metadata["x-amz-unencrypted-content-length"] = str(self._unencrypted_content_length)
-
+        self._key_metadata = metadata
         return metadata
 
+    def generate(self) -> Dict[str, str]:
+        if self._s3_metadata is None:
+            metadata = dict(self._generate_key_metadata())
+
+            # Randomly generated IV(per S3 object), base64 encoded.
+            metadata["x-amz-iv"] = base64.b64encode(self._iv).decode()
+
+            if self._unencrypted_content_length is not None:
+                metadata["x-amz-unencrypted-content-length"] = str(self._unencrypted_content_length)
+
+            self._s3_metadata = metadata
+
+        # Callers may add to the returned dict, so the cached one is never handed out.
+        return dict(self._s3_metadata)
+
     @property
     def wrapped_data_key(self) -> bytes:
         return self._wrapped_data_key
@@ -81,3 +150,23 @@ class Metadata(object):
     @property
     def iv(self) -> bytes:
         return self._iv
+
+    @property
+    def material_description(self) -> Optional[Dict[str, str]]:
+        return self._material_description
+
+    @property
+    def key_wrapping_algorithm(self) -> Optional[str]:
+        return self._key_wrapping_algorithm
+
+    @property
+    def content_encryption_algorithm(self) -> str:
+        return self._content_encryption_algorithm
+
+    @property
+    def tag_length(self) -> int:
+        return self._tag_length
+
+    @property
+    def unencrypted_content_length(self) -> Optional[int]:
+        return self._unencrypted_content_length
@@ -1,12 +1,18 @@
 """Cryptographic materials providers."""
 from .base import MaterialsProvider
+from .caching import CachingMaterialsProvider
+from .hierarchical import HierarchicalMaterialsProvider
 from .kms import KmsMaterialsProvider
+from .multi import MultiKeyringMaterialsProvider
 from .wrapped import WrappedMaterialsProvider
 from .context import EncryptionContext
 
 __all__ = (
     "MaterialsProvider",
+    "CachingMaterialsProvider",
+    "HierarchicalMaterialsProvider",
     "KmsMaterialsProvider",
+    "MultiKeyringMaterialsProvider",
     "WrappedMaterialsProvider",
     "EncryptionContext",
 )
@@ -1,7 +1,10 @@
 """Base cryptographic materials provider for all cryptographic materials providers."""
 
 from abc import ABC, abstractmethod
+from typing import Optional
 
+from ..exceptions import MaterialsProviderError
+from ..keys import DataKey
 from ..materials import EncryptionMaterials
 from .context import EncryptionContext
 
@@ -16,3 +19,23 @@ class MaterialsProvider(ABC):
     @abstractmethod
     def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
         """Provide encryption materials."""
+
+    def rewrap_materials(self, encryption_context: EncryptionContext, data_key: DataKey) -> EncryptionMaterials:
+        """Provide encryption materials that wrap an existing data key, keeping its algorithm and IV.
+
+        Used to move objects to another key without re-encrypting their content. Providers that cannot wrap existing
+        data keys keep this default.
+
+        :raises MaterialsProviderError: if the provider does not wrap existing data keys
+        """
+        raise MaterialsProviderError("%s cannot wrap existing data keys" % type(self).__name__)
+
+    @property
+    def key_wrapping_algorithm(self) -> Optional[str]:
+        """Key wrapping algorithm (``x-amz-wrap-alg``) of the data keys this provider wraps, or None if unknown."""
+        return None
+
+    @property
+    def key_id(self) -> Optional[str]:
+        """Id or ARN of the KMS key that protects the data keys this provider wraps, or None if it does not use KMS."""
+        return None
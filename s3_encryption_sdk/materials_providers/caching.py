@@ -0,0 +1,247 @@
+"""Cryptographic materials provider that caches the data keys of another provider."""
+import json
+import threading
+import time
+from typing import Optional, Tuple
+
+from ..caches import LruCache, SingleFlight
+from ..instrumentation import CACHE_HITS, CACHE_MISSES, NO_INSTRUMENTATION, Instrumentation
+from ..keys import DataKey, DataKeyAlgorithms
+from ..materials import EncryptionMaterials, Metadata
+from .base import MaterialsProvider
+from .context import EncryptionContext, is_shared_data_key
+
+
+class _CacheEntry(object):
+    """Plaintext data key together with its usage statistics."""
+
+    def __init__(self, key: bytes, algorithm: DataKeyAlgorithms, metadata: Optional[Metadata] = None) -> None:
+        # The only copy of the key material held by the cache, so zeroing it leaves none behind.
+        self._key = bytearray(key)
+        self._algorithm = algorithm
+        self._metadata = metadata
+        self._created_at = time.monotonic()
+        self.messages_encrypted = 0
+        self.bytes_encrypted = 0
+
+    def data_key(self, iv: bytes) -> DataKey:
+        # Data keys get their own immutable copy, so zeroing an evicted entry never affects keys in use.
+        return DataKey(algorithm=self._algorithm, key=bytes(self._key), iv=iv)
+
+    @property
+    def algorithm(self) -> DataKeyAlgorithms:
+        return self._algorithm
+
+    @property
+    def metadata(self) -> Optional[Metadata]:
+        return self._metadata
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._created_at
+
+    def zero(self) -> None:
+        """Overwrite the cached key material."""
+        for index in range(len(self._key)):
+            self._key[index] = 0
+
+
+class CachingMaterialsProvider(MaterialsProvider):
+    """Cryptographic materials provider that caches the data keys of another provider.
+
+    Decrypted data keys are kept in an LRU cache keyed by the wrapped data key and the context it is bound to, so
+    repeated reads skip the unwrapping, e.g. a KMS request. On the encrypt side a data key is reused for up to
+    ``max_messages_encrypted`` objects, ``max_bytes_encrypted`` bytes and ``max_age`` seconds; every object still gets
+    a fresh IV. Bodies of unknown length only reuse a data key if ``max_bytes_encrypted`` is not set. The cache holds
+    the only copy of the key material it keeps, which is zeroed on eviction; data keys handed out hold their own copy
+    for as long as they are used.
+
+    Data keys for reuse are requested as shared data keys, which the inner provider binds to the bucket only and
+    marks as shared in the key wrapping algorithm. Objects encrypted under them can be swapped within the bucket, so
+    readers only decrypt them if they accept shared data keys, as with
+    ``KmsMaterialsProvider(accept_shared_data_keys=True)``.
+    """
+
+    def __init__(
+        self,
+        materials_provider: MaterialsProvider,
+        capacity: int = 1000,
+        max_age: float = 300.0,
+        max_messages_encrypted: int = 2 ** 32,
+        max_bytes_encrypted: Optional[int] = None,
+        instrumentation: Optional[Instrumentation] = None,
+    ) -> None:
+        """
+        :param materials_provider: Provider whose data keys are cached
+        :param int capacity: Maximum number of cached data keys
+        :param float max_age: Seconds a cached data key may be used for
+        :param int max_messages_encrypted: Maximum number of objects encrypted with one data key
+        :param int max_bytes_encrypted: Maximum number of plaintext bytes encrypted with one data key; unlimited if None
+        :param instrumentation: Counts cache hits and misses
+        """
+        self._materials_provider = materials_provider
+        self._max_age = max_age
+        self._max_messages_encrypted = max_messages_encrypted
+        self._max_bytes_encrypted = max_bytes_encrypted
+        self._encryption_cache = LruCache(capacity, on_evict=_CacheEntry.zero)
+        self._decryption_cache = LruCache(capacity, on_evict=_CacheEntry.zero)
+        self._lock = threading.Lock()
+        self._encryption_calls = SingleFlight()
+        self._instrumentation = instrumentation if instrumentation is not None else NO_INSTRUMENTATION
+
+    @property
+    def key_wrapping_algorithm(self) -> Optional[str]:
+        return self._materials_provider.key_wrapping_algorithm
+
+    @property
+    def key_id(self) -> Optional[str]:
+        return self._materials_provider.key_id
+
+    def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+        metadata = encryption_context.metadata
+        # Shared data keys are bound to the bucket only, so they unwrap the same for all of its objects.
+        shared_data_key = is_shared_data_key(metadata.key_wrapping_algorithm)
+        cache_key = (
+            metadata.wrapped_data_key,
+            encryption_context.bucket_name,
+            None if shared_data_key else encryption_context.object_key,
+            metadata.content_encryption_algorithm,
+            metadata.tag_length,
+        )
+
+        # Entries are zeroed on eviction, so their key is copied while holding the lock.
+        with self._lock:
+            entry = self._decryption_cache.get(cache_key)
+            if entry is not None and entry.age <= self._max_age:
+                self._instrumentation.count(CACHE_HITS)
+                return EncryptionMaterials(data_key=entry.data_key(metadata.iv), metadata=metadata)
+
+        self._instrumentation.count(CACHE_MISSES)
+
+        materials = self._materials_provider.decryption_materials(
+            EncryptionContext(
+                bucket_name=encryption_context.bucket_name,
+                object_key=encryption_context.object_key,
+                s3_metadata=encryption_context.s3_metadata,
+                metadata=metadata,
+            )
+        )
+
+        with self._lock:
+            self._decryption_cache.put(cache_key, _CacheEntry(materials.data_key.key, materials.data_key.algorithm))
+
+        return EncryptionMaterials(data_key=materials.data_key, metadata=metadata)
+
+    def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+        plaintext_length = encryption_context.unencrypted_content_length
+
+        if not self._can_reuse(plaintext_length):
+            # Reusing a key for this body could exceed the byte limit, so it gets a key of its own.
+            self._instrumentation.count(CACHE_MISSES)
+            return self._materials_provider.encryption_materials(encryption_context)
+
+        cache_key = self._encryption_cache_key(encryption_context)
+
+        while True:
+            # Checking the limits and counting the use happen atomically, so concurrent puts cannot exceed them.
+            with self._lock:
+                entry = self._encryption_cache.get(cache_key)
+                if entry is not None and not self._can_encrypt(entry, plaintext_length or 0):
+                    self._encryption_cache.remove(cache_key)
+                    entry = None
+
+                if entry is not None:
+                    entry.messages_encrypted += 1
+                    entry.bytes_encrypted += plaintext_length or 0
+
+                    iv = entry.algorithm.generate_iv()
+                    data_key = entry.data_key(iv)
+                    metadata = entry.metadata
+
+            if entry is not None:
+                self._instrumentation.count(CACHE_HITS)
+                return EncryptionMaterials(
+                    data_key=data_key,
+                    metadata=metadata.with_iv(iv, encryption_context.unencrypted_content_length),
+                )
+
+            # The inner provider, e.g. a KMS request, runs outside the lock, once for all concurrent misses. The caller
+            # that ran it uses its materials; the others try the cache again.
+            materials, shared = self._encryption_calls.do(
+                cache_key, lambda: self._cache_new_entry(cache_key, encryption_context)
+            )
+            if not shared:
+                self._instrumentation.count(CACHE_MISSES)
+                return materials
+
+    def _cache_new_entry(
+        self,
+        cache_key: Tuple[str, str],
+        encryption_context: EncryptionContext,
+    ) -> EncryptionMaterials:
+        """Get a new shared data key from the inner provider, counting its first use, and cache it for reuse."""
+        materials = self._materials_provider.encryption_materials(
+            EncryptionContext(
+                bucket_name=encryption_context.bucket_name,
+                object_key=encryption_context.object_key,
+                material_description=encryption_context.material_description,
+                unencrypted_content_length=encryption_context.unencrypted_content_length,
+                shared_data_key=True,
+            )
+        )
+
+        entry = _CacheEntry(
+            materials.data_key.key,
+            materials.data_key.algorithm,
+            metadata=Metadata(
+                wrapped_data_key=materials.metadata.wrapped_data_key,
+                iv=materials.metadata.iv,
+                material_description=materials.metadata.material_description,
+                key_wrapping_algorithm=materials.metadata.key_wrapping_algorithm,
+                content_encryption_algorithm=materials.metadata.content_encryption_algorithm,
+                tag_length=materials.metadata.tag_length,
+            ),
+        )
+
+        entry.messages_encrypted += 1
+        entry.bytes_encrypted += encryption_context.unencrypted_content_length or 0
+
+        with self._lock:
+            self._encryption_cache.put(cache_key, entry)
+
+        return EncryptionMaterials(
+            data_key=materials.data_key,
+            metadata=entry.metadata.with_iv(materials.metadata.iv, encryption_context.unencrypted_content_length),
+        )
+
+    def rewrap_materials(self, encryption_context: EncryptionContext, data_key: DataKey) -> EncryptionMaterials:
+        """Provide encryption materials that wrap an existing data key; they are not cached."""
+        return self._materials_provider.rewrap_materials(encryption_context, data_key)
+
+    def _can_reuse(self, plaintext_length: Optional[int]) -> bool:
+        """Tell whether a body of the given length may be encrypted with a cached data key at all."""
+        if self._max_bytes_encrypted is None:
+            return True
+        return plaintext_length is not None and plaintext_length <= self._max_bytes_encrypted
+
+    def _can_encrypt(self, entry: _CacheEntry, plaintext_length: int) -> bool:
+        return (
+            entry.age <= self._max_age
+            and entry.messages_encrypted < self._max_messages_encrypted
+            and (
+                self._max_bytes_encrypted is None
+                or entry.bytes_encrypted + plaintext_length <= self._max_bytes_encrypted
+            )
+        )
+
+    @staticmethod
+    def _encryption_cache_key(encryption_context: EncryptionContext) -> Tuple[str, str]:
+        material_description = json.dumps(encryption_context.material_description, sort_keys=True)
+        return encryption_context.bucket_name, material_description
+
+    def clear(self) -> None:
+        """Evict and zero all cached data keys."""
+        self._encryption_cache.clear()
+        self._decryption_cache.clear()
@@ -1,5 +1,22 @@
 from typing import Dict, Optional
 
+from ..materials import Metadata
+
+# Suffix of the key wrapping algorithm (``x-amz-wrap-alg``) of shared data keys, which are bound to their bucket only.
+SHARED_DATA_KEY_SUFFIX = "+shared"
+
+
+def is_shared_data_key(key_wrapping_algorithm: Optional[str]) -> bool:
+    """Tell whether a key wrapping algorithm marks a data key shared by several objects of a bucket."""
+    return key_wrapping_algorithm is not None and key_wrapping_algorithm.endswith(SHARED_DATA_KEY_SUFFIX)
+
+
+def unshared_key_wrapping_algorithm(key_wrapping_algorithm: Optional[str]) -> Optional[str]:
+    """Strip the shared data key marker off a key wrapping algorithm."""
+    if is_shared_data_key(key_wrapping_algorithm):
+        return key_wrapping_algorithm[: -len(SHARED_DATA_KEY_SUFFIX)]
+    return key_wrapping_algorithm
+
 
 class EncryptionContext(object):
     """Additional information about an encryption request."""
@@ -11,7 +28,14 @@ class EncryptionContext(object):
         material_description: Optional[Dict[str, str]] = None,
         s3_metadata: Optional[Dict[str, str]] = None,
         unencrypted_content_length: Optional[int] = None,
+        metadata: Optional[Metadata] = None,
+        shared_data_key: bool = False,
     ) -> None:
+        """
+        :param metadata: Already parsed ``s3_metadata``, e.g. when passing the context on to another provider
+        :param bool shared_data_key: Request a data key that may encrypt several objects of the bucket, which is
+            therefore bound to the bucket only and marked as shared
+        """
         if material_description is None:
             material_description = {}
 
@@ -20,6 +44,8 @@ class EncryptionContext(object):
         self._material_description = material_description
         self._s3_metadata = s3_metadata
         self._unencrypted_content_length = unencrypted_content_length
+        self._metadata = metadata
+        self._shared_data_key = shared_data_key
 
     @property
     def bucket_name(self) -> str:
@@ -40,3 +66,14 @@ class EncryptionContext(object):
     @property
     def unencrypted_content_length(self) -> Optional[int]:
         return self._unencrypted_content_length
+
+    @property
+    def metadata(self) -> Optional[Metadata]:
+        """Encryption material metadata parsed from ``s3_metadata`` on first use, so providers share one parse."""
+        if self._metadata is None and self._s3_metadata is not None:
+            self._metadata = Metadata.from_s3_metatdata(self._s3_metadata)
+        return self._metadata
+
+    @property
+    def shared_data_key(self) -> bool:
+        return self._shared_data_key
@@ -0,0 +1,302 @@
+"""Cryptographic materials provider that wraps data keys locally under KMS protected branch keys."""
+import base64
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import botocore
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.keywrap import InvalidUnwrap
+
+from ..caches import LruCache, SingleFlight
+from ..exceptions import MaterialsProviderError
+from ..instrumentation import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    KMS_DECRYPT,
+    KMS_GENERATE_DATA_KEY,
+    NO_INSTRUMENTATION,
+    Instrumentation,
+)
+from ..keys import AesWrappingKey, DataKey, DataKeyAlgorithms
+from ..materials import EncryptionMaterials, Metadata
+from ..rate_limiting import AdaptiveRateLimiter
+from .base import MaterialsProvider
+from .context import SHARED_DATA_KEY_SUFFIX, EncryptionContext, is_shared_data_key
+from .kms import kms_request
+
+# Material description entries naming the branch key that wrapped the data key, and holding its KMS wrapped form.
+BRANCH_KEY_ID = "branch_key_id"
+WRAPPED_BRANCH_KEY = "branch_key"
+
+BRANCH_KEY_LENGTH = 32
+
+# Key wrapping algorithm of shared data keys, which are wrapped under a key bound to their bucket only.
+SHARED_KEY_WRAPPING_ALGORITHM = AesWrappingKey.ALGORITHM_NAME + SHARED_DATA_KEY_SUFFIX
+
+# Prefixes of the HKDF info that derives the key wrapping the data key of one object, or the shared data keys of one
+# bucket, from a branch key.
+_WRAPPING_KEY_INFO = b"s3-encryption-sdk branch key wrapping key:"
+_SHARED_WRAPPING_KEY_INFO = b"s3-encryption-sdk branch key shared wrapping key:"
+
+
+class _BranchKey(object):
+    """Plaintext branch key together with its KMS wrapped form."""
+
+    __slots__ = ("branch_key_id", "wrapped_branch_key", "_key", "_created_at")
+
+    def __init__(self, branch_key_id: str, key: bytes, wrapped_branch_key: bytes) -> None:
+        self.branch_key_id = branch_key_id
+        self.wrapped_branch_key = wrapped_branch_key
+        self._key = key
+        self._created_at = time.monotonic()
+
+    def wrapping_key(self, bucket_name: str, object_key: Optional[str]) -> AesWrappingKey:
+        """Derive the key that wraps the data key of one object, so a wrapped data key only unwraps for its object.
+
+        Without an object key, derive the key that wraps the shared data keys of the bucket.
+        """
+        if object_key is None:
+            info = _SHARED_WRAPPING_KEY_INFO + bucket_name.encode("utf-8")
+        else:
+            # Bucket names cannot contain "/", which keeps the bucket and object key apart.
+            info = _WRAPPING_KEY_INFO + ("%s/%s" % (bucket_name, object_key)).encode("utf-8")
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=BRANCH_KEY_LENGTH,
+            salt=None,
+            info=info,
+            backend=default_backend(),
+        )
+        return AesWrappingKey(hkdf.derive(self._key))
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._created_at
+
+
+class HierarchicalMaterialsProvider(MaterialsProvider):
+    """Cryptographic materials provider that wraps data keys locally under KMS protected branch keys.
+
+    Every object gets its own data key, wrapped with AES key wrap under a key derived from a branch key and the bucket
+    and key of the object, which binds the data key to its object like the KMS encryption context does. A new
+    branch key is generated by
+    KMS every ``ttl`` seconds; its id and KMS wrapped form are recorded in the material description of the objects it
+    wraps. Decrypted branch keys are cached for ``ttl`` seconds as well, and concurrent reads of objects under the same
+    branch key share one KMS Decrypt request. The number of KMS requests thus depends on the rotation period, not on
+    the number of objects.
+
+    Shared data keys, requested by a ``CachingMaterialsProvider`` for reuse, are wrapped under a key derived from the
+    bucket only and only decrypted if ``accept_shared_data_keys`` is set.
+    """
+
+    def __init__(
+        self,
+        key_id: str,
+        client: botocore.client.BaseClient,
+        ttl: float = 600.0,
+        capacity: int = 1000,
+        grant_tokens=None,
+        algorithm: DataKeyAlgorithms = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16,
+        instrumentation: Optional[Instrumentation] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        accept_shared_data_keys: bool = False,
+    ) -> None:
+        """
+        :param key_id: Id or ARN of the KMS key that wraps the branch keys
+        :param client: KMS client
+        :param float ttl: Seconds a branch key wraps new data keys for, and a decrypted branch key is cached for
+        :param int capacity: Maximum number of cached decrypted branch keys
+        :param grant_tokens: Grant tokens to send with every KMS request
+        :param algorithm: Algorithm suite of new data keys
+        :param instrumentation: Receives the timings of the KMS requests and counts branch key cache hits and misses
+        :param rate_limiter: Retries throttled KMS requests and limits the request rate
+        :param bool accept_shared_data_keys: Decrypt objects whose data key is shared by several objects of the
+            bucket, as written through a CachingMaterialsProvider
+        """
+        self._key_id = key_id
+        self._client = client
+        self._ttl = ttl
+        self._grant_tokens = grant_tokens
+        self._algorithm = algorithm
+        self._instrumentation = instrumentation if instrumentation is not None else NO_INSTRUMENTATION
+        self._rate_limiter = rate_limiter
+        self._accept_shared_data_keys = accept_shared_data_keys
+        self._active_branch_key: Optional[_BranchKey] = None
+        self._branch_keys = LruCache(capacity)
+        self._branch_key_calls = SingleFlight()
+        self._rotations = SingleFlight()
+        self._lock = threading.Lock()
+
+    @property
+    def key_id(self) -> str:
+        return self._key_id
+
+    @property
+    def key_wrapping_algorithm(self) -> str:
+        return AesWrappingKey.ALGORITHM_NAME
+
+    def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+        metadata = encryption_context.metadata
+
+        shared_data_key = is_shared_data_key(metadata.key_wrapping_algorithm)
+        if shared_data_key and not self._accept_shared_data_keys:
+            raise MaterialsProviderError("Refusing to decrypt an object whose data key is shared within its bucket")
+
+        branch_key = self._branch_key(metadata.material_description or {})
+        wrapping_key = branch_key.wrapping_key(
+            encryption_context.bucket_name,
+            None if shared_data_key else encryption_context.object_key,
+        )
+        try:
+            initial_material = wrapping_key.unwrap_data_key(metadata.wrapped_data_key)
+        except InvalidUnwrap as exc:
+            raise MaterialsProviderError("Failed to unwrap the data key; it belongs to another object") from exc
+
+        data_key = DataKey(
+            algorithm=metadata.algorithm(len(initial_material)),
+            key=initial_material,
+            iv=metadata.iv,
+        )
+
+        return EncryptionMaterials(data_key=data_key, metadata=metadata)
+
+    def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+        data_key = DataKey(
+            algorithm=self._algorithm,
+            key=self._algorithm.generate_data_key(),
+            iv=self._algorithm.generate_iv(),
+        )
+
+        return self.rewrap_materials(encryption_context, data_key)
+
+    def rewrap_materials(self, encryption_context: EncryptionContext, data_key: DataKey) -> EncryptionMaterials:
+        """Provide encryption materials that wrap an existing data key under the active branch key."""
+        branch_key = self._active()
+        shared_data_key = encryption_context.shared_data_key
+        wrapping_key = branch_key.wrapping_key(
+            encryption_context.bucket_name,
+            None if shared_data_key else encryption_context.object_key,
+        )
+
+        material_description = dict(encryption_context.material_description)
+        material_description[BRANCH_KEY_ID] = branch_key.branch_key_id
+        material_description[WRAPPED_BRANCH_KEY] = base64.b64encode(branch_key.wrapped_branch_key).decode()
+
+        metadata = Metadata(
+            iv=data_key.iv,
+            material_description=material_description,
+            key_wrapping_algorithm=SHARED_KEY_WRAPPING_ALGORITHM if shared_data_key else AesWrappingKey.ALGORITHM_NAME,
+            content_encryption_algorithm=data_key.algorithm.name,
+            wrapped_data_key=wrapping_key.wrap_data_key(data_key.key),
+            tag_length=data_key.algorithm.tag_len * 8,
+            unencrypted_content_length=encryption_context.unencrypted_content_length,
+        )
+
+        return EncryptionMaterials(data_key=data_key, metadata=metadata)
+
+    def clear(self) -> None:
+        """Drop the active and all cached branch keys."""
+        with self._lock:
+            self._active_branch_key = None
+        self._branch_keys.clear()
+
+    def _active(self) -> _BranchKey:
+        """Return the branch key that wraps new data keys, generating a new one once it has expired."""
+        branch_key = self._active_branch_key
+        if branch_key is not None and branch_key.age <= self._ttl:
+            return branch_key
+
+        branch_key, _ = self._rotations.do(None, self._rotate)
+
+        return branch_key
+
+    def _rotate(self) -> _BranchKey:
+        """Generate a new active branch key, unless another thread just did; KMS is called without holding the lock."""
+        with self._lock:
+            branch_key = self._active_branch_key
+            if branch_key is not None and branch_key.age <= self._ttl:
+                return branch_key
+
+        branch_key = self._generate_branch_key()
+
+        with self._lock:
+            self._active_branch_key = branch_key
+        self._branch_keys.put(branch_key.branch_key_id, branch_key)
+
+        return branch_key
+
+    def _branch_key(self, material_description: Dict[str, str]) -> _BranchKey:
+        """Return the branch key named in a material description, decrypting it unless it is cached."""
+        try:
+            branch_key_id = material_description[BRANCH_KEY_ID]
+            wrapped_branch_key = base64.b64decode(material_description[WRAPPED_BRANCH_KEY])
+        except (KeyError, ValueError) as exc:
+            raise MaterialsProviderError("Material description names no branch key") from exc
+
+        branch_key = self._branch_keys.get(branch_key_id)
+        if branch_key is not None and branch_key.age <= self._ttl:
+            self._instrumentation.count(CACHE_HITS)
+            return branch_key
+
+        self._instrumentation.count(CACHE_MISSES)
+
+        def decrypt() -> _BranchKey:
+            branch_key = self._decrypt_branch_key(branch_key_id, wrapped_branch_key)
+            self._branch_keys.put(branch_key_id, branch_key)
+            return branch_key
+
+        branch_key, _ = self._branch_key_calls.do(branch_key_id, decrypt)
+
+        return branch_key
+
+    def _generate_branch_key(self) -> _BranchKey:
+        """Generate a branch key with KMS."""
+        branch_key_id = str(uuid.uuid4())
+        kms_params = self._kms_params(
+            branch_key_id,
+            KeyId=self._key_id,
+            NumberOfBytes=BRANCH_KEY_LENGTH,
+        )
+
+        try:
+            response = kms_request(
+                KMS_GENERATE_DATA_KEY,
+                lambda: self._client.generate_data_key(**kms_params),
+                self._instrumentation,
+                self._rate_limiter,
+            )
+            return _BranchKey(branch_key_id, response["Plaintext"], response["CiphertextBlob"])
+        except (botocore.exceptions.ClientError, KeyError) as exc:
+            message = "Failed to generate a branch key using AWS KMS"
+            raise MaterialsProviderError(message) from exc
+
+    def _decrypt_branch_key(self, branch_key_id: str, wrapped_branch_key: bytes) -> _BranchKey:
+        """Decrypt a branch key with KMS."""
+        kms_params = self._kms_params(branch_key_id, CiphertextBlob=wrapped_branch_key)
+
+        try:
+            response = kms_request(
+                KMS_DECRYPT,
+                lambda: self._client.decrypt(**kms_params),
+                self._instrumentation,
+                self._rate_limiter,
+            )
+            return _BranchKey(branch_key_id, response["Plaintext"], wrapped_branch_key)
+        except (botocore.exceptions.ClientError, KeyError) as exc:
+            message = "Failed to unwrap AWS KMS protected branch key"
+            raise MaterialsProviderError(message) from exc
+
+    def _kms_params(self, branch_key_id: str, **kms_params) -> Dict:
+        """Build the parameters of a KMS request that binds a branch key to its id."""
+        kms_params["EncryptionContext"] = {BRANCH_KEY_ID: branch_key_id}
+
+        if self._grant_tokens:
+            kms_params["GrantTokens"] = self._grant_tokens
+
+        return kms_params
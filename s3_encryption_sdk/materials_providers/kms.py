@@ -1,45 +1,145 @@
 """Cryptographic materials provider for use with the AWS Key Management Service (KMS)."""
-from typing import Tuple
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
 import botocore
 
+from ..caches import SingleFlight
+from ..exceptions import MaterialsProviderError
+from ..instrumentation import (
+    KMS_CALLS,
+    KMS_COALESCED,
+    KMS_DECRYPT,
+    KMS_ENCRYPT,
+    KMS_GENERATE_DATA_KEY,
+    KMS_THROTTLED,
+    NO_INSTRUMENTATION,
+    Instrumentation,
+)
 from ..keys import DataKeyAlgorithms, DataKey
 from ..materials import EncryptionMaterials, Metadata
+from ..rate_limiting import AdaptiveRateLimiter
 from .base import MaterialsProvider
-from .context import EncryptionContext
+from .context import SHARED_DATA_KEY_SUFFIX, EncryptionContext, is_shared_data_key
 
+KMS_KEY_WRAPPING_ALGORITHM = "kms"
 
-def _kms_encryption_context(encryption_context: EncryptionContext):
-    """Build the KMS encryption context from the encryption context."""
-    kms_encryption_context = dict(
-        s3_bucket_name=encryption_context.bucket_name,
-        s3_object_key=encryption_context.object_key,
-    )
+# Key wrapping algorithm of shared data keys, which KMS binds to their bucket only.
+KMS_SHARED_KEY_WRAPPING_ALGORITHM = KMS_KEY_WRAPPING_ALGORITHM + SHARED_DATA_KEY_SUFFIX
+
+# Material description entry naming the KMS key that wrapped the data key, as written by other S3 encryption clients.
+KMS_CMK_ID = "kms_cmk_id"
+
+
+def _kms_encryption_context(encryption_context: EncryptionContext, shared_data_key: bool = False):
+    """Build the KMS encryption context from the encryption context, leaving out the object key for shared keys."""
+    kms_encryption_context = dict(s3_bucket_name=encryption_context.bucket_name)
+    if not shared_data_key:
+        kms_encryption_context["s3_object_key"] = encryption_context.object_key
     return kms_encryption_context
 
 
-class KmsMaterialsProvider(MaterialsProvider):
-    """Cryptographic materials provider for use with the AWS Key Management Service (KMS)."""
+def kms_request(
+    phase: str,
+    request: Callable[[], Any],
+    instrumentation: Instrumentation,
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+) -> Any:
+    """Send a KMS request, timed as the given phase, through the rate limiter, if any."""
+
+    def attempt() -> Any:
+        instrumentation.count(KMS_CALLS)
+        with instrumentation.phase(phase):
+            return request()
+
+    if rate_limiter is None:
+        return attempt()
+
+    return rate_limiter.call(attempt, on_throttled=lambda: instrumentation.count(KMS_THROTTLED))
+
+
+def _decrypt_request_key(kms_params: Dict) -> Hashable:
+    """Identify a KMS Decrypt request by its ciphertext blob and encryption context."""
+    return kms_params["CiphertextBlob"], tuple(sorted(kms_params["EncryptionContext"].items()))
+
+
+class KmsMaterials(object):
+    """Builds the KMS requests for one KMS key and assembles materials from their responses.
+
+    Holds no client, so that providers sending the requests through synchronous and asynchronous clients alike
+    produce the same materials.
+    """
 
     def __init__(
         self,
         key_id: str,
-        client: botocore.client.BaseClient,
         grant_tokens=None,
         algorithm: DataKeyAlgorithms = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16,
+        accept_shared_data_keys: bool = False,
     ) -> None:
+        """
+        :param key_id: Id or ARN of the KMS key that wraps the data keys
+        :param grant_tokens: Grant tokens to send with every request
+        :param algorithm: Algorithm suite of new data keys
+        :param bool accept_shared_data_keys: Decrypt objects whose data key is shared by several objects of the
+            bucket, as written through a CachingMaterialsProvider; such objects can be swapped within the bucket
+        """
         self._key_id = key_id
-        self._client = client
         self._grant_tokens = grant_tokens
         self._algorithm = algorithm
+        self._accept_shared_data_keys = accept_shared_data_keys
 
-    def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
-        """Provide decryption materials."""
-        metadata = Metadata.from_s3_metatdata(encryption_context.s3_metadata)
+    @property
+    def key_id(self) -> str:
+        return self._key_id
 
-        initial_material = self._decrypt_data_key_material(encryption_context=encryption_context)
+    def decrypt_params(self, encryption_context: EncryptionContext) -> Dict:
+        """Build the parameters of a KMS Decrypt request."""
+        metadata = encryption_context.metadata
+
+        shared_data_key = is_shared_data_key(metadata.key_wrapping_algorithm)
+        if shared_data_key and not self._accept_shared_data_keys:
+            raise MaterialsProviderError("Refusing to decrypt an object whose data key is shared within its bucket")
+        kms_encryption_context = _kms_encryption_context(encryption_context, shared_data_key)
+
+        encrypted_initial_material = metadata.wrapped_data_key
+
+        kms_params = dict(
+            CiphertextBlob=encrypted_initial_material,
+            EncryptionContext=kms_encryption_context,
+        )
 
+        return self._with_grant_tokens(kms_params)
+
+    def encrypt_params(self, encryption_context: EncryptionContext, initial_material: bytes) -> Dict:
+        """Build the parameters of a KMS Encrypt request."""
+        kms_params = dict(
+            KeyId=self._key_id,
+            Plaintext=initial_material,
+            EncryptionContext=_kms_encryption_context(encryption_context, encryption_context.shared_data_key),
+        )
+
+        return self._with_grant_tokens(kms_params)
+
+    def generate_data_key_params(self, encryption_context: EncryptionContext) -> Dict:
+        """Build the parameters of a KMS GenerateDataKey request."""
+        kms_params = dict(
+            KeyId=self._key_id,
+            NumberOfBytes=self._algorithm.data_key_length,
+            EncryptionContext=_kms_encryption_context(encryption_context, encryption_context.shared_data_key),
+        )
+
+        return self._with_grant_tokens(kms_params)
+
+    def decryption_materials(
+        self,
+        encryption_context: EncryptionContext,
+        initial_material: bytes,
+    ) -> EncryptionMaterials:
+        """Assemble decryption materials around a data key returned by KMS Decrypt."""
+        metadata = encryption_context.metadata
+
+        # Objects are decrypted with the suite they were written with, not necessarily the one this provider writes.
         data_key = DataKey(
-            algorithm=self._algorithm,
+            algorithm=metadata.algorithm(len(initial_material)),
             key=initial_material,
             iv=metadata.iv,
         )
@@ -48,28 +148,42 @@ class KmsMaterialsProvider(MaterialsProvider):
 
         return encryption_materials
 
-    def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
-        """Provide encryption materials."""
-        initial_material, encrypted_initial_material = self._generate_data_key_material(encryption_context)
-        material_description = encryption_context.material_description
-
-        iv = self._algorithm.generate_iv()
-
+    def encryption_materials(
+        self,
+        encryption_context: EncryptionContext,
+        initial_material: bytes,
+        encrypted_initial_material: bytes,
+    ) -> EncryptionMaterials:
+        """Assemble encryption materials around a data key returned by KMS GenerateDataKey."""
         data_key = DataKey(
             algorithm=self._algorithm,
             key=initial_material,
-            iv=iv,
+            iv=self._algorithm.generate_iv(),
         )
 
+        return self.wrapped_materials(encryption_context, data_key, encrypted_initial_material)
+
+    def wrapped_materials(
+        self,
+        encryption_context: EncryptionContext,
+        data_key: DataKey,
+        encrypted_initial_material: bytes,
+    ) -> EncryptionMaterials:
+        """Assemble encryption materials around a data key and its wrapped form."""
+        material_description = dict(encryption_context.material_description)
+
         material_description["aws:x-amz-cek-alg"] = "AES/GCM/NoPadding"
+        material_description[KMS_CMK_ID] = self._key_id
 
         metadata = Metadata(
-            iv=iv,
+            iv=data_key.iv,
             material_description=material_description,
-            key_wrapping_algorithm="kms",
-            content_encryption_algorithm=self._algorithm.name,
+            key_wrapping_algorithm=(
+                KMS_SHARED_KEY_WRAPPING_ALGORITHM if encryption_context.shared_data_key else KMS_KEY_WRAPPING_ALGORITHM
+            ),
+            content_encryption_algorithm=data_key.algorithm.name,
             wrapped_data_key=encrypted_initial_material,
-            tag_length=self._algorithm.tag_len * 8,
+            tag_length=data_key.algorithm.tag_len * 8,
             unencrypted_content_length=encryption_context.unencrypted_content_length,
         )
 
@@ -77,44 +191,116 @@ class KmsMaterialsProvider(MaterialsProvider):
 
         return encryption_materials
 
-    def _decrypt_data_key_material(self, encryption_context: EncryptionContext) -> bytes:
-        """Decrypt an encrypted data key."""
-        kms_encryption_context = _kms_encryption_context(encryption_context)
-        metadata = Metadata.from_s3_metatdata(encryption_context.s3_metadata)
+    def _with_grant_tokens(self, kms_params: Dict) -> Dict:
+        if self._grant_tokens:
+            kms_params["GrantTokens"] = self._grant_tokens
 
-        encrypted_initial_material = metadata.wrapped_data_key
+        return kms_params
 
-        kms_params = dict(
-            CiphertextBlob=encrypted_initial_material,
-            EncryptionContext=kms_encryption_context,
+
+class KmsMaterialsProvider(MaterialsProvider):
+    """Cryptographic materials provider for use with the AWS Key Management Service (KMS).
+
+    Concurrent decryptions of the same wrapped data key in the same encryption context share one KMS Decrypt request.
+    """
+
+    def __init__(
+        self,
+        key_id: str,
+        client: botocore.client.BaseClient,
+        grant_tokens=None,
+        algorithm: DataKeyAlgorithms = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16,
+        instrumentation: Optional[Instrumentation] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        accept_shared_data_keys: bool = False,
+    ) -> None:
+        """
+        :param key_id: Id or ARN of the KMS key that wraps the data keys
+        :param client: KMS client
+        :param grant_tokens: Grant tokens to send with every request
+        :param algorithm: Algorithm suite of new data keys
+        :param instrumentation: Receives the timings of the KMS requests
+        :param rate_limiter: Retries throttled requests and limits the request rate; shared by providers of one quota
+        :param bool accept_shared_data_keys: Decrypt objects whose data key is shared by several objects of the
+            bucket, as written through a CachingMaterialsProvider
+        """
+        self._materials = KmsMaterials(
+            key_id=key_id,
+            grant_tokens=grant_tokens,
+            algorithm=algorithm,
+            accept_shared_data_keys=accept_shared_data_keys,
         )
+        self._client = client
+        self._instrumentation = instrumentation if instrumentation is not None else NO_INSTRUMENTATION
+        self._rate_limiter = rate_limiter
+        self._decrypt_calls = SingleFlight()
 
-        if self._grant_tokens:
-            kms_params["GrantTokens"] = self._grant_tokens
+    @property
+    def key_id(self) -> str:
+        return self._materials.key_id
 
-        try:
-            response = self._client.decrypt(**kms_params)
+    @property
+    def key_wrapping_algorithm(self) -> str:
+        return KMS_KEY_WRAPPING_ALGORITHM
+
+    def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+        initial_material = self._decrypt_data_key_material(encryption_context=encryption_context)
+
+        return self._materials.decryption_materials(encryption_context, initial_material)
+
+    def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+        initial_material, encrypted_initial_material = self._generate_data_key_material(encryption_context)
+
+        return self._materials.encryption_materials(encryption_context, initial_material, encrypted_initial_material)
+
+    def rewrap_materials(self, encryption_context: EncryptionContext, data_key: DataKey) -> EncryptionMaterials:
+        """Provide encryption materials that wrap an existing data key under this provider's KMS key."""
+        encrypted_initial_material = self._encrypt_data_key_material(encryption_context, data_key.key)
+
+        return self._materials.wrapped_materials(encryption_context, data_key, encrypted_initial_material)
+
+    def _decrypt_data_key_material(self, encryption_context: EncryptionContext) -> bytes:
+        """Decrypt an encrypted data key."""
+        kms_params = self._materials.decrypt_params(encryption_context)
+
+        def decrypt() -> bytes:
+            response = self._request(KMS_DECRYPT, lambda: self._client.decrypt(**kms_params))
             return response["Plaintext"]
-        except (botocore.exceptions.ClientError, KeyError):
+
+        try:
+            initial_material, shared = self._decrypt_calls.do(_decrypt_request_key(kms_params), decrypt)
+        except (botocore.exceptions.ClientError, KeyError) as exc:
             message = "Failed to unwrap AWS KMS protected materials"
-            raise Exception(message)
+            raise MaterialsProviderError(message) from exc
+
+        if shared:
+            self._instrumentation.count(KMS_COALESCED)
+
+        return initial_material
+
+    def _encrypt_data_key_material(self, encryption_context: EncryptionContext, initial_material: bytes) -> bytes:
+        """Wrap existing data key material"""
+        kms_params = self._materials.encrypt_params(encryption_context, initial_material)
+
+        try:
+            response = self._request(KMS_ENCRYPT, lambda: self._client.encrypt(**kms_params))
+            return response["CiphertextBlob"]
+        except (botocore.exceptions.ClientError, KeyError) as exc:
+            message = "Failed to wrap materials using AWS KMS"
+            raise MaterialsProviderError(message) from exc
 
     def _generate_data_key_material(self, encryption_context: EncryptionContext) -> Tuple[bytes, bytes]:
         """Generate the data key material"""
-        key_id = self._key_id
-        key_length = self._algorithm.data_key_length
-        kms_params = dict(
-            KeyId=key_id,
-            NumberOfBytes=key_length,
-            EncryptionContext=_kms_encryption_context(encryption_context),
-        )
-
-        if self._grant_tokens:
-            kms_params["GrantTokens"] = self._grant_tokens
+        kms_params = self._materials.generate_data_key_params(encryption_context)
 
         try:
-            response = self._client.generate_data_key(**kms_params)
+            response = self._request(KMS_GENERATE_DATA_KEY, lambda: self._client.generate_data_key(**kms_params))
             return response["Plaintext"], response["CiphertextBlob"]
-        except (botocore.exceptions.ClientError, KeyError):
+        except (botocore.exceptions.ClientError, KeyError) as exc:
             message = "Failed to generate materials using AWS KMS"
-            raise Exception(message)
+            raise MaterialsProviderError(message) from exc
+
+    def _request(self, phase: str, request: Callable[[], Any]) -> Any:
+        return kms_request(phase, request, self._instrumentation, self._rate_limiter)
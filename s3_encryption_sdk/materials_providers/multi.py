@@ -0,0 +1,134 @@
+"""Cryptographic materials provider that combines the keys of several providers."""
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
+from typing import List, Optional, Sequence
+
+from ..exceptions import MaterialsProviderError
+from ..keys import DataKey
+from ..materials import EncryptionMaterials, Metadata
+from .base import MaterialsProvider
+from .context import EncryptionContext, unshared_key_wrapping_algorithm
+from .kms import KMS_CMK_ID
+
+
+class MultiKeyringMaterialsProvider(MaterialsProvider):
+    """Cryptographic materials provider that combines the keys of several providers.
+
+    New objects are encrypted with the first provider. An object is decrypted by the providers whose key wrapping
+    algorithm matches its ``x-amz-wrap-alg``: local keys, e.g. of a ``WrappedMaterialsProvider``, are tried first and
+    in order, so objects encrypted locally are read without a network call. Only then are the providers backed by a
+    KMS key asked, e.g. of a ``KmsMaterialsProvider`` or ``HierarchicalMaterialsProvider``, all at once, and the first
+    one to unwrap the data key wins; with providers for the regional replicas of a multi-region key this is the one
+    with the lowest latency. The other KMS requests are not cancelled once sent.
+    """
+
+    def __init__(self, providers: Sequence[MaterialsProvider], executor: Optional[Executor] = None) -> None:
+        """
+        :param providers: Providers in order of priority; the first one encrypts
+        :param executor: Executor for the concurrent KMS requests; defaults to a thread pool owned by this provider
+        """
+        if not providers:
+            raise ValueError("At least one materials provider is required")
+
+        self._providers = list(providers)
+        self._executor = executor
+        self._lock = threading.Lock()
+
+    @property
+    def providers(self) -> List[MaterialsProvider]:
+        return list(self._providers)
+
+    @property
+    def key_wrapping_algorithm(self) -> Optional[str]:
+        return self._providers[0].key_wrapping_algorithm
+
+    @property
+    def key_id(self) -> Optional[str]:
+        return self._providers[0].key_id
+
+    def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide encryption materials."""
+        return self._providers[0].encryption_materials(encryption_context)
+
+    def rewrap_materials(self, encryption_context: EncryptionContext, data_key: DataKey) -> EncryptionMaterials:
+        """Provide encryption materials that wrap an existing data key with the first provider."""
+        return self._providers[0].rewrap_materials(encryption_context, data_key)
+
+    def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
+        """Provide decryption materials."""
+        metadata = encryption_context.metadata
+        # Shared data keys are wrapped by the same providers, which decide whether they accept them.
+        key_wrapping_algorithm = unshared_key_wrapping_algorithm(metadata.key_wrapping_algorithm)
+        candidates = [
+            provider
+            for provider in self._providers
+            if provider.key_wrapping_algorithm in (None, key_wrapping_algorithm)
+        ]
+        if not candidates:
+            raise MaterialsProviderError(
+                "No materials provider for key wrapping algorithm %s" % metadata.key_wrapping_algorithm
+            )
+
+        local = [provider for provider in candidates if provider.key_id is None]
+        remote = [provider for provider in candidates if provider.key_id is not None]
+        error = None
+
+        for provider in local:
+            try:
+                return provider.decryption_materials(encryption_context)
+            except Exception as exc:  # pylint: disable=broad-except
+                error = exc
+
+        if remote:
+            try:
+                return self._first_decryption_materials(self._kms_candidates(remote, metadata), encryption_context)
+            except Exception as exc:  # pylint: disable=broad-except
+                error = exc
+
+        raise MaterialsProviderError("Failed to unwrap the data key with any of the materials providers") from error
+
+    @staticmethod
+    def _kms_candidates(providers: List[MaterialsProvider], metadata: Metadata) -> List[MaterialsProvider]:
+        """Narrow the KMS backed providers down to the key named in the material description, if any holds it."""
+        key_id = (metadata.material_description or {}).get(KMS_CMK_ID)
+        if key_id is None:
+            return providers
+
+        matching = [provider for provider in providers if provider.key_id == key_id]
+
+        return matching or providers
+
+    def _first_decryption_materials(
+        self,
+        providers: List[MaterialsProvider],
+        encryption_context: EncryptionContext,
+    ) -> EncryptionMaterials:
+        """Ask all providers concurrently and return the first materials that are provided."""
+        if len(providers) == 1:
+            return providers[0].decryption_materials(encryption_context)
+
+        futures = [
+            self._get_executor().submit(provider.decryption_materials, encryption_context) for provider in providers
+        ]
+        error = None
+
+        try:
+            for future in as_completed(futures):
+                try:
+                    return future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    error = exc
+        finally:
+            for future in futures:
+                future.cancel()
+
+        raise error
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(self._providers),
+                    thread_name_prefix="s3-encryption-keyring",
+                )
+            return self._executor
@@ -18,14 +18,19 @@ class WrappedMaterialsProvider(MaterialsProvider):
         self._wrapping_key = wrapping_key
         self._algorithm = algorithm
 
+    @property
+    def key_wrapping_algorithm(self) -> str:
+        return self._wrapping_key.algorithm_name
+
     def decryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
         """Provide decryption materials."""
-        metadata = Metadata.from_s3_metatdata(encryption_context.s3_metadata)
+        metadata = encryption_context.metadata
 
         initial_material = self._decrypt_data_key_material(encryption_context=encryption_context)
 
+        # Objects are decrypted with the suite they were written with, not necessarily the one this provider writes.
         data_key = DataKey(
-            algorithm=self._algorithm,
+            algorithm=metadata.algorithm(len(initial_material)),
             key=initial_material,
             iv=metadata.iv,
         )
@@ -37,33 +42,45 @@ class WrappedMaterialsProvider(MaterialsProvider):
     def encryption_materials(self, encryption_context: EncryptionContext) -> EncryptionMaterials:
         """Provide encryption materials."""
         initial_material, encrypted_initial_material = self._generate_data_key_material()
-        material_description = encryption_context.material_description
 
-        iv = self._algorithm.generate_iv()
+        data_key = DataKey(
+            algorithm=self._algorithm,
+            key=initial_material,
+            iv=self._algorithm.generate_iv(),
+        )
+
+        return self._wrapped_materials(encryption_context, data_key, encrypted_initial_material)
+
+    def rewrap_materials(self, encryption_context: EncryptionContext, data_key: DataKey) -> EncryptionMaterials:
+        """Provide encryption materials that wrap an existing data key under this provider's wrapping key."""
+        encrypted_initial_material = self._wrapping_key.wrap_data_key(data_key.key)
 
+        return self._wrapped_materials(encryption_context, data_key, encrypted_initial_material)
+
+    def _wrapped_materials(
+        self,
+        encryption_context: EncryptionContext,
+        data_key: DataKey,
+        encrypted_initial_material: bytes,
+    ) -> EncryptionMaterials:
+        """Assemble encryption materials around a data key and its wrapped form."""
         metadata = Metadata(
-            iv=iv,
-            material_description=material_description,
+            iv=data_key.iv,
+            material_description=encryption_context.material_description,
             key_wrapping_algorithm=self._wrapping_key.algorithm_name,
-            content_encryption_algorithm=self._algorithm.name,
+            content_encryption_algorithm=data_key.algorithm.name,
             wrapped_data_key=encrypted_initial_material,
-            tag_length=self._algorithm.tag_len * 8,
+            tag_length=data_key.algorithm.tag_len * 8,
             unencrypted_content_length=encryption_context.unencrypted_content_length,
         )
 
-        data_key = DataKey(
-            algorithm=self._algorithm,
-            key=initial_material,
-            iv=iv,
-        )
-
         encryption_materials = EncryptionMaterials(data_key=data_key, metadata=metadata)
 
         return encryption_materials
 
     def _decrypt_data_key_material(self, encryption_context: EncryptionContext) -> bytes:
         """Decrypt an encrypted data key."""
-        metadata = Metadata.from_s3_metatdata(encryption_context.s3_metadata)
+        metadata = encryption_context.metadata
         initial_material = self._wrapping_key.unwrap_data_key(metadata.wrapped_data_key)
 
         return initial_material
@@ -1,27 +1,111 @@
-import base64
-from botocore.response import StreamingBody
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib.parse import unquote
 
-from .keys import DataKey
+from boto3.s3.transfer import TransferConfig
+
+from .instruction_file import InstructionFiles, has_envelope, load_instruction_file, split_envelope
+from .instrumentation import (
+    BYTES_ENCRYPTED,
+    CIPHER,
+    MATERIALS,
+    NO_INSTRUMENTATION,
+    S3_GET,
+    S3_PUT,
+    Instrumentation,
+)
+from .materials.metadata import METADATA_KEYS
 from .materials_providers import EncryptionContext, MaterialsProvider
+from .pipeline import EncryptionPipeline
+from .streams import (
+    BODY_ENCODING_METADATA_KEY,
+    DEFAULT_CHUNK_SIZE,
+    RAW_BODY_ENCODING,
+    DecryptionStreamingBodyWrapper,
+    EncryptionStreamingBody,
+    UnauthenticatedRangeStreamingBodyWrapper,
+    body_encoding,
+    is_base64_encoded,
+    is_buffer,
+    plaintext_length,
+)
+from .transfer import (
+    UPLOAD_PART_ARGS,
+    MultipartUploadContext,
+    decrypt_in_place,
+    download_ranges,
+    copy_with_metadata,
+    upload_file,
+    upload_fileobj,
+)
 
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-\d+/(\d+)$")
 
-class DecryptionStreamingBodyWrapper(object):
-    def __init__(self, streaming_body: StreamingBody, data_key: DataKey) -> None:
-        self._streaming_body = streaming_body
-        self._data_key = data_key
+_AES_BLOCK_SIZE = 16
 
-    def read(self):
-        ciphertext = base64.b64decode(self._streaming_body.read())
-        return self._data_key.decrypt(ciphertext)
+# GCM tags are at most 16 bytes long.
+_MAX_TAG_LENGTH = 16
 
-    def __getattr__(self, name: str):
-        """Catch any method/attribute lookups that are not defined in this class and try
-        to find them on the provided bridge object.
-        :param str name: Attribute name
-        :returns: Result of asking the provided streaming object for that attribute name
-        :raises AttributeError: if attribute is not found on provided bridge object
-        """
-        return getattr(self._streaming_body, name)
+
+def _read_body(body) -> bytes:
+    if isinstance(body, str):
+        return body.encode()
+
+    if is_buffer(body):
+        return body
+
+    if hasattr(body, "read"):
+        return body.read()
+
+    return body
+
+
+# Size of the reads of the body while the materials of a get are resolved.
+_OVERLAP_READ_SIZE = 64 * 1024
+
+_MATERIALS_EXECUTOR = None
+_MATERIALS_EXECUTOR_LOCK = threading.Lock()
+
+
+def _materials_executor() -> ThreadPoolExecutor:
+    global _MATERIALS_EXECUTOR  # pylint: disable=global-statement
+    with _MATERIALS_EXECUTOR_LOCK:
+        if _MATERIALS_EXECUTOR is None:
+            _MATERIALS_EXECUTOR = ThreadPoolExecutor(thread_name_prefix="s3-encryption-materials")
+        return _MATERIALS_EXECUTOR
+
+
+def _read_while_pending(body, future: Future, limit: int) -> bytes:
+    """Read from a body until a future is done, the body ends or limit bytes were read."""
+    pieces = []
+    size = 0
+    while not future.done() and size < limit:
+        piece = body.read(min(_OVERLAP_READ_SIZE, limit - size))
+        if not piece:
+            break
+        pieces.append(piece)
+        size += len(piece)
+
+    return b"".join(pieces)
+
+
+def _copy_source(copy_source: Union[str, Dict]) -> Dict:
+    if isinstance(copy_source, dict):
+        return copy_source
+
+    path, _, version_id = copy_source.lstrip("/").partition("?versionId=")
+    bucket, _, key = path.partition("/")
+    copy_source = {"Bucket": bucket, "Key": unquote(key)}
+    if version_id:
+        copy_source["VersionId"] = version_id
+
+    return copy_source
 
 
 class EncryptedObject(object):
@@ -29,45 +113,569 @@ class EncryptedObject(object):
         self,
         materials_provider: MaterialsProvider,
         obj,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        base64_encode: bool = False,
+        executor: Optional[Executor] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        instruction_files: Optional[InstructionFiles] = None,
     ) -> None:
+        """
+        :param executor: Thread or process pool that encrypts in-memory bodies, see ``EncryptionPipeline``
+        :param instrumentation: Receives the timings of the phases of puts and gets
+        :param instruction_files: Store the encryption metadata in instruction files instead of the object metadata;
+            objects with instruction files are read either way
+        """
         self._materials_provider = materials_provider
         self._object = obj
+        self._chunk_size = chunk_size
+        self._base64_encode = base64_encode
+        self._pipeline = EncryptionPipeline(executor) if executor is not None else None
+        self._instrumentation = instrumentation if instrumentation is not None else NO_INSTRUMENTATION
+        self._instruction_files = instruction_files
+        self._multipart_uploads: Dict[str, MultipartUploadContext] = {}
 
     def put(self, Body, **kwargs):
+        """Encrypt and upload a body.
+
+        The body may be ``str``, a bytes-like object such as ``bytes``, ``bytearray``, ``memoryview`` or ``mmap``, a
+        file-like object or an iterator of byte chunks. It is encrypted in chunks of ``chunk_size`` bytes while being
+        uploaded, without copying bytes-like bodies first. Bodies of unknown length are spooled to a temporary file
+        first, since S3 needs the content length up front.
+
+        The body is stored as raw ``ciphertext || tag`` bytes like the other S3 encryption clients do, unless the
+        object was created with ``base64_encode`` for compatibility with readers of the legacy format.
+        """
+        unencrypted_content_length = plaintext_length(Body)
+
         encryption_context = EncryptionContext(
             bucket_name=self._object.bucket_name,
             object_key=self._object.key,
-            unencrypted_content_length=len(Body),
+            unencrypted_content_length=unencrypted_content_length,
         )
 
-        materials = self._materials_provider.encryption_materials(encryption_context)
+        with self._instrumentation.phase(MATERIALS):
+            materials = self._materials_provider.encryption_materials(encryption_context)
 
         metadata = kwargs.pop("Metadata", {})
 
         metadata.update(**materials.metadata.generate())
 
-        encrypted_body = materials.data_key.encrypt(Body.encode())
+        metadata[BODY_ENCODING_METADATA_KEY] = body_encoding(self._base64_encode)
+
+        instrumentation = self._instrumentation
+
+        if self._pipeline is not None and (isinstance(Body, str) or is_buffer(Body)):
+            with instrumentation.phase(CIPHER):
+                encrypted_body = self._pipeline.encrypt(materials.data_key, _read_body(Body), self._base64_encode)
+            instrumentation.count(BYTES_ENCRYPTED, unencrypted_content_length)
+            with encrypted_body:
+                return self._put(encrypted_body, metadata, kwargs)
+
+        body = EncryptionStreamingBody(
+            body=Body,
+            data_key=materials.data_key,
+            chunk_size=self._chunk_size,
+            base64_encode=self._base64_encode,
+            instrumentation=instrumentation,
+        )
+
+        if unencrypted_content_length is None:
+            encrypted_body = body.spool()
+            metadata["x-amz-unencrypted-content-length"] = str(body.plaintext_bytes)
+            instrumentation.count(BYTES_ENCRYPTED, body.plaintext_bytes)
+            with encrypted_body:
+                return self._put(encrypted_body, metadata, kwargs)
+
+        # The body may be rewound and encrypted again by the request, so its plaintext is counted here once.
+        instrumentation.count(BYTES_ENCRYPTED, unencrypted_content_length)
+        try:
+            return self._put(body, metadata, kwargs)
+        finally:
+            body.close()
+
+    def _put(self, body, metadata: Dict[str, str], kwargs: Dict):
+        object_metadata = self._store_instruction_file(metadata)
+
+        with self._instrumentation.phase(S3_PUT):
+            response = self._object.put(Body=body, Metadata=object_metadata, **kwargs)
+
+        self._remember_instruction_file(response["ETag"], metadata)
+
+        return response
+
+    def _remember_instruction_file(self, etag: str, metadata: Dict[str, str]) -> None:
+        if self._instruction_files is not None:
+            _, envelope = split_envelope(metadata)
+            self._instruction_files.remember(self._object.bucket_name, self._object.key, etag, envelope)
+
+    def _store_instruction_file(self, metadata: Dict[str, str]) -> Dict[str, str]:
+        """Write the instruction file if they are used, and return the metadata to store with the object."""
+        if self._instruction_files is None:
+            return metadata
+
+        return self._instruction_files.put(
+            self._object.meta.client,
+            bucket=self._object.bucket_name,
+            key=self._object.key,
+            s3_metadata=metadata,
+        )
+
+    def _prefetch_instruction_file(self):
+        if self._instruction_files is None:
+            return None
+
+        return self._instruction_files.prefetch(self._object.meta.client, self._object.bucket_name, self._object.key)
+
+    def _resolve_metadata(
+        self,
+        bucket: str,
+        key: str,
+        etag: str,
+        s3_metadata: Dict[str, str],
+        prefetched=None,
+    ) -> Dict[str, str]:
+        """Complete the metadata of an object with its instruction file, if it has one."""
+        client = self._object.meta.client
+
+        if self._instruction_files is not None:
+            return self._instruction_files.resolve(client, bucket, key, etag, s3_metadata, prefetched)
+
+        if has_envelope(s3_metadata):
+            return s3_metadata
+
+        s3_metadata = dict(s3_metadata)
+        s3_metadata.update(load_instruction_file(client, bucket, key))
+
+        return s3_metadata
+
+    def create_multipart_upload(self, UnencryptedContentLength: Optional[int] = None, **kwargs):
+        """Start an encrypted multipart upload.
+
+        Multipart uploads always store raw ``ciphertext || tag`` bytes. Parts have to be uploaded in order through
+        this object, because they share one GCM stream.
+        """
+        encryption_context = EncryptionContext(
+            bucket_name=self._object.bucket_name,
+            object_key=self._object.key,
+            unencrypted_content_length=UnencryptedContentLength,
+        )
+
+        with self._instrumentation.phase(MATERIALS):
+            materials = self._materials_provider.encryption_materials(encryption_context)
+
+        metadata = kwargs.pop("Metadata", {})
+
+        metadata.update(**materials.metadata.generate())
+        metadata[BODY_ENCODING_METADATA_KEY] = RAW_BODY_ENCODING
+
+        response = self._object.meta.client.create_multipart_upload(
+            Bucket=self._object.bucket_name,
+            Key=self._object.key,
+            Metadata=self._store_instruction_file(metadata),
+            **kwargs,
+        )
+
+        self._multipart_uploads[response["UploadId"]] = MultipartUploadContext(materials.data_key)
+
+        return response
+
+    def encrypt_part(self, UploadId: str, PartNumber: int, Body, IsLastPart: bool = False) -> bytes:
+        """Encrypt the next part of a multipart upload without uploading it."""
+        try:
+            context = self._multipart_uploads[UploadId]
+        except KeyError:
+            raise ValueError("Unknown multipart upload %s; it must be created through this object" % UploadId)
+
+        return context.encrypt_part(PartNumber, _read_body(Body), IsLastPart)
+
+    def upload_part(self, UploadId: str, PartNumber: int, Body, IsLastPart: bool = False, **kwargs):
+        """Encrypt and upload the next part of a multipart upload.
+
+        The authentication tag is appended to the part flagged with ``IsLastPart``.
+        """
+        # Checksums and lengths computed by the caller describe the plaintext, not the uploaded ciphertext.
+        kwargs.pop("ContentLength", None)
+        kwargs.pop("ContentMD5", None)
+
+        ciphertext = self.encrypt_part(UploadId=UploadId, PartNumber=PartNumber, Body=Body, IsLastPart=IsLastPart)
+
+        return self._object.meta.client.upload_part(
+            Bucket=self._object.bucket_name,
+            Key=self._object.key,
+            UploadId=UploadId,
+            PartNumber=PartNumber,
+            Body=ciphertext,
+            **kwargs,
+        )
+
+    def complete_multipart_upload(self, UploadId: str, **kwargs):
+        context = self._multipart_uploads.get(UploadId)
+        if context is not None and not context.has_final_part:
+            raise ValueError("The last part of an encrypted multipart upload must be uploaded with IsLastPart=True")
+
+        response = self._object.meta.client.complete_multipart_upload(
+            Bucket=self._object.bucket_name,
+            Key=self._object.key,
+            UploadId=UploadId,
+            **kwargs,
+        )
+
+        self._multipart_uploads.pop(UploadId, None)
+
+        return response
+
+    def abort_multipart_upload(self, UploadId: str, **kwargs):
+        self._multipart_uploads.pop(UploadId, None)
+
+        return self._object.meta.client.abort_multipart_upload(
+            Bucket=self._object.bucket_name,
+            Key=self._object.key,
+            UploadId=UploadId,
+            **kwargs,
+        )
+
+    def upload_fileobj(
+        self,
+        Fileobj,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ):
+        """Encrypt and upload a file-like object, using a multipart upload for large objects.
+
+        Part size, multipart threshold and concurrency are taken from the ``TransferConfig``. Multipart uploads of
+        file-like objects of unknown length do not record ``x-amz-unencrypted-content-length``.
+        """
+        return upload_fileobj(self, fileobj=Fileobj, extra_args=ExtraArgs, callback=Callback, config=Config)
+
+    def upload_file(
+        self,
+        Filename: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ):
+        """Encrypt and upload a local file, using a multipart upload for large files.
+
+        The file is memory-mapped and encrypted in slices, so it is never read into memory as a whole.
+        """
+        return upload_file(self, filename=Filename, extra_args=ExtraArgs, callback=Callback, config=Config)
+
+    def rewrap(
+        self,
+        materials_provider: MaterialsProvider,
+        Config: Optional[TransferConfig] = None,
+        **kwargs,
+    ) -> Dict[str, str]:
+        """Wrap the data key of the object under another materials provider, e.g. to rotate keys.
+
+        Only the metadata is replaced, by copying the object onto itself; the content is neither transferred nor
+        re-encrypted. Objects of more than 5 GiB are copied part by part, which does not keep their tags. The copy
+        fails if the object changed since its metadata was read.
+
+        :param materials_provider: Provider that wraps the data key from now on
+        :param Config: Transfer configuration of multipart copies
+        :returns: New metadata of the object
+        """
+        copy_source = {"Bucket": self._object.bucket_name, "Key": self._object.key}
+
+        _, metadata = self._copy(copy_source, materials_provider, Config, kwargs)
+
+        return metadata
+
+    def copy_from(self, CopySource, Config: Optional[TransferConfig] = None, **kwargs):
+        """Copy an encrypted object to this one server-side.
+
+        The data key is bound to the bucket and key of the object, so it is unwrapped for the source and wrapped
+        again for this object; the ciphertext is copied by S3 as it is. Objects of more than 5 GiB are copied part
+        by part. The copy fails if the source changed since its metadata was read.
+
+        :param CopySource: ``{"Bucket": ..., "Key": ..., "VersionId": ...}`` or ``"bucket/key"`` of the source
+        :param Config: Transfer configuration of multipart copies
+        :returns: ``CopyObject`` response, or None for a multipart copy
+        """
+        response, _ = self._copy(_copy_source(CopySource), self._materials_provider, Config, kwargs)
+
+        return response
+
+    def _copy(
+        self,
+        copy_source: Dict,
+        materials_provider: MaterialsProvider,
+        config: Optional[TransferConfig],
+        extra_args: Dict,
+    ) -> Tuple[Optional[Dict], Dict[str, str]]:
+        """Copy an object to this one, wrapping its data key with a materials provider for this object."""
+        client = self._object.meta.client
+        head = client.head_object(
+            **copy_source,
+            **{name: value for name, value in extra_args.items() if name in UPLOAD_PART_ARGS},
+        )
 
-        return self._object.put(Body=base64.b64encode(encrypted_body).decode(), Metadata=metadata, **kwargs)
+        s3_metadata = self._resolve_metadata(copy_source["Bucket"], copy_source["Key"], head["ETag"], head["Metadata"])
 
-    def get(self):
-        obj = self._object.get()
+        source_context = EncryptionContext(
+            bucket_name=copy_source["Bucket"],
+            object_key=copy_source["Key"],
+            s3_metadata=s3_metadata,
+        )
+
+        with self._instrumentation.phase(MATERIALS):
+            materials = self._materials_provider.decryption_materials(source_context)
+
+        encryption_context = EncryptionContext(
+            bucket_name=self._object.bucket_name,
+            object_key=self._object.key,
+            unencrypted_content_length=materials.metadata.unencrypted_content_length,
+        )
+
+        with self._instrumentation.phase(MATERIALS):
+            rewrapped = materials_provider.rewrap_materials(encryption_context, materials.data_key)
+
+        metadata = {name: value for name, value in head["Metadata"].items() if name not in METADATA_KEYS}
+        metadata.update(rewrapped.metadata.generate())
+
+        object_metadata = self._store_instruction_file(metadata)
+        in_place = (copy_source["Bucket"], copy_source["Key"]) == (self._object.bucket_name, self._object.key)
+
+        if self._instruction_files is not None and in_place and not has_envelope(head["Metadata"]):
+            # Only the instruction file changed, so the object itself does not have to be copied.
+            self._remember_instruction_file(head["ETag"], metadata)
+            return None, metadata
 
+        response = copy_with_metadata(
+            client,
+            copy_source=copy_source,
+            bucket=self._object.bucket_name,
+            key=self._object.key,
+            head=head,
+            metadata=object_metadata,
+            extra_args=extra_args,
+            config=config,
+        )
+
+        if response is not None:
+            self._remember_instruction_file(response["CopyObjectResult"]["ETag"], metadata)
+
+        return response, metadata
+
+    def _decryption_materials(self, s3_metadata: Dict[str, str]):
         encryption_context = EncryptionContext(
             bucket_name=self._object.bucket_name,
             object_key=self._object.key,
-            s3_metadata=obj["Metadata"],
+            s3_metadata=s3_metadata,
         )
 
-        materials = self._materials_provider.decryption_materials(encryption_context)
+        with self._instrumentation.phase(MATERIALS):
+            return self._materials_provider.decryption_materials(encryption_context)
+
+    def get(self, **kwargs):
+        """Download and decrypt the object.
 
-        obj["Body"] = DecryptionStreamingBodyWrapper(
+        A ``Range`` is translated into a ciphertext range, and only those bytes are fetched and decrypted with
+        AES-CTR. The tag of such partial reads cannot be checked, so their responses are marked with
+        ``Unauthenticated``.
+        """
+        byte_range = kwargs.pop("Range", None)
+        if byte_range is not None:
+            return self._get_range(byte_range, **kwargs)
+
+        # The instruction file is read while the object is requested.
+        prefetched = self._prefetch_instruction_file()
+
+        with self._instrumentation.phase(S3_GET):
+            obj = self._object.get(**kwargs)
+
+        # Materials are resolved, e.g. by a KMS request, while the first bytes of the body are downloaded.
+        resolving = _materials_executor().submit(self._resolve_materials, obj["ETag"], obj["Metadata"], prefetched)
+        try:
+            raw = _read_while_pending(obj["Body"], resolving, self._chunk_size)
+            s3_metadata, materials = resolving.result()
+        except BaseException:
+            obj["Body"].close()
+            raise
+
+        body = DecryptionStreamingBodyWrapper(
             streaming_body=obj["Body"],
             data_key=materials.data_key,
+            base64_encoded=is_base64_encoded(s3_metadata),
+            chunk_size=self._chunk_size,
+            instrumentation=self._instrumentation,
         )
+        body.feed(raw)
+        obj["Body"] = body
 
         return obj
 
+    def _resolve_materials(self, etag: str, s3_metadata: Dict[str, str], prefetched=None):
+        s3_metadata = self._resolve_metadata(self._object.bucket_name, self._object.key, etag, s3_metadata, prefetched)
+
+        return s3_metadata, self._decryption_materials(s3_metadata)
+
+    def prefetch_materials(self, **kwargs) -> None:
+        """Resolve the decryption materials of the object ahead of a get, without downloading it.
+
+        Only the object's metadata is requested. This warms the cache of a ``CachingMaterialsProvider`` and the
+        instruction file cache, so a later get does not wait for a KMS request; other providers keep nothing.
+        """
+        head = self._object.meta.client.head_object(Bucket=self._object.bucket_name, Key=self._object.key, **kwargs)
+
+        self._resolve_materials(head["ETag"], head["Metadata"])
+
+    def _get_range(self, byte_range: str, **kwargs):
+        match = _RANGE_PATTERN.match(byte_range.strip())
+        if match is None or match.groups() == ("", ""):
+            raise ValueError("Unsupported range %r; expected a single range such as 'bytes=0-1023'" % byte_range)
+
+        first, last = match.groups()
+        first = int(first) if first else None
+        last = int(last) if last else None
+
+        if first is None:
+            # Suffix ranges also have to cover the authentication tag at the end of the ciphertext.
+            ciphertext_range = "bytes=-%d" % (last + _MAX_TAG_LENGTH)
+        else:
+            if last is not None and last < first:
+                raise ValueError("Invalid range %r" % byte_range)
+            # Start at an AES block boundary, so that the CTR counter can be derived from the IV.
+            start = first - first % _AES_BLOCK_SIZE
+            ciphertext_range = "bytes=%d-%s" % (start, "" if last is None else last)
+
+        prefetched = self._prefetch_instruction_file()
+
+        with self._instrumentation.phase(S3_GET):
+            obj = self._object.get(Range=ciphertext_range, **kwargs)
+
+        offset, total = 0, obj["ContentLength"]
+        content_range = _CONTENT_RANGE_PATTERN.match(obj.get("ContentRange", ""))
+        if content_range is not None:
+            offset, total = int(content_range.group(1)), int(content_range.group(2))
+
+        s3_metadata = self._resolve_metadata(
+            self._object.bucket_name, self._object.key, obj["ETag"], obj["Metadata"], prefetched
+        )
+        materials = self._decryption_materials(s3_metadata)
+        tag_length = materials.data_key.algorithm.tag_len
+
+        if is_base64_encoded(s3_metadata):
+            obj["Body"].close()
+            raise ValueError("Ranged gets are not supported for base64-encoded objects")
+
+        plaintext_total = total - tag_length
+        if first is None:
+            first, last = max(0, plaintext_total - last), plaintext_total - 1
+        else:
+            last = plaintext_total - 1 if last is None else min(last, plaintext_total - 1)
+
+        if first > last:
+            obj["Body"].close()
+            raise ValueError("Range %r is not satisfiable for an object of %d bytes" % (byte_range, plaintext_total))
+
+        obj["Body"] = UnauthenticatedRangeStreamingBodyWrapper(
+            streaming_body=obj["Body"],
+            data_key=materials.data_key,
+            offset=offset,
+            skip=first - offset,
+            length=last - first + 1,
+            chunk_size=self._chunk_size,
+        )
+        obj["ContentLength"] = last - first + 1
+        obj["ContentRange"] = "bytes %d-%d/%d" % (first, last, plaintext_total)
+        obj["Unauthenticated"] = True
+
+        return obj
+
+    def _download(self, fileobj, extra_args: Optional[Dict], callback, config: Optional[TransferConfig]) -> None:
+        """Download, decrypt and authenticate the object into a seekable binary file."""
+        extra_args = dict(extra_args or {})
+        client = self._object.meta.client
+
+        head = client.head_object(Bucket=self._object.bucket_name, Key=self._object.key, **extra_args)
+        s3_metadata, materials = self._resolve_materials(head["ETag"], head["Metadata"])
+        size = head["ContentLength"]
+
+        if is_base64_encoded(s3_metadata):
+            # Streamed like a get, but decrypted with the materials resolved for the inspected version.
+            with self._instrumentation.phase(S3_GET):
+                obj = self._object.get(IfMatch=head["ETag"], **extra_args)
+
+            body = DecryptionStreamingBodyWrapper(
+                streaming_body=obj["Body"],
+                data_key=materials.data_key,
+                base64_encoded=True,
+                chunk_size=self._chunk_size,
+                instrumentation=self._instrumentation,
+            )
+            try:
+                for chunk in iter(lambda: body.read(self._chunk_size), b""):
+                    fileobj.write(chunk)
+                    if callback is not None:
+                        callback(len(chunk))
+            finally:
+                body.close()
+            return
+
+        # Pin all ranges to the version that was inspected.
+        extra_args["IfMatch"] = head["ETag"]
+
+        download_ranges(
+            client=client,
+            bucket=self._object.bucket_name,
+            key=self._object.key,
+            fileobj=fileobj,
+            size=size,
+            extra_args=extra_args,
+            config=config,
+        )
+
+        decrypt_in_place(
+            fileobj=fileobj,
+            data_key=materials.data_key,
+            size=size,
+            chunk_size=self._chunk_size,
+            callback=callback,
+        )
+
+    def download_fileobj(
+        self,
+        Fileobj,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ) -> None:
+        """Download and decrypt the object into a file-like object.
+
+        Byte ranges are fetched concurrently into a temporary file, which is decrypted and authenticated before
+        anything is written to ``Fileobj``.
+        """
+        with tempfile.TemporaryFile() as temp:
+            self._download(temp, ExtraArgs, Callback, Config)
+            temp.seek(0)
+            shutil.copyfileobj(temp, Fileobj, self._chunk_size)
+
+    def download_file(
+        self,
+        Filename: str,
+        ExtraArgs: Optional[Dict] = None,
+        Callback: Optional[Callable[[int], None]] = None,
+        Config: Optional[TransferConfig] = None,
+    ) -> None:
+        """Download and decrypt the object to a file.
+
+        Byte ranges are fetched concurrently and written to a temporary file next to ``Filename`` with positional
+        writes. The file only replaces ``Filename`` after the authentication tag was verified.
+        """
+        directory, basename = os.path.split(os.path.abspath(Filename))
+        fd, temp_name = tempfile.mkstemp(dir=directory, prefix=basename + ".")
+
+        try:
+            with os.fdopen(fd, "r+b") as temp:
+                self._download(temp, ExtraArgs, Callback, Config)
+            os.replace(temp_name, Filename)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+
     def __getattr__(self, name: str):
         """Catch any method/attribute lookups that are not defined in this class and try
         to find them on the provided bridge object.
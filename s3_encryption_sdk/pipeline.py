@@ -0,0 +1,183 @@
+"""Encryption of in-memory object bodies on thread or process pools."""
+import base64
+import io
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from .keys import DataKey, DataKeyAlgorithms
+from .streams import encrypted_length
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    resource_tracker = shared_memory = None
+
+# Smaller bodies are encrypted in the calling thread, handing them to a pool costs more than it saves.
+OFFLOAD_THRESHOLD = 64 * 1024
+
+
+def encrypt_body(data_key: DataKey, plaintext, base64_encode: bool = False) -> bytes:
+    """Encrypt an in-memory body into the form it is stored in."""
+    ciphertext = data_key.encrypt(plaintext)
+    if base64_encode:
+        return base64.b64encode(ciphertext)
+    return ciphertext
+
+
+def _encrypt_pickled(algorithm: DataKeyAlgorithms, key: bytes, iv: bytes, plaintext: bytes, base64_encode: bool):
+    return encrypt_body(DataKey(algorithm=algorithm, key=key, iv=iv), plaintext, base64_encode)
+
+
+def _tracker_name(block) -> str:
+    """Name a shared memory block is registered under with the resource tracker."""
+    return "/" + block.name
+
+
+def _attach_shared(name: str):
+    """Attach to a shared memory block that the calling process owns and unlinks.
+
+    The block must not stay registered with the resource tracker of the worker, which would warn about it as leaked,
+    and unlink it, once the worker exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        block = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(_tracker_name(block), "shared_memory")
+        return block
+
+
+def _encrypt_shared(
+    name: str,
+    length: int,
+    algorithm: DataKeyAlgorithms,
+    key: bytes,
+    iv: bytes,
+    base64_encode: bool,
+) -> int:
+    """Encrypt the plaintext at the start of a shared memory block in place.
+
+    :returns: Length of the stored body, which replaces the plaintext in the block
+    """
+    block = _attach_shared(name)
+    try:
+        data_key = DataKey(algorithm=algorithm, key=key, iv=iv)
+        # GCM preserves lengths, so the ciphertext overwrites the plaintext and the tag follows it.
+        written = data_key.encrypt_into(block.buf[:length], block.buf)
+        if base64_encode:
+            encoded = base64.b64encode(block.buf[:written])
+            block.buf[: len(encoded)] = encoded
+            written = len(encoded)
+        return written
+    finally:
+        block.close()
+
+
+def _free_shared(block) -> None:
+    """Close and unlink a shared memory block created by this process."""
+    if os.name == "posix":
+        # Workers that share the tracker of this process unregistered the block from it, which unlinking expects.
+        resource_tracker.register(_tracker_name(block), "shared_memory")
+    block.close()
+    block.unlink()
+
+
+class _SharedBody(io.RawIOBase):
+    """Read-only file over a stored body in a shared memory block, which is freed once the file is closed."""
+
+    def __init__(self, block, length: int) -> None:
+        super().__init__()
+        self._block = block
+        self._view = block.buf[:length]
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        with self._view[self._position : self._position + len(buffer)] as chunk:
+            memoryview(buffer).cast("B")[: len(chunk)] = chunk
+            self._position += len(chunk)
+            return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(offset, 0)
+        return self._position
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+            _free_shared(self._block)
+        super().close()
+
+
+class EncryptionPipeline(object):
+    """Encrypts in-memory object bodies on an executor.
+
+    A ``ThreadPoolExecutor`` runs ``DataKey.encrypt`` and the base64 encoding on its threads. A
+    ``ProcessPoolExecutor`` takes them off the GIL altogether; bodies are then exchanged through shared memory
+    blocks that the worker encrypts in place and that are uploaded from, so payloads are never pickled or copied.
+    Only the data key is sent to the worker process. On Python versions without ``multiprocessing.shared_memory``
+    the body is pickled instead.
+
+    Bodies smaller than ``offload_threshold`` bytes are encrypted in the calling thread.
+
+    Process pools should use the ``spawn`` or ``forkserver`` start method, since forking a process that already
+    runs threads, e.g. those of a boto3 transfer or of ``put_objects``, can deadlock the child.
+    """
+
+    def __init__(self, executor: Executor, offload_threshold: int = OFFLOAD_THRESHOLD) -> None:
+        self._executor = executor
+        self._offload_threshold = offload_threshold
+        self._processes = isinstance(executor, ProcessPoolExecutor)
+
+    def encrypt(self, data_key: DataKey, plaintext, base64_encode: bool = False) -> io.IOBase:
+        """Encrypt a bytes-like body on the executor and wait for the stored body.
+
+        :returns: Read-only file holding the stored body; close it once it is uploaded to free the shared memory
+        """
+        plaintext = memoryview(plaintext).cast("B")
+
+        if len(plaintext) < self._offload_threshold:
+            return io.BytesIO(encrypt_body(data_key, plaintext, base64_encode))
+
+        if not self._processes:
+            return io.BytesIO(self._executor.submit(encrypt_body, data_key, plaintext, base64_encode).result())
+
+        key_args = (data_key.algorithm, data_key.key, data_key.iv)
+
+        if shared_memory is None:
+            future = self._executor.submit(_encrypt_pickled, *key_args, bytes(plaintext), base64_encode)
+            return io.BytesIO(future.result())
+
+        size = encrypted_length(len(plaintext), data_key.algorithm.tag_len, base64_encode)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            block.buf[: len(plaintext)] = plaintext
+            written = self._executor.submit(
+                _encrypt_shared, block.name, len(plaintext), *key_args, base64_encode
+            ).result()
+        except BaseException:
+            _free_shared(block)
+            raise
+
+        # The body is uploaded straight from the block instead of being copied out of it.
+        return _SharedBody(block, written)
+
+    @property
+    def executor(self) -> Executor:
+        return self._executor
@@ -0,0 +1,174 @@
+"""Client-side rate limiting and retries of throttled requests to a key management service."""
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import botocore
+
+from .exceptions import ThrottlingError
+
+THROTTLING_ERROR_CODES = frozenset(
+    (
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestLimitExceeded",
+        "TooManyRequestsException",
+    )
+)
+
+
+def is_throttling_error(exc: Exception) -> bool:
+    """Tell whether a botocore error reports throttling."""
+    return (
+        isinstance(exc, botocore.exceptions.ClientError)
+        and exc.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+    )
+
+
+class AdaptiveRateLimiter(object):
+    """Retries throttled requests with jittered backoff and adapts the request rate to the throttling.
+
+    Requests are not limited until the service throttles one. The rate is then cut to a fraction of the rate at which
+    requests were sent; requests throttled within ``throttle_window`` seconds of that belong to the same episode and do
+    not cut it again. While requests succeed the rate grows back along a cubic curve, like TCP CUBIC: quickly at
+    first, levelling off around the rate sent before the episode, then probing beyond it, though not beyond twice the
+    measured sending rate. One limiter shared by several providers or clients keeps all of their requests within the
+    same quota.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.05,
+        max_delay: float = 5.0,
+        min_rate: float = 0.5,
+        backoff: float = 0.7,
+        increase: float = 1.0,
+        throttle_window: float = 1.0,
+    ) -> None:
+        """
+        :param max_attempts: Attempts of a request, including the first one, before it fails with a ``ThrottlingError``
+        :param base_delay: Upper bound in seconds of the random delay before the first retry, doubled for each retry
+        :param max_delay: Upper bound in seconds of the delay before any retry
+        :param min_rate: Lowest rate in requests per second the limiter slows down to
+        :param backoff: Fraction of the rate that remains after a request was throttled
+        :param increase: Scale of the cubic growth of the rate, in requests per second per second cubed
+        :param throttle_window: Seconds after a cut of the rate during which throttled requests do not cut it again
+        """
+        if max_attempts < 1:
+            raise ValueError("At least one attempt is required")
+
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._min_rate = min_rate
+        self._backoff = backoff
+        self._increase = increase
+        self._throttle_window = throttle_window
+
+        self._rate: Optional[float] = None
+        self._last_max_rate = 0.0
+        self._last_decrease = 0.0
+        self._tokens = 0.0
+        self._last_refill = 0.0
+        self._measured_rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Current limit in requests per second, or ``None`` while requests are not limited."""
+        return self._rate
+
+    def call(self, function: Callable[[], Any], on_throttled: Optional[Callable[[], None]] = None) -> Any:
+        """Call a function that sends one request, retrying it while it is throttled.
+
+        :param on_throttled: Called for every throttled attempt
+        :raises ThrottlingError: If the last attempt was throttled as well
+        """
+        for attempt in range(self._max_attempts):
+            self.acquire()
+            try:
+                result = function()
+            except botocore.exceptions.ClientError as exc:
+                if not is_throttling_error(exc):
+                    raise
+                self.throttled()
+                if on_throttled is not None:
+                    on_throttled()
+                if attempt + 1 == self._max_attempts:
+                    raise ThrottlingError("Request still throttled after %d attempts" % self._max_attempts) from exc
+                time.sleep(self.delay(attempt))
+            else:
+                self.succeeded()
+                return result
+
+    def delay(self, attempt: int) -> float:
+        """Random delay in seconds before retrying the given attempt, counted from 0 ("full jitter")."""
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            self._measure(now)
+
+            if self._rate is None:
+                return
+
+            self._tokens = min(max(self._rate, 1.0), self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        """Slow down after a request was throttled."""
+        with self._lock:
+            now = time.monotonic()
+
+            if self._rate is None:
+                sending_rate = max(self._sending_rate(now), self._min_rate)
+                self._tokens = 0.0
+                self._last_refill = now
+            elif now - self._last_decrease < self._throttle_window:
+                # Requests sent before the last cut are still being throttled; the cut already accounts for them.
+                return
+            else:
+                sending_rate = self._rate
+
+            self._last_max_rate = sending_rate
+            self._rate = max(self._min_rate, sending_rate * self._backoff)
+            self._last_decrease = now
+
+    def succeeded(self) -> None:
+        """Speed up again after a request succeeded."""
+        with self._lock:
+            if self._rate is None:
+                return
+
+            now = time.monotonic()
+            # The curve starts at the cut rate, reaches the rate before the cut after ``time_to_max`` seconds and
+            # grows ever faster past it, so a quota that was raised is found again.
+            time_to_max = (self._last_max_rate * (1 - self._backoff) / self._increase) ** (1 / 3.0)
+            cubic_rate = self._increase * (now - self._last_decrease - time_to_max) ** 3 + self._last_max_rate
+            # Idle periods do not count as probing: the rate only grows up to twice the rate requests are sent at.
+            self._rate = max(self._rate, min(cubic_rate, 2 * self._sending_rate(now)))
+
+    def _sending_rate(self, now: float) -> float:
+        """Rate of the last complete window, or a lower bound of the rate of the current one if that is higher."""
+        return max(self._measured_rate, self._window_count / max(now - self._window_start, 1.0))
+
+    def _measure(self, now: float) -> None:
+        """Track the rate at which requests are sent, in windows of one second."""
+        self._window_count += 1
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self._measured_rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
@@ -0,0 +1,545 @@
+"""File-like wrappers that encrypt and decrypt S3 object bodies incrementally."""
+import base64
+import collections
+import io
+import mmap
+import tempfile
+from typing import Dict, Iterator, List, Optional
+
+from botocore.response import StreamingBody
+from cryptography.exceptions import InvalidTag
+
+from .instrumentation import BYTES_DECRYPTED, CIPHER, ENCODING, NO_INSTRUMENTATION, Instrumentation
+from .keys import DataKey
+from .keys.data_key import update_into
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Marks bodies stored base64-encoded rather than as raw ``ciphertext || tag`` bytes.
+BODY_ENCODING_METADATA_KEY = "x-amz-body-encoding"
+BASE64_BODY_ENCODING = "base64"
+RAW_BODY_ENCODING = "raw"
+
+
+def is_buffer(body) -> bool:
+    """Whether the body is an in-memory bytes-like object, including a memory-mapped file."""
+    return isinstance(body, (bytes, bytearray, memoryview, mmap.mmap))
+
+
+def _is_file(body) -> bool:
+    return hasattr(body, "read") and not is_buffer(body)
+
+
+class _ReadBuffer(object):
+    """Queue of produced chunks that serves reads with at most one copy of the data.
+
+    A read that consumes a whole ``bytes`` chunk returns that chunk itself.
+    """
+
+    def __init__(self) -> None:
+        self._chunks = collections.deque()
+        self._size = 0
+
+    def append(self, chunk) -> None:
+        chunk = memoryview(chunk).cast("B")
+        if chunk:
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if amt is None or amt < 0 or amt > self._size:
+            amt = self._size
+
+        first = self._chunks[0] if self._chunks else None
+        if first is not None and len(first) == amt and type(first.obj) is bytes and len(first.obj) == amt:
+            self._chunks.popleft()
+            self._size -= amt
+            return first.obj
+
+        return b"".join(self._pieces(amt))
+
+    def readinto(self, view: memoryview) -> int:
+        amt = min(len(view), self._size)
+        position = 0
+        for chunk in self._pieces(amt):
+            view[position : position + len(chunk)] = chunk
+            position += len(chunk)
+
+        return amt
+
+    def _pieces(self, amt: int) -> List[memoryview]:
+        pieces = []
+        while amt:
+            chunk = self._chunks[0]
+            if len(chunk) <= amt:
+                self._chunks.popleft()
+            else:
+                self._chunks[0] = chunk[amt:]
+                chunk = chunk[:amt]
+            pieces.append(chunk)
+            amt -= len(chunk)
+            self._size -= len(chunk)
+
+        return pieces
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def plaintext_length(body) -> Optional[int]:
+    """Determine the length of a plaintext body without consuming it.
+
+    :returns: Length in bytes or None if the body is not seekable
+    """
+    if isinstance(body, str):
+        return len(body.encode())
+
+    if is_buffer(body):
+        return memoryview(body).nbytes
+
+    if hasattr(body, "read"):
+        seekable = getattr(body, "seekable", None)
+        if seekable is not None and not seekable():
+            return None
+
+        try:
+            position = body.tell()
+            end = body.seek(0, io.SEEK_END)
+            body.seek(position)
+        except (AttributeError, OSError):
+            return None
+
+        return end - position
+
+    return None
+
+
+def body_encoding(base64_encode: bool) -> str:
+    """Value of the body encoding marker of new writes."""
+    return BASE64_BODY_ENCODING if base64_encode else RAW_BODY_ENCODING
+
+
+def is_base64_encoded(s3_metadata: Dict[str, str]) -> bool:
+    """Detect whether a stored body is base64-encoded.
+
+    New writes mark the encoding of their body; objects without the marker are in the legacy base64 format.
+    """
+    return s3_metadata.get(BODY_ENCODING_METADATA_KEY, BASE64_BODY_ENCODING) == BASE64_BODY_ENCODING
+
+
+def encrypted_length(plaintext_length: int, tag_length: int, base64_encode: bool) -> int:
+    """Length of the stored body for a plaintext of the given length."""
+    length = plaintext_length + tag_length
+    if base64_encode:
+        return 4 * ((length + 2) // 3)
+    return length
+
+
+class EncryptionStreamingBody(object):
+    """Read-only file-like object that encrypts a plaintext body as it is consumed.
+
+    The body may be ``str``, a bytes-like object, a file-like object or an iterator of byte chunks. A single
+    encryptor stays open across all chunks and the authentication tag is appended after the last one, so memory
+    use is bounded by ``chunk_size`` whatever the size of the body.
+    """
+
+    def __init__(
+        self,
+        body,
+        data_key: DataKey,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        base64_encode: bool = False,
+        instrumentation: Instrumentation = NO_INSTRUMENTATION,
+    ) -> None:
+        if isinstance(body, str):
+            body = body.encode()
+
+        self._body = body
+        self._data_key = data_key
+        self._chunk_size = chunk_size
+        self._base64_encode = base64_encode
+        self._cipher = instrumentation.timer(CIPHER)
+        self._encoding = instrumentation.timer(ENCODING)
+        self._plaintext_length = plaintext_length(body)
+        self._rewindable = is_buffer(body) or (_is_file(body) and self._plaintext_length is not None)
+        self._start = body.tell() if _is_file(body) and self._rewindable else 0
+        self._reset()
+
+    def _reset(self) -> None:
+        if _is_file(self._body) and self._rewindable:
+            self._body.seek(self._start)
+
+        self._plaintext = self._iter_plaintext()
+        self._encryptor = None
+        self._buffer = _ReadBuffer()
+        self._pending = b""
+        self._finished = False
+        self._position = 0
+        self._plaintext_bytes = 0
+
+    def _iter_plaintext(self) -> Iterator[bytes]:
+        body = self._body
+
+        if is_buffer(body):
+            with memoryview(body).cast("B") as view:
+                for offset in range(0, len(view), self._chunk_size):
+                    with view[offset : offset + self._chunk_size] as chunk:
+                        yield chunk
+        elif hasattr(body, "read"):
+            while True:
+                chunk = body.read(self._chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        else:
+            for chunk in body:
+                yield chunk.encode() if isinstance(chunk, str) else chunk
+
+    def _encrypt_next_chunk(self) -> None:
+        if self._encryptor is None:
+            if is_buffer(self._body) and self._plaintext_length <= self._chunk_size:
+                # Small bodies are encrypted by a single call of the data key's prepared AEAD.
+                self._plaintext_bytes = self._plaintext_length
+                self._finished = True
+                with self._cipher:
+                    ciphertext = self._data_key.encrypt(self._body)
+                self._append(ciphertext)
+                return
+            self._encryptor = self._data_key.encryptor()
+
+        chunk = next(self._plaintext, None)
+
+        with self._cipher:
+            if chunk is None:
+                ciphertext = self._encryptor.finalize() + self._encryptor.tag
+                self._finished = True
+            else:
+                self._plaintext_bytes += len(chunk)
+                ciphertext = self._encryptor.update(chunk)
+
+        self._append(ciphertext)
+
+    def _append(self, ciphertext: bytes) -> None:
+        if self._base64_encode:
+            with self._encoding:
+                # Only whole 3-byte groups can be encoded before the end of the stream.
+                pending = self._pending + ciphertext if self._pending else memoryview(ciphertext)
+                cut = len(pending) if self._finished else len(pending) - len(pending) % 3
+                self._buffer.append(base64.b64encode(pending[:cut]))
+                self._pending = bytes(pending[cut:])
+        else:
+            self._buffer.append(ciphertext)
+
+        if self._finished:
+            self._cipher.report()
+            self._encoding.report()
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        """Read at most amt bytes of the encrypted body, or everything that is left if amt is omitted."""
+        while not self._finished and (amt is None or amt < 0 or len(self._buffer) < amt):
+            self._encrypt_next_chunk()
+
+        data = self._buffer.read(amt)
+        self._position += len(data)
+
+        return data
+
+    def seekable(self) -> bool:
+        return self._rewindable
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Seek by re-encrypting the body from the start, which yields identical ciphertext."""
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self)
+
+        if offset < self._position:
+            if not self._rewindable:
+                raise io.UnsupportedOperation("Cannot rewind a non-seekable body")
+            self._reset()
+
+        while self._position < offset:
+            if not self.read(min(self._chunk_size, offset - self._position)):
+                break
+
+        return self._position
+
+    def spool(self):
+        """Encrypt the whole body into a temporary file that only keeps chunk_size bytes in memory."""
+        spooled = tempfile.SpooledTemporaryFile(max_size=self._chunk_size)
+        for chunk in iter(lambda: self.read(self._chunk_size), b""):
+            spooled.write(chunk)
+        spooled.seek(0)
+
+        return spooled
+
+    def close(self) -> None:
+        """Release the views of a bytes-like body, e.g. so that a memory mapping can be closed."""
+        self._plaintext.close()
+
+    @property
+    def plaintext_bytes(self) -> int:
+        """Number of plaintext bytes encrypted so far."""
+        return self._plaintext_bytes
+
+    def __len__(self) -> int:
+        if self._plaintext_length is None:
+            raise TypeError("Length of a non-seekable body is unknown")
+
+        return encrypted_length(self._plaintext_length, self._data_key.algorithm.tag_len, self._base64_encode)
+
+
+class BodyDecryptor(object):
+    """Incremental decryptor for a stored body that holds back the trailing authentication tag."""
+
+    def __init__(
+        self,
+        data_key: DataKey,
+        base64_encoded: bool = False,
+        instrumentation: Instrumentation = NO_INSTRUMENTATION,
+    ) -> None:
+        self._base64_encoded = base64_encoded
+        self._tag_len = data_key.algorithm.tag_len
+        self._decryptor = data_key.decryptor()
+        self._encoded = b""
+        self._held = b""
+        self._instrumentation = instrumentation
+        self._cipher = instrumentation.timer(CIPHER)
+        self._encoding = instrumentation.timer(ENCODING)
+        self._plaintext_bytes = 0
+
+    def _ciphertext(self, raw, final: bool = False) -> memoryview:
+        if not self._base64_encoded:
+            return memoryview(raw).cast("B")
+
+        with self._encoding:
+            # Only whole 4-character groups can be decoded before the end of the stream.
+            encoded = self._encoded + raw if self._encoded else raw
+            cut = len(encoded) if final else len(encoded) - len(encoded) % 4
+            self._encoded = bytes(encoded[cut:])
+
+            return memoryview(base64.b64decode(encoded[:cut]))
+
+    def _decrypt_into(self, ciphertext: memoryview, out: memoryview) -> int:
+        # Hold back the trailing bytes that may belong to the authentication tag.
+        ready = len(self._held) + len(ciphertext) - self._tag_len
+        if ready <= 0:
+            self._held += ciphertext
+            return 0
+
+        from_held = min(ready, len(self._held))
+        with self._cipher:
+            written = update_into(self._decryptor, self._held[:from_held], out)
+            written += update_into(self._decryptor, ciphertext[: ready - from_held], out[written:])
+        self._held = self._held[from_held:] + bytes(ciphertext[ready - from_held :])
+        self._plaintext_bytes += written
+
+        return written
+
+    def _decrypt(self, ciphertext: memoryview) -> bytes:
+        plaintext = bytearray(max(len(self._held) + len(ciphertext) - self._tag_len, 0))
+        self._decrypt_into(ciphertext, memoryview(plaintext))
+
+        return plaintext
+
+    def update(self, raw) -> bytes:
+        """Decrypt the next bytes of the stored body."""
+        return self._decrypt(self._ciphertext(raw))
+
+    def update_into(self, raw, buffer) -> int:
+        """Decrypt the next bytes of the stored body into a pre-allocated buffer of at least ``len(raw)`` bytes.
+
+        :returns: Number of bytes written
+        """
+        out = memoryview(buffer).cast("B")
+        if len(out) < len(raw):
+            raise ValueError("Output buffer is too small")
+
+        return self._decrypt_into(self._ciphertext(raw), out)
+
+    def finalize(self) -> bytes:
+        """Decrypt what is left and check the authentication tag.
+
+        :raises InvalidTag: if the body was tampered with or truncated
+        """
+        try:
+            plaintext = self._decrypt(self._ciphertext(b"", final=True))
+
+            if len(self._held) < self._tag_len:
+                raise InvalidTag()
+
+            with self._cipher:
+                self._decryptor.finalize_with_tag(self._held)
+        finally:
+            self._cipher.report()
+            self._encoding.report()
+            self._instrumentation.count(BYTES_DECRYPTED, self._plaintext_bytes)
+
+        return plaintext
+
+
+class DecryptionStreamingBodyWrapper(object):
+    """Streaming body that decrypts an encrypted S3 object body as it is read.
+
+    Ciphertext is decrypted incrementally; the trailing authentication tag is held back from the stream and checked
+    once the underlying body is exhausted. Plaintext handed out before that point is not yet authenticated, so
+    callers must read the stream to the end to detect tampering, which raises ``InvalidTag``.
+    """
+
+    def __init__(
+        self,
+        streaming_body: StreamingBody,
+        data_key: DataKey,
+        base64_encoded: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        instrumentation: Instrumentation = NO_INSTRUMENTATION,
+    ) -> None:
+        self._streaming_body = streaming_body
+        self._data_key = data_key
+        self._chunk_size = chunk_size
+        self._tag_len = data_key.algorithm.tag_len
+        self._body_decryptor = BodyDecryptor(
+            data_key=data_key,
+            base64_encoded=base64_encoded,
+            instrumentation=instrumentation,
+        )
+        self._buffer = _ReadBuffer()
+        self._finished = False
+        self._amount_read = 0
+
+    def feed(self, raw) -> None:
+        """Decrypt ciphertext that was read from the underlying body before it was handed to this wrapper."""
+        if raw:
+            self._buffer.append(self._body_decryptor.update(raw))
+
+    def _decrypt_next_chunk(self, amt: int) -> None:
+        raw = self._streaming_body.read(amt)
+
+        if raw:
+            self._buffer.append(self._body_decryptor.update(raw))
+        else:
+            self._buffer.append(self._body_decryptor.finalize())
+            self._finished = True
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        """Read at most amt bytes of plaintext, or everything that is left if amt is omitted."""
+        while not self._finished and (amt is None or amt < 0 or len(self._buffer) < amt):
+            self._decrypt_next_chunk(self._chunk_size if amt is None or amt < 0 else max(amt, self._tag_len))
+
+        data = self._buffer.read(amt)
+        self._amount_read += len(data)
+
+        return data
+
+    def readinto(self, b) -> int:
+        """Read plaintext into a pre-allocated, writable bytes-like object.
+
+        Once buffered plaintext is used up, the body is decrypted straight into ``b``.
+        """
+        view = memoryview(b).cast("B")
+
+        written = self._buffer.readinto(view)
+        while written < len(view) and not self._finished:
+            written += self._decrypt_next_chunk_into(view[written:])
+            written += self._buffer.readinto(view[written:])
+
+        self._amount_read += written
+
+        return written
+
+    def _decrypt_next_chunk_into(self, view: memoryview) -> int:
+        raw = self._streaming_body.read(min(len(view), self._chunk_size))
+        if not raw:
+            self._buffer.append(self._body_decryptor.finalize())
+            self._finished = True
+            return 0
+
+        return self._body_decryptor.update_into(raw, view)
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._amount_read
+
+    def iter_chunks(self, chunk_size: int = 1024) -> Iterator[bytes]:
+        """Return an iterator to yield chunks of chunk_size bytes of plaintext."""
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def iter_lines(self, chunk_size: int = 1024, keepends: bool = False) -> Iterator[bytes]:
+        """Return an iterator to yield lines of plaintext."""
+        pending = b""
+        for chunk in self.iter_chunks(chunk_size):
+            lines = (pending + chunk).splitlines(True)
+            for line in lines[:-1]:
+                yield line.splitlines(keepends)[0]
+            pending = lines[-1]
+        if pending:
+            yield pending.splitlines(keepends)[0]
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_chunks()
+
+    def __getattr__(self, name: str):
+        """Catch any method/attribute lookups that are not defined in this class and try
+        to find them on the provided bridge object.
+        :param str name: Attribute name
+        :returns: Result of asking the provided streaming object for that attribute name
+        :raises AttributeError: if attribute is not found on provided bridge object
+        """
+        return getattr(self._streaming_body, name)
+
+
+class UnauthenticatedRangeStreamingBodyWrapper(DecryptionStreamingBodyWrapper):
+    """Streaming body that decrypts a byte range of an encrypted S3 object body.
+
+    The authentication tag covers the whole object, so the plaintext of a range can NOT be authenticated.
+    """
+
+    def __init__(
+        self,
+        streaming_body: StreamingBody,
+        data_key: DataKey,
+        offset: int,
+        skip: int,
+        length: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """
+        :param int offset: Offset of the first fetched byte within the ciphertext
+        :param int skip: Number of decrypted bytes to drop before the requested range starts
+        :param int length: Length of the requested range
+        """
+        super().__init__(streaming_body=streaming_body, data_key=data_key, chunk_size=chunk_size)
+        self._decryptor = data_key.unauthenticated_decryptor(offset)
+        self._skip = skip
+        self._remaining = length
+        self._finished = length == 0
+
+    def _decrypt_next_chunk_into(self, view: memoryview) -> int:
+        self._decrypt_next_chunk(max(len(view), self._tag_len))
+        return 0
+
+    def _decrypt_next_chunk(self, amt: int) -> None:
+        raw = self._streaming_body.read(amt)
+        plaintext = memoryview(self._decryptor.update(raw) if raw else self._decryptor.finalize())
+
+        if self._skip:
+            skipped = min(self._skip, len(plaintext))
+            plaintext = plaintext[skipped:]
+            self._skip -= skipped
+
+        plaintext = plaintext[: self._remaining]
+        self._remaining -= len(plaintext)
+        self._buffer.append(plaintext)
+
+        # Anything fetched past the range belongs to the authentication tag.
+        self._finished = not raw or self._remaining == 0
@@ -0,0 +1,480 @@
+"""Managed transfers and multipart uploads of encrypted objects."""
+import mmap
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from boto3.s3.transfer import TransferConfig
+from cryptography.exceptions import InvalidTag
+from s3transfer.utils import ChunksizeAdjuster
+
+from .keys import DataKey
+from .keys.data_key import update_into
+from .streams import is_buffer, plaintext_length
+
+# Arguments of a put that also apply to the CreateMultipartUpload request of a multipart upload.
+CREATE_MULTIPART_UPLOAD_ARGS = (
+    "ACL",
+    "BucketKeyEnabled",
+    "CacheControl",
+    "ContentDisposition",
+    "ContentEncoding",
+    "ContentLanguage",
+    "ContentType",
+    "ExpectedBucketOwner",
+    "Expires",
+    "GrantFullControl",
+    "GrantRead",
+    "GrantReadACP",
+    "GrantWriteACP",
+    "ObjectLockLegalHoldStatus",
+    "ObjectLockMode",
+    "ObjectLockRetainUntilDate",
+    "RequestPayer",
+    "SSECustomerAlgorithm",
+    "SSECustomerKey",
+    "SSECustomerKeyMD5",
+    "SSEKMSEncryptionContext",
+    "SSEKMSKeyId",
+    "ServerSideEncryption",
+    "StorageClass",
+    "Tagging",
+    "WebsiteRedirectLocation",
+)
+
+UPLOAD_PART_ARGS = (
+    "SSECustomerKey",
+    "SSECustomerAlgorithm",
+    "SSECustomerKeyMD5",
+    "RequestPayer",
+    "ExpectedBucketOwner",
+)
+
+COMPLETE_MULTIPART_ARGS = UPLOAD_PART_ARGS
+
+ABORT_MULTIPART_ARGS = (
+    "RequestPayer",
+    "ExpectedBucketOwner",
+)
+
+# Largest object a single CopyObject request can copy.
+MAX_COPY_OBJECT_SIZE = 5 * 1024 ** 3
+
+# Object attributes that a copy replacing the metadata would otherwise reset.
+CONTENT_ATTRIBUTES = (
+    "CacheControl",
+    "ContentDisposition",
+    "ContentEncoding",
+    "ContentLanguage",
+    "ContentType",
+    "Expires",
+)
+
+# Attributes that are also kept when an object is copied onto itself; other copies get the destination's defaults.
+STORAGE_ATTRIBUTES = (
+    "StorageClass",
+    "ServerSideEncryption",
+    "SSEKMSKeyId",
+)
+
+
+class MultipartUploadContext(object):
+    """Encryption state of an in-progress multipart upload.
+
+    All parts share one GCM stream, so they have to be encrypted in order and the authentication tag is appended to
+    the last part. Encrypted parts may still be uploaded concurrently.
+    """
+
+    def __init__(self, data_key: DataKey) -> None:
+        self._encryptor = data_key.encryptor()
+        self._tag_len = data_key.algorithm.tag_len
+        self._next_part_number = 1
+        self._has_final_part = False
+        self._lock = threading.Lock()
+
+    def encrypt_part(self, part_number: int, plaintext, is_last_part: bool) -> bytearray:
+        """Encrypt the next part of the upload into a newly allocated buffer.
+
+        :param plaintext: Bytes-like object, e.g. ``bytes``, ``bytearray``, ``memoryview`` or ``mmap``
+        """
+        with self._lock:
+            if self._has_final_part:
+                raise ValueError("The last part of this encrypted multipart upload was already uploaded")
+
+            if part_number != self._next_part_number:
+                raise ValueError(
+                    "Parts of an encrypted multipart upload must be uploaded in order: "
+                    "expected part %d, got part %d" % (self._next_part_number, part_number)
+                )
+
+            with memoryview(plaintext).cast("B") as data:
+                ciphertext = bytearray(len(data) + (self._tag_len if is_last_part else 0))
+                written = update_into(self._encryptor, data, ciphertext)
+
+            if is_last_part:
+                self._encryptor.finalize()
+                ciphertext[written:] = self._encryptor.tag
+                self._has_final_part = True
+
+            self._next_part_number += 1
+
+        return ciphertext
+
+    @property
+    def has_final_part(self) -> bool:
+        return self._has_final_part
+
+
+def _iter_parts(fileobj, part_size: int, prefix: bytes = b"") -> Iterator[Tuple[bytes, bool]]:
+    """Read a file-like object in parts, flagging the last one.
+
+    Bytes-like objects, e.g. a memory-mapped file, are split into views without copying.
+
+    :param bytes prefix: Data already read from the file-like object
+    """
+    if is_buffer(fileobj):
+        # Views are released as soon as the next part is requested or the generator is closed, so the buffer, e.g.
+        # a memory mapping, can be closed.
+        with memoryview(fileobj).cast("B") as view:
+            for offset in range(0, len(view), part_size):
+                with view[offset : offset + part_size] as part:
+                    yield part, offset + part_size >= len(view)
+        return
+
+    pending = memoryview(prefix)
+
+    def read_part() -> bytes:
+        nonlocal pending
+        part = bytearray(pending[:part_size])
+        pending = pending[part_size:]
+        while len(part) < part_size:
+            chunk = fileobj.read(part_size - len(part))
+            if not chunk:
+                break
+            part += chunk
+        return bytes(part)
+
+    part = read_part()
+
+    while True:
+        next_part = read_part()
+        if not next_part:
+            yield part, True
+            return
+        yield part, False
+        part = next_part
+
+
+def _extra_args(extra_args: Dict, allowed: Tuple[str, ...]) -> Dict:
+    return {name: value for name, value in extra_args.items() if name in allowed}
+
+
+def _put(encrypted_object, body, size: int, extra_args: Dict, callback: Optional[Callable[[int], None]]):
+    """Upload a body below the multipart threshold with a single put."""
+    response = encrypted_object.put(Body=body, **extra_args)
+    if callback is not None:
+        callback(size)
+    return response
+
+
+def _upload_parts(
+    encrypted_object,
+    upload_id: str,
+    parts: Iterator[Tuple[bytes, bool]],
+    upload_part_args: Dict,
+    max_workers: int,
+    callback: Optional[Callable[[int], None]],
+) -> List[Dict]:
+    """Encrypt parts in order and upload them concurrently, holding at most ``max_workers`` encrypted parts.
+
+    :returns: ``Parts`` of the ``CompleteMultipartUpload`` request
+    """
+    client = encrypted_object.meta.client
+    in_flight = threading.BoundedSemaphore(max_workers)
+    failed = threading.Event()
+
+    def upload_part(part_number: int, ciphertext: bytes, plaintext_size: int) -> Dict:
+        try:
+            response = client.upload_part(
+                Bucket=encrypted_object.bucket_name,
+                Key=encrypted_object.key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=ciphertext,
+                **upload_part_args,
+            )
+            if callback is not None:
+                callback(plaintext_size)
+        except BaseException:
+            # Flagged before the slot is released, so the next part sees the failure.
+            failed.set()
+            raise
+        finally:
+            in_flight.release()
+
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Pending uploads are cancelled before leaving the executor, which would otherwise wait for all of them.
+        try:
+            for part_number, (part, is_last_part) in enumerate(parts, start=1):
+                # A part is only encrypted once an upload slot is free, which bounds the encrypted parts in memory.
+                in_flight.acquire()
+                if failed.is_set():
+                    # No further parts are read once an upload failed; its error is raised below.
+                    break
+
+                ciphertext = encrypted_object.encrypt_part(
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=part,
+                    IsLastPart=is_last_part,
+                )
+                futures.append(executor.submit(upload_part, part_number, ciphertext, len(part)))
+
+            wait(futures, return_when=FIRST_EXCEPTION)
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def upload_fileobj(
+    encrypted_object,
+    fileobj,
+    extra_args: Optional[Dict] = None,
+    callback: Optional[Callable[[int], None]] = None,
+    config: Optional[TransferConfig] = None,
+):
+    """Upload a file-like object, switching to an encrypted multipart upload above the multipart threshold.
+
+    Parts are read and encrypted sequentially through one GCM stream and uploaded concurrently on a thread pool
+    sized by ``config.max_concurrency``. At most that many encrypted parts are held in memory at once.
+
+    File-like objects of unknown length, e.g. pipes, are read up to the multipart threshold to choose between a single
+    put and a multipart upload. A multipart upload of such a body carries no ``x-amz-unencrypted-content-length``:
+    the metadata is fixed when the upload is created, before the length is known, and rewriting it afterwards would
+    copy the whole object. The length is optional; it is the stored length minus the tag.
+    """
+    if config is None:
+        config = TransferConfig()
+
+    extra_args = dict(extra_args or {})
+    size = plaintext_length(fileobj)
+    prefix = b""
+
+    if size is None:
+        prefix = fileobj.read(config.multipart_threshold)
+        if len(prefix) < config.multipart_threshold:
+            return _put(encrypted_object, prefix, len(prefix), extra_args, callback)
+    elif size < config.multipart_threshold:
+        return _put(encrypted_object, fileobj, size, extra_args, callback)
+    else:
+        extra_args.setdefault("UnencryptedContentLength", size)
+
+    part_size = ChunksizeAdjuster().adjust_chunksize(config.multipart_chunksize, size)
+    max_workers = config.max_concurrency if config.use_threads else 1
+
+    upload_id = encrypted_object.create_multipart_upload(**extra_args)["UploadId"]
+    upload_part_args = _extra_args(extra_args, UPLOAD_PART_ARGS)
+
+    parts = _iter_parts(fileobj, part_size, prefix)
+
+    try:
+        completed_parts = _upload_parts(encrypted_object, upload_id, parts, upload_part_args, max_workers, callback)
+    except BaseException:
+        encrypted_object.abort_multipart_upload(UploadId=upload_id, **_extra_args(extra_args, ABORT_MULTIPART_ARGS))
+        raise
+    finally:
+        parts.close()
+
+    return encrypted_object.complete_multipart_upload(
+        UploadId=upload_id,
+        MultipartUpload={"Parts": completed_parts},
+        **_extra_args(extra_args, COMPLETE_MULTIPART_ARGS),
+    )
+
+
+def upload_file(
+    encrypted_object,
+    filename: str,
+    extra_args: Optional[Dict] = None,
+    callback: Optional[Callable[[int], None]] = None,
+    config: Optional[TransferConfig] = None,
+):
+    """Upload a local file through a read-only memory mapping.
+
+    Parts are encrypted straight from the mapping, so the file is never read into memory as a whole. Whether a
+    single put or a multipart upload is used, and the unencrypted content length, follow from the size of the file.
+    """
+    with open(filename, "rb") as fileobj:
+        if os.fstat(fileobj.fileno()).st_size == 0:
+            # Empty files cannot be mapped.
+            return upload_fileobj(encrypted_object, b"", extra_args=extra_args, callback=callback, config=config)
+
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+    try:
+        return upload_fileobj(encrypted_object, mapped, extra_args=extra_args, callback=callback, config=config)
+    finally:
+        # The upload released its views of the mapping, on errors as well.
+        mapped.close()
+
+
+def copy_with_metadata(
+    client,
+    copy_source: Dict,
+    bucket: str,
+    key: str,
+    head: Dict,
+    metadata: Dict[str, str],
+    extra_args: Optional[Dict] = None,
+    config: Optional[TransferConfig] = None,
+):
+    """Copy an object server-side, replacing its user metadata and leaving its content untouched.
+
+    Objects below the multipart threshold and up to 5 GiB are copied with a single ``CopyObject`` request, larger
+    ones with a multipart copy. The copy only succeeds if the source still has the ETag of the ``HeadObject``
+    response it is based on.
+
+    :param copy_source: ``Bucket``, ``Key`` and optionally ``VersionId`` of the source
+    :param head: ``HeadObject`` response of the source
+    :returns: ``CopyObject`` response, or None for a multipart copy
+    """
+    if config is None:
+        config = TransferConfig(multipart_threshold=MAX_COPY_OBJECT_SIZE + 1, multipart_chunksize=512 * 1024 ** 2)
+
+    attributes = CONTENT_ATTRIBUTES
+    if (copy_source["Bucket"], copy_source["Key"]) == (bucket, key):
+        attributes += STORAGE_ATTRIBUTES
+
+    extra_args = dict(extra_args or {})
+    for name in attributes:
+        if name in head:
+            extra_args.setdefault(name, head[name])
+
+    extra_args.update(Metadata=metadata, MetadataDirective="REPLACE", CopySourceIfMatch=head["ETag"])
+
+    size = head["ContentLength"]
+    if size < config.multipart_threshold and size <= MAX_COPY_OBJECT_SIZE:
+        return client.copy_object(Bucket=bucket, Key=key, CopySource=copy_source, **extra_args)
+
+    client.copy(copy_source, bucket, key, ExtraArgs=extra_args, Config=config)
+
+    return None
+
+
+def _pwrite(fileobj, data: bytes, offset: int, lock: threading.Lock) -> None:
+    """Write data at an offset without moving a shared file position where the platform allows it."""
+    if hasattr(os, "pwrite"):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fileobj.fileno(), view, offset)
+            view = view[written:]
+            offset += written
+        return
+
+    with lock:
+        fileobj.seek(offset)
+        fileobj.write(data)
+        fileobj.flush()
+
+
+def download_ranges(
+    client,
+    bucket: str,
+    key: str,
+    fileobj,
+    size: int,
+    extra_args: Optional[Dict] = None,
+    config: Optional[TransferConfig] = None,
+) -> None:
+    """Download an object into a seekable file with concurrent ranged gets and positional writes.
+
+    :param fileobj: Binary file opened for writing that has a file descriptor
+    :param int size: Size of the stored object
+    """
+    if config is None:
+        config = TransferConfig()
+
+    extra_args = dict(extra_args or {})
+    part_size = config.multipart_chunksize if size >= config.multipart_threshold else max(size, 1)
+    max_workers = config.max_concurrency if config.use_threads else 1
+    lock = threading.Lock()
+
+    fileobj.flush()
+    fileobj.truncate(size)
+
+    def download_range(start: int) -> None:
+        end = min(start + part_size, size) - 1
+        response = client.get_object(Bucket=bucket, Key=key, Range="bytes=%d-%d" % (start, end), **extra_args)
+        body = response["Body"]
+        offset = start
+        try:
+            for chunk in iter(lambda: body.read(config.io_chunksize), b""):
+                _pwrite(fileobj, chunk, offset, lock)
+                offset += len(chunk)
+        finally:
+            body.close()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(download_range, start) for start in range(0, size, part_size)]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def decrypt_in_place(
+    fileobj,
+    data_key: DataKey,
+    size: int,
+    chunk_size: int,
+    callback: Optional[Callable[[int], None]] = None,
+) -> None:
+    """Decrypt a file holding ``ciphertext || tag`` in place and authenticate it.
+
+    GCM preserves lengths, so every chunk of plaintext overwrites its own ciphertext. The file is truncated to the
+    plaintext once the tag was verified; ``InvalidTag`` is raised otherwise and the file must be discarded.
+    """
+    tag_len = data_key.algorithm.tag_len
+    plaintext_size = size - tag_len
+    if plaintext_size < 0:
+        raise InvalidTag()
+
+    decryptor = data_key.decryptor()
+
+    fileobj.seek(plaintext_size)
+    tag = fileobj.read(tag_len)
+
+    # Both buffers are reused for every chunk, so memory use stays at two chunks whatever the size of the file.
+    ciphertext = memoryview(bytearray(min(chunk_size, plaintext_size)))
+    plaintext = memoryview(bytearray(len(ciphertext)))
+
+    position = 0
+    while position < plaintext_size:
+        fileobj.seek(position)
+        read = fileobj.readinto(ciphertext[: min(len(ciphertext), plaintext_size - position)])
+        if not read:
+            raise InvalidTag()
+        written = update_into(decryptor, ciphertext[:read], plaintext)
+        fileobj.seek(position)
+        fileobj.write(plaintext[:written])
+        position += written
+        if callback is not None:
+            callback(written)
+
+    decryptor.finalize_with_tag(tag)
+
+    fileobj.truncate(plaintext_size)
+    fileobj.flush()
@@ -28,6 +28,10 @@ setup(
     url="https://github.com/hupe1980/aws-s3-encryption-python",
     packages=find_packages(exclude=["tests*"]),
     install_requires=requires,
+    extras_require={
+        "async": ["aiobotocore"],
+        "opentelemetry": ["opentelemetry-api"],
+    },
     data_files=["README.rst", "LICENSE"],
     license="MIT",
     python_requires=">= 3.6",
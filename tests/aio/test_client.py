@@ -0,0 +1,133 @@
+import asyncio
+import secrets
+from unittest import mock
+
+from s3_encryption_sdk.aio import AsyncEncryptedClient, AsyncKmsMaterialsProvider
+
+
+class _AsyncBody(object):
+    def __init__(self, body):
+        self._body = body
+
+    async def read(self, amt=None):
+        return self._body.read(amt)
+
+    def close(self):
+        self._body.close()
+
+
+class _AsyncClient(object):
+    """Stand-in for an aiobotocore client that runs a botocore client."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def call(**kwargs):
+            response = method(**kwargs)
+            if "Body" in response:
+                response["Body"] = _AsyncBody(response["Body"])
+            return response
+
+        return call
+
+
+def test_get_object(kms, key, s3, bucket):
+    materials_provider = AsyncKmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=_AsyncClient(kms),
+    )
+
+    crypto_s3 = AsyncEncryptedClient(
+        client=_AsyncClient(s3),
+        materials_provider=materials_provider,
+        chunk_size=1024,
+    )
+
+    body = secrets.token_bytes(10000)
+
+    async def put_and_get():
+        await crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body)
+        decrypted_obj = await crypto_s3.get_object(Bucket=bucket.name, Key="object")
+        return b"".join([chunk async for chunk in decrypted_obj["Body"].iter_chunks(100)])
+
+    loop = asyncio.new_event_loop()
+    try:
+        decrypted_body = loop.run_until_complete(put_and_get())
+    finally:
+        loop.close()
+
+    encrypted_obj = s3.get_object(Bucket=bucket.name, Key="object")
+
+    assert body == decrypted_body
+    assert body != encrypted_obj["Body"].read()
+    assert str(len(body)) == encrypted_obj["Metadata"]["x-amz-unencrypted-content-length"]
+
+
+def test_put_object_uploads_large_bodies_in_parts(kms, key, s3, bucket):
+    materials_provider = AsyncKmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=_AsyncClient(kms),
+    )
+
+    crypto_s3 = AsyncEncryptedClient(
+        client=_AsyncClient(s3),
+        materials_provider=materials_provider,
+        part_size=5 * 1024 ** 2,
+    )
+
+    body = secrets.token_bytes(12 * 1024 ** 2)
+
+    async def put_and_get():
+        await crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=iter([body[:1024], body[1024:]]))
+        decrypted_obj = await crypto_s3.get_object(Bucket=bucket.name, Key="object")
+        return await decrypted_obj["Body"].read()
+
+    loop = asyncio.new_event_loop()
+    try:
+        decrypted_body = loop.run_until_complete(put_and_get())
+    finally:
+        loop.close()
+
+    assert body == decrypted_body
+    head = s3.head_object(Bucket=bucket.name, Key="object", PartNumber=1)
+    assert 3 == head["PartsCount"]
+    # The length of the iterator is only known once the upload was created.
+    assert "x-amz-unencrypted-content-length" not in head["Metadata"]
+
+
+def test_put_object_sends_sse_c_keys_with_every_part(kms, key, s3, bucket):
+    materials_provider = AsyncKmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=_AsyncClient(kms),
+    )
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = AsyncEncryptedClient(
+        client=_AsyncClient(client),
+        materials_provider=materials_provider,
+        part_size=5 * 1024 ** 2,
+    )
+
+    body = secrets.token_bytes(12 * 1024 ** 2)
+    sse_c = {"SSECustomerAlgorithm": "AES256", "SSECustomerKey": secrets.token_bytes(32)}
+
+    async def put_and_get():
+        await crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body, ContentType="text/plain", **sse_c)
+        decrypted_obj = await crypto_s3.get_object(Bucket=bucket.name, Key="object", **sse_c)
+        return await decrypted_obj["Body"].read()
+
+    loop = asyncio.new_event_loop()
+    try:
+        decrypted_body = loop.run_until_complete(put_and_get())
+    finally:
+        loop.close()
+
+    assert body == decrypted_body
+    assert "text/plain" == client.create_multipart_upload.call_args.kwargs["ContentType"]
+    assert 3 == client.upload_part.call_count
+    for call in client.upload_part.call_args_list + [client.complete_multipart_upload.call_args]:
+        assert "AES256" == call.kwargs["SSECustomerAlgorithm"]
+        assert "ContentType" not in call.kwargs
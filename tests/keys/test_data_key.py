@@ -0,0 +1,115 @@
+import mmap
+import secrets
+import tracemalloc
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from s3_encryption_sdk.keys import DataKey, DataKeyAlgorithms, resolve_algorithm
+from s3_encryption_sdk.keys import data_key as data_key_module
+
+
+def _data_key():
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+    return DataKey(
+        algorithm=algorithm,
+        key=algorithm.generate_data_key(),
+        iv=algorithm.generate_iv(),
+    )
+
+
+def _encrypt_incrementally(data_key, plaintext):
+    encryptor = data_key.encryptor()
+    return encryptor.update(plaintext) + encryptor.finalize() + encryptor.tag
+
+
+def test_one_shot_encryption_matches_incremental_encryption():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+
+    ciphertext = data_key.encrypt(plaintext)
+
+    assert _encrypt_incrementally(data_key, plaintext) == ciphertext
+    assert plaintext == data_key.decrypt(ciphertext)
+
+
+def test_payloads_above_threshold_use_incremental_cipher(monkeypatch):
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+    one_shot_ciphertext = data_key.encrypt(plaintext)
+
+    monkeypatch.setattr(data_key_module, "ONE_SHOT_THRESHOLD", 100)
+
+    ciphertext = data_key.encrypt(plaintext)
+    decrypted = data_key.decrypt(one_shot_ciphertext)
+
+    assert one_shot_ciphertext == ciphertext
+    assert plaintext == decrypted
+    assert bytearray is type(ciphertext) is type(decrypted)
+
+
+def test_payloads_above_threshold_are_not_copied(monkeypatch):
+    monkeypatch.setattr(data_key_module, "ONE_SHOT_THRESHOLD", 1024 ** 2)
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(8 * 1024 ** 2)
+
+    for process in (data_key.encrypt, data_key.decrypt):
+        tracemalloc.start()
+        try:
+            output = process(plaintext)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # Only the output buffer is allocated, not a copy of it.
+        assert peak < 1.25 * len(plaintext)
+        plaintext = output
+
+
+def test_with_iv_shares_prepared_aead():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(100)
+    data_key.encrypt(plaintext)
+
+    other = data_key.with_iv(data_key.algorithm.generate_iv())
+
+    assert other._aead is data_key._aead
+    assert plaintext == other.decrypt(other.encrypt(plaintext))
+    with pytest.raises(InvalidTag):
+        data_key.decrypt(other.encrypt(plaintext))
+
+
+def test_encrypt_into_and_decrypt_into_exactly_sized_buffers():
+    data_key = _data_key()
+    plaintext = memoryview(secrets.token_bytes(1000))
+
+    ciphertext = bytearray(len(plaintext) + data_key.algorithm.tag_len)
+    assert len(ciphertext) == data_key.encrypt_into(plaintext, ciphertext)
+    assert data_key.encrypt(bytes(plaintext)) == ciphertext
+
+    decrypted = bytearray(len(plaintext))
+    assert len(plaintext) == data_key.decrypt_into(ciphertext, decrypted)
+    assert plaintext == decrypted
+
+    with pytest.raises(ValueError):
+        data_key.decrypt_into(ciphertext, bytearray(len(plaintext) - 1))
+
+
+def test_encrypt_and_decrypt_mmap(tmp_path):
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+    path = tmp_path / "plaintext"
+    path.write_bytes(plaintext)
+
+    with path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        ciphertext = data_key.encrypt(mapped)
+
+    assert plaintext == data_key.decrypt(bytes(ciphertext))
+
+
+def test_resolve_algorithm():
+    for algorithm in DataKeyAlgorithms:
+        assert algorithm is resolve_algorithm(algorithm.name, algorithm.data_key_length, algorithm.tag_len)
+
+    with pytest.raises(ValueError):
+        resolve_algorithm("AES/CBC/PKCS5Padding", 32, 16)
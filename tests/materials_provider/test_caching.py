@@ -0,0 +1,209 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from s3_encryption_sdk.exceptions import MaterialsProviderError
+from s3_encryption_sdk.materials_providers import CachingMaterialsProvider, EncryptionContext, KmsMaterialsProvider
+
+
+def _kms_materials_provider(kms, key, accept_shared_data_keys=True):
+    return KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=mock.Mock(wraps=kms),
+        accept_shared_data_keys=accept_shared_data_keys,
+    )
+
+
+def test_encryption_materials_reuse_data_key(kms, key):
+    kms_materials_provider = _kms_materials_provider(kms, key)
+    materials_provider = CachingMaterialsProvider(kms_materials_provider)
+
+    plaintext = b"foo bar"
+    objects = []
+
+    for object_key in ("foo", "bar"):
+        encryption_context = EncryptionContext(bucket_name="dummy", object_key=object_key)
+        materials = materials_provider.encryption_materials(encryption_context)
+        objects.append((object_key, materials.data_key.encrypt(plaintext), materials.metadata.generate()))
+
+    assert 1 == kms_materials_provider._client.generate_data_key.call_count
+    assert objects[0][2]["x-amz-key-v2"] == objects[1][2]["x-amz-key-v2"]
+    assert objects[0][2]["x-amz-iv"] != objects[1][2]["x-amz-iv"]
+
+    for object_key, ciphertext, s3_metadata in objects:
+        encryption_context = EncryptionContext(bucket_name="dummy", object_key=object_key, s3_metadata=s3_metadata)
+        materials = materials_provider.decryption_materials(encryption_context)
+
+        assert plaintext == materials.data_key.decrypt(ciphertext)
+
+    assert 1 == kms_materials_provider._client.decrypt.call_count
+
+
+def test_encryption_materials_respect_usage_limits(kms, key):
+    kms_materials_provider = _kms_materials_provider(kms, key)
+    materials_provider = CachingMaterialsProvider(
+        kms_materials_provider,
+        max_messages_encrypted=2,
+        max_bytes_encrypted=100,
+    )
+
+    for length in (10, 10, 10, 90, 20):
+        encryption_context = EncryptionContext(
+            bucket_name="dummy",
+            object_key="dummy",
+            unencrypted_content_length=length,
+        )
+        materials_provider.encryption_materials(encryption_context)
+
+    assert 3 == kms_materials_provider._client.generate_data_key.call_count
+
+
+def test_clear_zeroes_cached_key_material(kms, key):
+    materials_provider = CachingMaterialsProvider(_kms_materials_provider(kms, key))
+
+    encryption_context = EncryptionContext(bucket_name="dummy", object_key="dummy")
+    materials_provider.encryption_materials(encryption_context)
+
+    entry = materials_provider._encryption_cache.get(materials_provider._encryption_cache_key(encryption_context))
+    materials_provider.clear()
+
+    assert bytes(len(entry._key)) == entry._key
+
+
+def test_encryption_materials_share_generated_key_metadata(kms, key):
+    materials_provider = CachingMaterialsProvider(_kms_materials_provider(kms, key))
+
+    first, second = (
+        materials_provider.encryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key=object_key, unencrypted_content_length=7)
+        ).metadata
+        for object_key in ("foo", "bar")
+    )
+
+    first_metadata, second_metadata = first.generate(), second.generate()
+
+    assert first_metadata["x-amz-key-v2"] is second_metadata["x-amz-key-v2"]
+    assert first_metadata["x-amz-iv"] != second_metadata["x-amz-iv"]
+    assert "7" == second_metadata["x-amz-unencrypted-content-length"]
+    assert first_metadata == first.generate()
+    assert first.generate() is not first.generate()
+
+
+def test_kms_materials_provider_reads_objects_with_shared_data_keys(kms, key):
+    materials_provider = CachingMaterialsProvider(_kms_materials_provider(kms, key))
+    plaintext = b"foo bar"
+
+    for object_key in ("foo", "bar"):
+        materials = materials_provider.encryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key=object_key)
+        )
+        ciphertext = materials.data_key.encrypt(plaintext)
+        s3_metadata = materials.metadata.generate()
+
+        assert "kms+shared" == s3_metadata["x-amz-wrap-alg"]
+
+        decryption_materials = _kms_materials_provider(kms, key).decryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key=object_key, s3_metadata=s3_metadata)
+        )
+
+        assert plaintext == decryption_materials.data_key.decrypt(ciphertext)
+
+
+def test_shared_data_keys_require_opting_in(kms, key):
+    materials_provider = CachingMaterialsProvider(_kms_materials_provider(kms, key))
+    s3_metadata = materials_provider.encryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="foo")
+    ).metadata.generate()
+
+    reader = _kms_materials_provider(kms, key, accept_shared_data_keys=False)
+
+    with pytest.raises(MaterialsProviderError):
+        reader.decryption_materials(EncryptionContext(bucket_name="dummy", object_key="foo", s3_metadata=s3_metadata))
+
+    # Relabelling the object does not help either, as KMS binds its data key to the object key then.
+    s3_metadata["x-amz-wrap-alg"] = "kms"
+
+    with pytest.raises(MaterialsProviderError):
+        reader.decryption_materials(EncryptionContext(bucket_name="dummy", object_key="foo", s3_metadata=s3_metadata))
+
+
+def test_material_description_cannot_rebind_data_keys(kms, key):
+    kms_materials_provider = _kms_materials_provider(kms, key, accept_shared_data_keys=False)
+    materials = kms_materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="foo"))
+
+    # An object copied to another key, claiming its data key belongs to the original object, stays unreadable.
+    s3_metadata = materials.metadata.generate()
+    material_description = json.loads(s3_metadata["x-amz-matdesc"])
+    material_description["x-amz-data-key-object-key"] = "foo"
+    s3_metadata["x-amz-matdesc"] = json.dumps(material_description)
+
+    with pytest.raises(MaterialsProviderError):
+        kms_materials_provider.decryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key="bar", s3_metadata=s3_metadata)
+        )
+
+
+def test_data_keys_in_use_survive_zeroing(kms, key):
+    materials_provider = CachingMaterialsProvider(_kms_materials_provider(kms, key))
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    ciphertext = materials.data_key.encrypt(b"foo bar")
+    materials_provider.clear()
+
+    assert b"foo bar" == materials.data_key.decrypt(ciphertext)
+
+
+def test_bodies_of_unknown_length_respect_the_byte_limit(kms, key):
+    kms_materials_provider = _kms_materials_provider(kms, key)
+    materials_provider = CachingMaterialsProvider(kms_materials_provider, max_bytes_encrypted=100)
+
+    for length in (None, None, 10, 10):
+        materials_provider.encryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key="dummy", unencrypted_content_length=length)
+        )
+
+    assert 3 == kms_materials_provider._client.generate_data_key.call_count
+
+
+def test_inner_provider_runs_outside_the_lock(kms, key):
+    kms_materials_provider = _kms_materials_provider(kms, key)
+    materials_provider = CachingMaterialsProvider(kms_materials_provider)
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    decryption_context = EncryptionContext(
+        bucket_name="dummy",
+        object_key="dummy",
+        s3_metadata=materials.metadata.generate(),
+    )
+    materials_provider.decryption_materials(decryption_context)
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_generate_data_key(**kwargs):
+        started.set()
+        release.wait(5)
+        return kms.generate_data_key(**kwargs)
+
+    kms_materials_provider._client.generate_data_key.side_effect = slow_generate_data_key
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        encrypting = [
+            executor.submit(
+                materials_provider.encryption_materials,
+                EncryptionContext(bucket_name="dummy", object_key="dummy", material_description={"owner": "foo"}),
+            )
+            for _ in range(2)
+        ]
+        started.wait(5)
+
+        # Cache hits are served while the data key is generated.
+        assert materials.data_key.key == materials_provider.decryption_materials(decryption_context).data_key.key
+
+        release.set()
+        results = [future.result() for future in encrypting]
+
+    assert 2 == kms_materials_provider._client.generate_data_key.call_count
+    assert results[0].data_key.key == results[1].data_key.key
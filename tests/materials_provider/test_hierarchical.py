@@ -0,0 +1,150 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from s3_encryption_sdk import EncryptedClient
+from s3_encryption_sdk.exceptions import MaterialsProviderError
+from s3_encryption_sdk.materials_providers import (
+    CachingMaterialsProvider,
+    EncryptionContext,
+    HierarchicalMaterialsProvider,
+    MultiKeyringMaterialsProvider,
+)
+from s3_encryption_sdk.materials_providers.hierarchical import BRANCH_KEY_ID
+
+
+def _provider(kms, key, **kwargs):
+    kms_client = mock.Mock(wraps=kms)
+    return HierarchicalMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms_client, **kwargs), kms_client
+
+
+def test_kms_is_called_once_per_branch_key(kms, key, s3, bucket):
+    writer, writer_kms = _provider(kms, key)
+    reader, reader_kms = _provider(kms, key)
+
+    bodies = {"object-%d" % index: ("body %d" % index).encode() for index in range(10)}
+    writer_s3 = EncryptedClient(client=s3, materials_provider=writer)
+    for object_key, body in bodies.items():
+        writer_s3.put_object(Bucket=bucket.name, Key=object_key, Body=body)
+
+    crypto_s3 = EncryptedClient(client=s3, materials_provider=reader)
+    for object_key, body in bodies.items():
+        assert body == crypto_s3.get_object(Bucket=bucket.name, Key=object_key)["Body"].read()
+
+    assert 1 == writer_kms.generate_data_key.call_count
+    assert 0 == writer_kms.decrypt.call_count
+    assert 1 == reader_kms.decrypt.call_count
+
+
+def test_branch_keys_rotate_after_their_ttl(kms, key):
+    materials_provider, kms_client = _provider(kms, key, ttl=0)
+
+    first = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="first"))
+    second = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="second"))
+
+    assert 2 == kms_client.generate_data_key.call_count
+    assert first.metadata.material_description[BRANCH_KEY_ID] != second.metadata.material_description[BRANCH_KEY_ID]
+
+    for object_key, materials in (("first", first), ("second", second)):
+        decryption_materials = materials_provider.decryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key=object_key, s3_metadata=materials.metadata.generate())
+        )
+        assert materials.data_key.key == decryption_materials.data_key.key
+
+
+def test_data_keys_are_bound_to_their_object(kms, key):
+    materials_provider, _ = _provider(kms, key)
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+
+    for bucket_name, object_key in (("dummy", "other"), ("other", "dummy")):
+        with pytest.raises(MaterialsProviderError, match="another object"):
+            materials_provider.decryption_materials(
+                EncryptionContext(
+                    bucket_name=bucket_name,
+                    object_key=object_key,
+                    s3_metadata=materials.metadata.generate(),
+                )
+            )
+
+
+def test_shared_data_keys_are_bound_to_their_bucket_and_require_opting_in(kms, key):
+    writer, _ = _provider(kms, key)
+    materials_provider = CachingMaterialsProvider(writer)
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    s3_metadata = materials.metadata.generate()
+
+    assert "AESWrap+shared" == s3_metadata["x-amz-wrap-alg"]
+
+    reader, _ = _provider(kms, key)
+    with pytest.raises(MaterialsProviderError, match="shared"):
+        reader.decryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=s3_metadata))
+
+    reader, _ = _provider(kms, key, accept_shared_data_keys=True)
+    decryption_materials = reader.decryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="other", s3_metadata=s3_metadata)
+    )
+    assert materials.data_key.key == decryption_materials.data_key.key
+
+    with pytest.raises(MaterialsProviderError, match="another object"):
+        reader.decryption_materials(EncryptionContext(bucket_name="other", object_key="dummy", s3_metadata=s3_metadata))
+
+
+def test_branch_keys_are_generated_outside_the_lock(kms, key):
+    materials_provider, kms_client = _provider(kms, key, ttl=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_generate_data_key(**kwargs):
+        started.set()
+        release.wait(5)
+        return kms.generate_data_key(**kwargs)
+
+    kms_client.generate_data_key.side_effect = slow_generate_data_key
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        encrypting = executor.submit(
+            materials_provider.encryption_materials,
+            EncryptionContext(bucket_name="dummy", object_key="dummy"),
+        )
+        assert started.wait(5)
+
+        executor.submit(materials_provider.clear).result(timeout=1)
+
+        release.set()
+        materials = encrypting.result()
+
+    decryption_materials = materials_provider.decryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=materials.metadata.generate())
+    )
+    assert materials.data_key.key == decryption_materials.data_key.key
+
+
+def test_data_keys_need_a_branch_key(kms, key):
+    materials_provider, _ = _provider(kms, key)
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    metadata = materials.metadata.generate()
+    metadata["x-amz-matdesc"] = "{}"
+
+    with pytest.raises(MaterialsProviderError, match="no branch key"):
+        materials_provider.decryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=metadata)
+        )
+
+
+def test_rewrap_materials_move_data_keys_to_the_active_branch_key(kms, key, materials_provider):
+    hierarchical, _ = _provider(kms, key)
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    rewrapped = hierarchical.rewrap_materials(
+        EncryptionContext(bucket_name="dummy", object_key="dummy"),
+        materials.data_key,
+    )
+
+    decryption_materials = MultiKeyringMaterialsProvider([materials_provider, hierarchical]).decryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=rewrapped.metadata.generate())
+    )
+
+    assert materials.data_key.key == decryption_materials.data_key.key
@@ -1,5 +1,17 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import botocore
+import pytest
+
+from s3_encryption_sdk.exceptions import MaterialsProviderError, ThrottlingError
 from s3_encryption_sdk.keys import DataKeyAlgorithms
+from s3_encryption_sdk.materials import Metadata
 from s3_encryption_sdk.materials_providers import EncryptionContext, KmsMaterialsProvider
+from s3_encryption_sdk.materials_providers.kms import KmsMaterials
+from s3_encryption_sdk.rate_limiting import AdaptiveRateLimiter
 
 
 def test_encryption_materials(kms, key):
@@ -94,3 +106,190 @@ def test_aes192_encryption_materials(kms, key):
     assert plaintext == decrypted_ciphertext
 
     assert aes192.data_key_length == materials.data_key.algorithm.data_key_length == (192 // 8)
+
+
+def test_decryption_materials_parse_s3_metadata_once(kms, key):
+    materials_provider = KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=kms,
+    )
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+
+    encryption_context = EncryptionContext(
+        bucket_name="dummy",
+        object_key="dummy",
+        s3_metadata=materials.metadata.generate(),
+    )
+
+    with mock.patch.object(Metadata, "from_s3_metatdata", wraps=Metadata.from_s3_metatdata) as from_s3_metadata:
+        decryption_materials = materials_provider.decryption_materials(encryption_context)
+
+    assert 1 == from_s3_metadata.call_count
+    assert encryption_context.metadata is decryption_materials.metadata
+    assert materials.data_key.key == decryption_materials.data_key.key
+
+
+def test_decryption_materials_use_the_algorithm_of_the_object(kms, key):
+    writers = [
+        KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms, algorithm=algorithm)
+        for algorithm in DataKeyAlgorithms
+    ]
+    reader = KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms)
+
+    plaintext = b"foo bar"
+
+    for writer in writers:
+        materials = writer.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+        ciphertext = materials.data_key.encrypt(plaintext)
+
+        encryption_context = EncryptionContext(
+            bucket_name="dummy",
+            object_key="dummy",
+            s3_metadata=materials.metadata.generate(),
+        )
+
+        decryption_materials = reader.decryption_materials(encryption_context)
+
+        assert materials.data_key.algorithm is decryption_materials.data_key.algorithm
+        assert plaintext == decryption_materials.data_key.decrypt(ciphertext)
+
+
+def test_decryption_materials_reject_unknown_algorithms(kms, key):
+    materials_provider = KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=kms,
+    )
+
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+
+    s3_metadata = materials.metadata.generate()
+    s3_metadata["x-amz-tag-len"] = "96"
+
+    with pytest.raises(ValueError, match="96-bit tag"):
+        materials_provider.decryption_materials(
+            EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=s3_metadata)
+        )
+
+
+def test_rewrap_materials_keep_data_key(kms, key):
+    materials_provider = KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=kms,
+    )
+
+    encryption_context = EncryptionContext(bucket_name="dummy", object_key="dummy", unencrypted_content_length=7)
+    materials = materials_provider.encryption_materials(encryption_context)
+
+    rewrapped = materials_provider.rewrap_materials(encryption_context, materials.data_key)
+
+    assert materials.data_key is rewrapped.data_key
+    assert materials.metadata.iv == rewrapped.metadata.iv
+    assert materials.metadata.wrapped_data_key != rewrapped.metadata.wrapped_data_key
+
+    decryption_materials = materials_provider.decryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=rewrapped.metadata.generate())
+    )
+
+    assert materials.data_key.key == decryption_materials.data_key.key
+
+
+def _decryption_context(materials_provider):
+    materials = materials_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+
+    return materials, EncryptionContext(
+        bucket_name="dummy",
+        object_key="dummy",
+        s3_metadata=materials.metadata.generate(),
+    )
+
+
+def _throttling_error():
+    return botocore.exceptions.ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+        "Decrypt",
+    )
+
+
+def test_concurrent_decryptions_share_one_kms_request(kms, key):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_decrypt(**kwargs):
+        started.set()
+        release.wait(5)
+        return kms.decrypt(**kwargs)
+
+    kms_client = mock.Mock(wraps=kms)
+    kms_client.decrypt.side_effect = slow_decrypt
+
+    materials_provider = KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms_client)
+    materials, encryption_context = _decryption_context(materials_provider)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(materials_provider.decryption_materials, encryption_context)
+        started.wait(5)
+        others = [executor.submit(materials_provider.decryption_materials, encryption_context) for _ in range(3)]
+        time.sleep(0.1)
+        release.set()
+
+        results = [future.result() for future in [first] + others]
+
+    assert 1 == kms_client.decrypt.call_count
+    assert all(materials.data_key.key == result.data_key.key for result in results)
+
+    materials_provider.decryption_materials(encryption_context)
+
+    assert 2 == kms_client.decrypt.call_count
+
+
+def test_throttled_requests_are_retried(kms, key):
+    kms_client = mock.Mock(wraps=kms)
+    rate_limiter = AdaptiveRateLimiter(base_delay=0.001)
+
+    materials_provider = KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=kms_client,
+        rate_limiter=rate_limiter,
+    )
+    materials, encryption_context = _decryption_context(materials_provider)
+
+    response = kms.decrypt(**KmsMaterials(key_id=key["KeyMetadata"]["Arn"]).decrypt_params(encryption_context))
+    kms_client.decrypt.side_effect = [_throttling_error(), _throttling_error(), response]
+
+    decryption_materials = materials_provider.decryption_materials(encryption_context)
+
+    assert 3 == kms_client.decrypt.call_count
+    assert materials.data_key.key == decryption_materials.data_key.key
+    assert rate_limiter.rate is not None
+
+
+def test_throttled_requests_fail_after_the_last_attempt(kms, key):
+    kms_client = mock.Mock(wraps=kms)
+    kms_client.decrypt.side_effect = _throttling_error()
+
+    materials_provider = KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=kms_client,
+        rate_limiter=AdaptiveRateLimiter(max_attempts=2, base_delay=0.001, min_rate=1000),
+    )
+    _, encryption_context = _decryption_context(materials_provider)
+
+    with pytest.raises(ThrottlingError):
+        materials_provider.decryption_materials(encryption_context)
+
+    assert 2 == kms_client.decrypt.call_count
+
+
+def test_failed_requests_raise_materials_provider_errors(kms, key):
+    materials_provider = KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms)
+    _, encryption_context = _decryption_context(materials_provider)
+
+    with pytest.raises(MaterialsProviderError, match="Failed to unwrap"):
+        materials_provider.decryption_materials(
+            EncryptionContext(
+                bucket_name="other",
+                object_key="dummy",
+                s3_metadata=encryption_context.s3_metadata,
+            )
+        )
@@ -0,0 +1,128 @@
+import secrets
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from s3_encryption_sdk.keys import AesWrappingKey
+from s3_encryption_sdk.materials_providers import (
+    CachingMaterialsProvider,
+    EncryptionContext,
+    HierarchicalMaterialsProvider,
+    KmsMaterialsProvider,
+    MultiKeyringMaterialsProvider,
+    WrappedMaterialsProvider,
+)
+
+
+def _kms_materials_provider(kms, key):
+    return KmsMaterialsProvider(
+        key_id=key["KeyMetadata"]["Arn"],
+        client=mock.Mock(wraps=kms),
+    )
+
+
+def _round_trip(encrypting_provider, decrypting_provider):
+    plaintext = b"foo bar"
+
+    materials = encrypting_provider.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    ciphertext = materials.data_key.encrypt(plaintext)
+
+    encryption_context = EncryptionContext(
+        bucket_name="dummy",
+        object_key="dummy",
+        s3_metadata=materials.metadata.generate(),
+    )
+    materials = decrypting_provider.decryption_materials(encryption_context)
+
+    assert plaintext == materials.data_key.decrypt(ciphertext)
+
+
+def test_local_keys_are_used_without_kms_requests(kms, key):
+    kms_materials_provider = _kms_materials_provider(kms, key)
+    wrapped_materials_providers = [
+        WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32))) for _ in range(2)
+    ]
+
+    materials_provider = MultiKeyringMaterialsProvider([kms_materials_provider] + wrapped_materials_providers)
+
+    for wrapped_materials_provider in wrapped_materials_providers:
+        _round_trip(wrapped_materials_provider, materials_provider)
+
+    assert not kms_materials_provider._client.decrypt.called
+
+    _round_trip(materials_provider, materials_provider)
+
+    assert 1 == kms_materials_provider._client.decrypt.call_count
+
+
+def test_kms_requests_fan_out_to_all_kms_keys(kms, key):
+    unavailable = _kms_materials_provider(kms, key)
+    unavailable._client.decrypt.side_effect = ClientError({"Error": {"Code": "KMSInternalException"}}, "Decrypt")
+    available = _kms_materials_provider(kms, key)
+
+    materials_provider = MultiKeyringMaterialsProvider([available, unavailable])
+
+    _round_trip(materials_provider, materials_provider)
+
+    assert 1 == available._client.decrypt.call_count
+
+
+def test_kms_requests_go_to_the_key_that_wrapped_the_data_key(kms, key):
+    other_key = kms.create_key(KeyUsage="ENCRYPT_DECRYPT")
+    other = _kms_materials_provider(kms, other_key)
+    wrapping = _kms_materials_provider(kms, key)
+
+    materials = wrapping.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+    assert key["KeyMetadata"]["Arn"] == materials.metadata.material_description["kms_cmk_id"]
+
+    materials_provider = MultiKeyringMaterialsProvider([other, wrapping])
+    materials_provider.decryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=materials.metadata.generate())
+    )
+
+    assert not other._client.decrypt.called
+    assert 1 == wrapping._client.decrypt.call_count
+
+
+def test_kms_requests_go_to_the_key_that_wrapped_the_data_key_through_caches(kms, key):
+    other_key = kms.create_key(KeyUsage="ENCRYPT_DECRYPT")
+    other = _kms_materials_provider(kms, other_key)
+    wrapping = _kms_materials_provider(kms, key)
+
+    materials = wrapping.encryption_materials(EncryptionContext(bucket_name="dummy", object_key="dummy"))
+
+    materials_provider = MultiKeyringMaterialsProvider(
+        [CachingMaterialsProvider(other), CachingMaterialsProvider(wrapping)]
+    )
+    materials_provider.decryption_materials(
+        EncryptionContext(bucket_name="dummy", object_key="dummy", s3_metadata=materials.metadata.generate())
+    )
+
+    assert not other._client.decrypt.called
+    assert 1 == wrapping._client.decrypt.call_count
+
+
+def test_hierarchical_keys_are_asked_after_local_keys(kms, key):
+    hierarchical = HierarchicalMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms)
+    wrapped_materials_provider = WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+
+    materials_provider = MultiKeyringMaterialsProvider([hierarchical, wrapped_materials_provider])
+
+    with mock.patch.object(hierarchical, "decryption_materials", wraps=hierarchical.decryption_materials) as decrypt:
+        _round_trip(wrapped_materials_provider, materials_provider)
+        assert not decrypt.called
+
+        _round_trip(hierarchical, materials_provider)
+        assert decrypt.called
+
+
+def test_decryption_fails_without_matching_key(kms, key):
+    wrapped_materials_provider = WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+    other_wrapped_materials_provider = WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+
+    with pytest.raises(Exception, match="Failed to unwrap"):
+        _round_trip(wrapped_materials_provider, MultiKeyringMaterialsProvider([other_wrapped_materials_provider]))
+
+    with pytest.raises(Exception, match="No materials provider"):
+        _round_trip(wrapped_materials_provider, MultiKeyringMaterialsProvider([_kms_materials_provider(kms, key)]))
@@ -1,4 +1,16 @@
+import io
+import secrets
+import time
+from unittest import mock
+
+import pytest
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from cryptography.exceptions import InvalidTag
+
 from s3_encryption_sdk import EncryptedBucket
+from s3_encryption_sdk.keys import AesWrappingKey
+from s3_encryption_sdk.materials_providers import WrappedMaterialsProvider
 
 
 def test_object_get(materials_provider, bucket):
@@ -17,5 +29,162 @@ def test_object_get(materials_provider, bucket):
     encrypted_obj = bucket.Object("object").get()
     decrypted_obj = crypto_bucket.Object("object").get()
 
-    assert body != encrypted_obj["Body"].read().decode()
+    assert body.encode() != encrypted_obj["Body"].read()
     assert body == decrypted_obj["Body"].read().decode()
+
+
+def test_download_file(materials_provider, bucket, tmp_path):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(1024 * 1024 + 7)
+    config = TransferConfig(multipart_threshold=64 * 1024, multipart_chunksize=64 * 1024, io_chunksize=4096)
+
+    crypto_bucket.put_object(
+        Key="object",
+        Body=body,
+    )
+
+    filename = tmp_path / "object"
+    crypto_bucket.download_file("object", str(filename), Config=config)
+
+    fileobj = io.BytesIO()
+    crypto_bucket.download_fileobj("object", fileobj, Config=config)
+
+    assert body == filename.read_bytes()
+    assert body == fileobj.getvalue()
+    assert ["object"] == [path.name for path in tmp_path.iterdir()]
+
+
+def test_download_file_resolves_materials_of_base64_encoded_objects_once(materials_provider, bucket, tmp_path):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+        base64_encode=True,
+    )
+
+    body = secrets.token_bytes(100 * 1024 + 7)
+    crypto_bucket.put_object(Key="object", Body=body)
+
+    filename = tmp_path / "object"
+    with mock.patch.object(
+        materials_provider, "decryption_materials", wraps=materials_provider.decryption_materials
+    ) as decryption_materials:
+        crypto_bucket.download_file("object", str(filename))
+
+    assert body == filename.read_bytes()
+    assert 1 == decryption_materials.call_count
+
+
+def test_download_file_rejects_tampered_objects(materials_provider, bucket, tmp_path):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+    )
+
+    crypto_bucket.put_object(
+        Key="object",
+        Body=b"foo bar 4711",
+    )
+
+    encrypted_obj = bucket.Object("object").get()
+    ciphertext = bytearray(encrypted_obj["Body"].read())
+    ciphertext[0] ^= 1
+    bucket.put_object(Key="object", Body=bytes(ciphertext), Metadata=encrypted_obj["Metadata"])
+
+    with pytest.raises(InvalidTag):
+        crypto_bucket.download_file("object", str(tmp_path / "object"))
+
+    assert [] == list(tmp_path.iterdir())
+
+
+def test_put_and_get_objects(materials_provider, bucket):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+    )
+
+    bodies = {"object-%d" % index: secrets.token_bytes(100) for index in range(20)}
+
+    put_results = list(
+        crypto_bucket.put_objects(({"Key": key, "Body": body} for key, body in bodies.items()), max_workers=4)
+    )
+
+    get_results = list(crypto_bucket.get_objects(list(bodies) + ["missing"], max_workers=4, ordered=False))
+
+    assert list(bodies) == [result.key for result in put_results]
+    assert all(result.ok for result in put_results)
+    assert sorted(list(bodies) + ["missing"]) == sorted(result.key for result in get_results)
+    for result in get_results:
+        if result.key == "missing":
+            assert not result.ok
+            assert isinstance(result.error, ClientError)
+        else:
+            assert bodies[result.key] == result.response["Body"].read()
+
+
+def test_put_objects_runs_without_consuming_the_results(materials_provider, bucket):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+    )
+
+    results = crypto_bucket.put_objects(
+        ({"Key": "eager/object-%d" % index, "Body": b"foo bar"} for index in range(10)),
+        max_workers=2,
+    )
+    deadline = time.monotonic() + 10
+    while len(list(bucket.objects.filter(Prefix="eager/"))) < 10 and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    assert 10 == len(list(bucket.objects.filter(Prefix="eager/")))
+    assert all(result.ok for result in results.wait())
+    assert 10 == len(list(results))
+
+
+def test_rewrap_objects(materials_provider, bucket):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+    )
+
+    bodies = {"rewrap/object-%d" % index: secrets.token_bytes(100) for index in range(5)}
+    for key, body in bodies.items():
+        crypto_bucket.put_object(Key=key, Body=body)
+    bucket.put_object(Key="rewrap/plaintext", Body=b"foo bar")
+
+    wrapped_materials_provider = WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+
+    results = {
+        result.key: result for result in crypto_bucket.rewrap_objects(wrapped_materials_provider, Prefix="rewrap/")
+    }
+
+    assert sorted(list(bodies) + ["rewrap/plaintext"]) == sorted(results)
+    assert not results.pop("rewrap/plaintext").ok
+    assert all(result.ok for result in results.values())
+
+    rewrapped_bucket = EncryptedBucket(bucket=bucket, materials_provider=wrapped_materials_provider)
+    for key, body in bodies.items():
+        assert body == rewrapped_bucket.Object(key).get()["Body"].read()
+
+
+def test_copy_prefix(materials_provider, bucket):
+    crypto_bucket = EncryptedBucket(
+        bucket=bucket,
+        materials_provider=materials_provider,
+    )
+
+    bodies = {"source/object-%d" % index: secrets.token_bytes(100) for index in range(5)}
+    for key, body in bodies.items():
+        crypto_bucket.put_object(Key=key, Body=body)
+
+    results = list(crypto_bucket.copy_prefix("source/", "destination/", max_workers=4))
+
+    assert list(bodies) == [result.key for result in results]
+    assert all(result.ok for result in results)
+    for key, body in bodies.items():
+        copy = "destination/" + key[len("source/") :]
+        assert bucket.Object(key).get()["Body"].read() == bucket.Object(copy).get()["Body"].read()
+        assert body == crypto_bucket.Object(copy).get()["Body"].read()
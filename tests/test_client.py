@@ -1,4 +1,14 @@
+import io
+import mmap
+import secrets
+from unittest import mock
+
+import pytest
+from boto3.s3.transfer import TransferConfig
+
 from s3_encryption_sdk import EncryptedClient
+from s3_encryption_sdk.materials_providers import CachingMaterialsProvider, KmsMaterialsProvider
+from s3_encryption_sdk.object import EncryptedObject
 
 
 def test_get_object(materials_provider, s3, bucket):
@@ -25,5 +35,286 @@ def test_get_object(materials_provider, s3, bucket):
         Key="object",
     )
 
-    assert body != encrypted_obj["Body"].read().decode()
+    assert body.encode() != encrypted_obj["Body"].read()
     assert body == decrypted_obj["Body"].read().decode()
+
+
+def test_reuses_injected_client(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    with mock.patch("boto3.resource", side_effect=AssertionError("no resource per request")):
+        crypto_s3.put_object(Bucket=bucket.name, Key="object", Body="foo bar")
+        decrypted_obj = crypto_s3.get_object(Bucket=bucket.name, Key="object")
+
+    assert b"foo bar" == decrypted_obj["Body"].read()
+    assert client.put_object.called
+    assert client.get_object.called
+
+
+def test_upload_fileobj_uses_encrypted_multipart_upload(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(12 * 1024 * 1024 + 7)
+    config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    crypto_s3.upload_fileobj(io.BytesIO(body), bucket.name, "object", Config=config)
+
+    decrypted_obj = crypto_s3.get_object(Bucket=bucket.name, Key="object")
+
+    assert 3 == client.upload_part.call_count
+    assert body == decrypted_obj["Body"].read()
+
+
+@pytest.mark.parametrize("size, parts", [(1024, 0), (12 * 1024 * 1024 + 7, 3)])
+def test_upload_fileobj_of_unknown_length(materials_provider, s3, bucket, size, parts):
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(size)
+    fileobj = io.BufferedReader(io.BytesIO(body))
+    fileobj.seekable = lambda: False
+    config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    crypto_s3.upload_fileobj(fileobj, bucket.name, "object", Config=config)
+
+    decrypted_obj = crypto_s3.get_object(Bucket=bucket.name, Key="object")
+
+    assert parts == client.upload_part.call_count
+    assert body == decrypted_obj["Body"].read()
+    # A single put counts the bytes it encrypted; the metadata of a multipart upload is fixed before the length is known.
+    if parts:
+        assert "x-amz-unencrypted-content-length" not in decrypted_obj["Metadata"]
+    else:
+        assert str(size) == decrypted_obj["Metadata"]["x-amz-unencrypted-content-length"]
+
+
+def test_upload_fileobj_stops_at_the_first_failed_part(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+    client.upload_part.side_effect = ValueError("upload failed")
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(30 * 1024 * 1024)
+    config = TransferConfig(
+        multipart_threshold=5 * 1024 * 1024,
+        multipart_chunksize=5 * 1024 * 1024,
+        max_concurrency=2,
+    )
+
+    with mock.patch.object(
+        EncryptedObject, "encrypt_part", autospec=True, side_effect=EncryptedObject.encrypt_part
+    ) as encrypt_part, pytest.raises(ValueError, match="upload failed"):
+        crypto_s3.upload_fileobj(io.BytesIO(body), bucket.name, "object", Config=config)
+
+    # Parts are only encrypted once an upload slot is free, so no more than the slots plus one are.
+    assert encrypt_part.call_count <= 3
+    assert client.upload_part.call_count <= 2
+    assert client.abort_multipart_upload.called
+
+
+def test_upload_fileobj_aborts_uploads_with_sse_c(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+    client.upload_part.side_effect = ValueError("upload failed")
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+    extra_args = {"SSECustomerAlgorithm": "AES256", "SSECustomerKey": secrets.token_bytes(32)}
+
+    with pytest.raises(ValueError, match="upload failed"):
+        crypto_s3.upload_fileobj(
+            io.BytesIO(secrets.token_bytes(12 * 1024 * 1024)), bucket.name, "object", ExtraArgs=extra_args, Config=config
+        )
+
+    # SSE-C keys go on every part, but AbortMultipartUpload does not take them.
+    assert "SSECustomerKey" in client.upload_part.call_args.kwargs
+    assert "SSECustomerKey" not in client.abort_multipart_upload.call_args.kwargs
+
+
+@pytest.mark.parametrize("size, parts", [(0, 0), (1024, 0), (12 * 1024 * 1024 + 7, 3)])
+def test_upload_file_maps_the_file(materials_provider, s3, bucket, tmp_path, size, parts):
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(size)
+    filename = tmp_path / "object"
+    filename.write_bytes(body)
+    config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    crypto_s3.upload_file(str(filename), bucket.name, "object", Config=config)
+
+    decrypted_obj = crypto_s3.get_object(Bucket=bucket.name, Key="object")
+
+    assert parts == client.upload_part.call_count
+    assert body == decrypted_obj["Body"].read()
+    assert str(size) == decrypted_obj["Metadata"]["x-amz-unencrypted-content-length"]
+
+
+@pytest.mark.parametrize("size, failing", [(1024, "put_object"), (12 * 1024 * 1024 + 7, "upload_part")])
+def test_upload_file_unmaps_the_file_when_the_upload_fails(
+    materials_provider, s3, bucket, tmp_path, monkeypatch, size, failing
+):
+    client = mock.Mock(wraps=s3)
+    getattr(client, failing).side_effect = ValueError("upload failed")
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    filename = tmp_path / "object"
+    filename.write_bytes(secrets.token_bytes(size))
+    config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    mappings = []
+
+    class Mapping(mmap.mmap):
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+            mappings.append(self)
+
+    monkeypatch.setattr(mmap, "mmap", Mapping)
+
+    with pytest.raises(ValueError, match="upload failed"):
+        crypto_s3.upload_file(str(filename), bucket.name, "object", Config=config)
+
+    assert all(mapping.closed for mapping in mappings) and mappings
+
+
+def test_multipart_upload_parts_must_be_in_order(materials_provider, s3, bucket):
+    crypto_s3 = EncryptedClient(
+        client=s3,
+        materials_provider=materials_provider,
+    )
+
+    upload_id = crypto_s3.create_multipart_upload(Bucket=bucket.name, Key="object")["UploadId"]
+
+    with pytest.raises(ValueError):
+        crypto_s3.upload_part(Bucket=bucket.name, Key="object", UploadId=upload_id, PartNumber=2, Body=b"foo")
+
+    part = crypto_s3.upload_part(
+        Bucket=bucket.name,
+        Key="object",
+        UploadId=upload_id,
+        PartNumber=1,
+        Body=b"foo bar",
+        IsLastPart=True,
+    )
+    crypto_s3.complete_multipart_upload(
+        Bucket=bucket.name,
+        Key="object",
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"ETag": part["ETag"], "PartNumber": 1}]},
+    )
+
+    assert b"foo bar" == crypto_s3.get_object(Bucket=bucket.name, Key="object")["Body"].read()
+
+
+def test_multipart_uploads_of_unknown_length_are_marked_raw(materials_provider, s3, bucket):
+    crypto_s3 = EncryptedClient(
+        client=s3,
+        materials_provider=materials_provider,
+    )
+
+    # Stored as 24 bytes, the size of an empty body in the legacy base64 format.
+    body = b"8 bytes!"
+
+    upload_id = crypto_s3.create_multipart_upload(Bucket=bucket.name, Key="object")["UploadId"]
+    part = crypto_s3.upload_part(
+        Bucket=bucket.name,
+        Key="object",
+        UploadId=upload_id,
+        PartNumber=1,
+        Body=body,
+        IsLastPart=True,
+    )
+    crypto_s3.complete_multipart_upload(
+        Bucket=bucket.name,
+        Key="object",
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"ETag": part["ETag"], "PartNumber": 1}]},
+    )
+
+    assert "raw" == s3.head_object(Bucket=bucket.name, Key="object")["Metadata"]["x-amz-body-encoding"]
+    assert body == crypto_s3.get_object(Bucket=bucket.name, Key="object")["Body"].read()
+
+
+def test_copy_object_rewraps_data_key_for_destination(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(1024)
+    crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body, Metadata={"owner": "foo"})
+
+    crypto_s3.copy_object(Bucket=bucket.name, Key="copy", CopySource={"Bucket": bucket.name, "Key": "object"})
+
+    source = s3.get_object(Bucket=bucket.name, Key="object")
+    copy = s3.get_object(Bucket=bucket.name, Key="copy")
+
+    assert not client.get_object.called
+    assert source["Body"].read() == copy["Body"].read()
+    assert source["Metadata"]["x-amz-key-v2"] != copy["Metadata"]["x-amz-key-v2"]
+    assert "foo" == copy["Metadata"]["owner"]
+    assert body == crypto_s3.get_object(Bucket=bucket.name, Key="copy")["Body"].read()
+
+    crypto_s3.copy_object(Bucket=bucket.name, Key="copy", CopySource="%s/object" % bucket.name)
+
+    assert body == crypto_s3.get_object(Bucket=bucket.name, Key="copy")["Body"].read()
+
+
+def test_prefetch_materials_warms_caching_materials_provider(kms, key, s3, bucket):
+    kms_client = mock.Mock(wraps=kms)
+    materials_provider = CachingMaterialsProvider(
+        KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms_client),
+    )
+
+    crypto_s3 = EncryptedClient(
+        client=s3,
+        materials_provider=materials_provider,
+    )
+
+    bodies = {"object-%d" % index: secrets.token_bytes(100) for index in range(3)}
+    writer = EncryptedClient(
+        client=s3,
+        materials_provider=KmsMaterialsProvider(key_id=key["KeyMetadata"]["Arn"], client=kms),
+    )
+    for object_key, body in bodies.items():
+        writer.put_object(Bucket=bucket.name, Key=object_key, Body=body)
+
+    results = crypto_s3.prefetch_materials(Bucket=bucket.name, Keys=list(bodies) + ["missing"], max_workers=2)
+
+    assert [True, True, True, False] == [result.ok for result in results]
+    assert 3 == kms_client.decrypt.call_count
+
+    for object_key, body in bodies.items():
+        assert body == crypto_s3.get_object(Bucket=bucket.name, Key=object_key)["Body"].read()
+
+    assert 3 == kms_client.decrypt.call_count
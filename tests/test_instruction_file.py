@@ -0,0 +1,108 @@
+import json
+import secrets
+from unittest import mock
+
+from s3_encryption_sdk import EncryptedClient, EncryptedObject
+from s3_encryption_sdk.client import ClientObject
+from s3_encryption_sdk.instruction_file import InstructionFiles
+from s3_encryption_sdk.keys import AesWrappingKey
+from s3_encryption_sdk.materials_providers import WrappedMaterialsProvider
+
+
+def _instruction_file_gets(client):
+    return [call for call in client.get_object.call_args_list if call[1]["Key"].endswith(".instruction")]
+
+
+def test_instruction_files(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+        instruction_files=InstructionFiles(),
+    )
+
+    body = secrets.token_bytes(1024)
+    crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body, Metadata={"owner": "foo"})
+
+    encrypted_obj = s3.get_object(Bucket=bucket.name, Key="object")
+    instruction_file = s3.get_object(Bucket=bucket.name, Key="object.instruction")
+    envelope = json.loads(instruction_file["Body"].read())
+
+    assert {
+        "owner": "foo",
+        "x-amz-unencrypted-content-length": "1024",
+        "x-amz-body-encoding": "raw",
+    } == encrypted_obj["Metadata"]
+    assert {"x-amz-key-v2", "x-amz-iv", "x-amz-matdesc", "x-amz-wrap-alg", "x-amz-cek-alg", "x-amz-tag-len"} == set(
+        envelope
+    )
+    assert "x-amz-crypto-instr-file" in instruction_file["Metadata"]
+
+    for _ in range(2):
+        assert body == crypto_s3.get_object(Bucket=bucket.name, Key="object")["Body"].read()
+    assert body[10:20] == crypto_s3.get_object(Bucket=bucket.name, Key="object", Range="bytes=10-19")["Body"].read()
+
+    assert [] == _instruction_file_gets(client)
+
+    other_crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+        instruction_files=InstructionFiles(),
+    )
+
+    assert body == other_crypto_s3.get_object(Bucket=bucket.name, Key="object")["Body"].read()
+    assert 1 == len(_instruction_file_gets(client))
+
+    # Clients that write the metadata to the object read instruction files, too.
+    default_crypto_s3 = EncryptedClient(client=s3, materials_provider=materials_provider)
+
+    assert body == default_crypto_s3.get_object(Bucket=bucket.name, Key="object")["Body"].read()
+
+
+def test_rewrap_rewrites_only_the_instruction_file(materials_provider, s3, bucket):
+    client = mock.Mock(wraps=s3)
+    instruction_files = InstructionFiles()
+
+    crypto_s3 = EncryptedClient(
+        client=client,
+        materials_provider=materials_provider,
+        instruction_files=instruction_files,
+    )
+
+    body = secrets.token_bytes(1024)
+    crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body)
+
+    wrapped_materials_provider = WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+    crypto_obj = EncryptedObject(
+        obj=ClientObject(client, bucket.name, "object"),
+        materials_provider=materials_provider,
+        instruction_files=instruction_files,
+    )
+    crypto_obj.rewrap(wrapped_materials_provider)
+
+    rewrapped_s3 = EncryptedClient(
+        client=client,
+        materials_provider=wrapped_materials_provider,
+        instruction_files=instruction_files,
+    )
+
+    assert not client.copy_object.called
+    assert body == rewrapped_s3.get_object(Bucket=bucket.name, Key="object")["Body"].read()
+
+
+def test_download_file(materials_provider, s3, bucket, tmp_path):
+    crypto_s3 = EncryptedClient(
+        client=s3,
+        materials_provider=materials_provider,
+        instruction_files=InstructionFiles(),
+    )
+
+    body = secrets.token_bytes(1024)
+    crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body)
+
+    filename = tmp_path / "object"
+
+    for reader in (crypto_s3, EncryptedClient(client=s3, materials_provider=materials_provider)):
+        reader.download_file(bucket.name, "object", str(filename))
+        assert body == filename.read_bytes()
@@ -0,0 +1,65 @@
+import secrets
+from collections import Counter, defaultdict
+
+from s3_encryption_sdk import EncryptedClient
+from s3_encryption_sdk.instrumentation import NO_INSTRUMENTATION, CallbackInstrumentation
+from s3_encryption_sdk.materials_providers import CachingMaterialsProvider, KmsMaterialsProvider
+
+
+def _instrumentation():
+    phases = defaultdict(list)
+    counters = Counter()
+    instrumentation = CallbackInstrumentation(
+        on_phase=lambda name, seconds: phases[name].append(seconds),
+        on_count=lambda name, value: counters.update({name: value}),
+    )
+    return instrumentation, phases, counters
+
+
+def test_put_and_get_report_phases_and_counters(kms, key, s3, bucket):
+    instrumentation, phases, counters = _instrumentation()
+
+    crypto_s3 = EncryptedClient(
+        client=s3,
+        materials_provider=KmsMaterialsProvider(
+            key_id=key["KeyMetadata"]["Arn"],
+            client=kms,
+            instrumentation=instrumentation,
+        ),
+        instrumentation=instrumentation,
+    )
+
+    body = secrets.token_bytes(1024)
+
+    crypto_s3.put_object(Bucket=bucket.name, Key="object", Body=body)
+    decrypted_obj = crypto_s3.get_object(Bucket=bucket.name, Key="object")
+
+    assert body == decrypted_obj["Body"].read()
+    assert {"materials", "kms.generate_data_key", "kms.decrypt", "cipher", "s3.put", "s3.get"} <= set(phases)
+    assert all(seconds >= 0 for durations in phases.values() for seconds in durations)
+    assert 2 == counters["kms.calls"]
+    assert len(body) == counters["bytes.encrypted"]
+    assert len(body) == counters["bytes.decrypted"]
+
+
+def test_caching_materials_provider_counts_hits_and_misses(materials_provider, s3, bucket):
+    instrumentation, _, counters = _instrumentation()
+
+    crypto_s3 = EncryptedClient(
+        client=s3,
+        materials_provider=CachingMaterialsProvider(materials_provider, instrumentation=instrumentation),
+    )
+
+    for index in range(3):
+        crypto_s3.put_object(Bucket=bucket.name, Key="object-%d" % index, Body="foo bar")
+
+    assert 1 == counters["cache.misses"]
+    assert 2 == counters["cache.hits"]
+
+
+def test_disabled_instrumentation_does_not_time():
+    with NO_INSTRUMENTATION.phase("cipher") as phase:
+        pass
+
+    phase.report()
+    assert not NO_INSTRUMENTATION.enabled
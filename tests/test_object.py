@@ -1,4 +1,17 @@
+import base64
+import io
+import mmap
+import secrets
+import time
+from unittest import mock
+
+import pytest
+from boto3.s3.transfer import TransferConfig
+
 from s3_encryption_sdk import EncryptedObject
+from s3_encryption_sdk.exceptions import MaterialsProviderError
+from s3_encryption_sdk.keys import AesWrappingKey
+from s3_encryption_sdk.materials_providers import MaterialsProvider, WrappedMaterialsProvider
 
 
 def test_get(materials_provider, bucket):
@@ -18,5 +31,204 @@ def test_get(materials_provider, bucket):
     encrypted_obj = obj.get()
     decrypted_obj = crypto_obj.get()
 
-    assert body != encrypted_obj["Body"].read().decode()
+    assert body.encode() != encrypted_obj["Body"].read()
     assert body == decrypted_obj["Body"].read().decode()
+
+
+def test_put_streams_file_like_bodies(materials_provider, bucket):
+    obj = bucket.Object("object")
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+        chunk_size=16,
+    )
+
+    body = b"foo bar 4711" * 100
+
+    crypto_obj.put(
+        Body=io.BytesIO(body),
+    )
+
+    decrypted_obj = crypto_obj.get()
+
+    assert body == decrypted_obj["Body"].read()
+    assert str(len(body)) == decrypted_obj["Metadata"]["x-amz-unencrypted-content-length"]
+
+
+def test_put_memory_mapped_bodies(materials_provider, bucket, tmp_path):
+    obj = bucket.Object("object")
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+    )
+
+    body = b"foo bar 4711" * 100
+    path = tmp_path / "body"
+    path.write_bytes(body)
+
+    with path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        crypto_obj.put(
+            Body=mapped,
+        )
+
+    decrypted_obj = crypto_obj.get()
+
+    assert body == decrypted_obj["Body"].read()
+    assert str(len(body)) == decrypted_obj["Metadata"]["x-amz-unencrypted-content-length"]
+
+
+def test_put_spools_iterator_bodies(materials_provider, bucket):
+    obj = bucket.Object("object")
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+        chunk_size=16,
+    )
+
+    chunks = [b"foo", b"bar" * 20, b"4711"]
+
+    crypto_obj.put(
+        Body=iter(chunks),
+    )
+
+    decrypted_obj = crypto_obj.get()
+
+    assert b"".join(chunks) == decrypted_obj["Body"].read()
+    assert str(len(b"".join(chunks))) == decrypted_obj["Metadata"]["x-amz-unencrypted-content-length"]
+
+
+def test_get_reads_base64_encoded_bodies(materials_provider, bucket):
+    obj = bucket.Object("object")
+
+    legacy_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+        base64_encode=True,
+    )
+
+    body = "foo bar 4711"
+
+    legacy_obj.put(
+        Body=body,
+    )
+
+    encrypted_obj = obj.get()
+
+    # Objects without the marker are in the legacy format.
+    obj.copy_from(
+        CopySource={"Bucket": obj.bucket_name, "Key": obj.key},
+        Metadata={k: v for k, v in encrypted_obj["Metadata"].items() if k != "x-amz-body-encoding"},
+        MetadataDirective="REPLACE",
+    )
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+    )
+
+    assert "base64" == encrypted_obj["Metadata"]["x-amz-body-encoding"]
+    assert base64.b64decode(encrypted_obj["Body"].read())
+    assert body.encode() == crypto_obj.get()["Body"].read()
+
+
+@pytest.mark.parametrize(
+    "byte_range, expected",
+    [
+        ("bytes=100-199", slice(100, 200)),
+        ("bytes=17-17", slice(17, 18)),
+        ("bytes=990-", slice(990, None)),
+        ("bytes=500-5000", slice(500, None)),
+        ("bytes=-5", slice(-5, None)),
+        ("bytes=-5000", slice(0, None)),
+    ],
+)
+def test_get_range(materials_provider, bucket, byte_range, expected):
+    obj = bucket.Object("object")
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(1000)
+
+    crypto_obj.put(
+        Body=body,
+    )
+
+    decrypted_obj = crypto_obj.get(Range=byte_range)
+
+    assert decrypted_obj["Unauthenticated"]
+    assert body[expected] == decrypted_obj["Body"].read()
+    assert len(body[expected]) == decrypted_obj["ContentLength"]
+
+
+@pytest.mark.parametrize("size", [7, 12 * 1024 * 1024 + 7])
+def test_rewrap_replaces_only_the_metadata(materials_provider, bucket, size):
+    obj = bucket.Object("object")
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+    )
+
+    body = secrets.token_bytes(size)
+    crypto_obj.put(Body=body, ContentType="application/octet-stream", Metadata={"owner": "foo"})
+    ciphertext = obj.get()["Body"].read()
+
+    wrapped_materials_provider = WrappedMaterialsProvider(wrapping_key=AesWrappingKey(secrets.token_bytes(32)))
+    config = TransferConfig(multipart_threshold=8 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    metadata = crypto_obj.rewrap(wrapped_materials_provider, Config=config)
+
+    encrypted_obj = obj.get()
+    rewrapped_obj = EncryptedObject(obj=obj, materials_provider=wrapped_materials_provider)
+
+    assert "AESWrap" == metadata["x-amz-wrap-alg"] == encrypted_obj["Metadata"]["x-amz-wrap-alg"]
+    assert "foo" == encrypted_obj["Metadata"]["owner"]
+    assert "application/octet-stream" == encrypted_obj["ContentType"]
+    assert ciphertext == encrypted_obj["Body"].read()
+    assert body == rewrapped_obj.get()["Body"].read()
+
+
+def test_rewrap_fails_for_providers_that_cannot_wrap_existing_data_keys(materials_provider, bucket):
+    class EncryptOnlyMaterialsProvider(MaterialsProvider):
+        def decryption_materials(self, encryption_context):
+            return materials_provider.decryption_materials(encryption_context)
+
+        def encryption_materials(self, encryption_context):
+            return materials_provider.encryption_materials(encryption_context)
+
+    crypto_obj = EncryptedObject(obj=bucket.Object("object"), materials_provider=materials_provider)
+    crypto_obj.put(Body=b"foo bar")
+
+    with pytest.raises(MaterialsProviderError, match="EncryptOnlyMaterialsProvider cannot wrap"):
+        crypto_obj.rewrap(EncryptOnlyMaterialsProvider())
+
+
+def test_get_downloads_while_materials_are_resolved(materials_provider, bucket):
+    obj = bucket.Object("object")
+
+    crypto_obj = EncryptedObject(
+        obj=obj,
+        materials_provider=materials_provider,
+        chunk_size=256 * 1024,
+    )
+
+    body = secrets.token_bytes(1024 * 1024 + 7)
+    crypto_obj.put(Body=body)
+
+    decryption_materials = materials_provider.decryption_materials
+
+    def slow_decryption_materials(encryption_context):
+        time.sleep(0.2)
+        return decryption_materials(encryption_context)
+
+    with mock.patch.object(materials_provider, "decryption_materials", side_effect=slow_decryption_materials):
+        decrypted_obj = crypto_obj.get()
+
+    assert 0 < len(decrypted_obj["Body"]._buffer)
+    assert body == decrypted_obj["Body"].read()
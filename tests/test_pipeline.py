@@ -0,0 +1,56 @@
+import base64
+import multiprocessing
+import secrets
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from s3_encryption_sdk import EncryptedBucket
+from s3_encryption_sdk.keys import DataKey, DataKeyAlgorithms
+from s3_encryption_sdk.pipeline import EncryptionPipeline
+
+
+def _data_key():
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+    return DataKey(
+        algorithm=algorithm,
+        key=algorithm.generate_data_key(),
+        iv=algorithm.generate_iv(),
+    )
+
+
+def _process_pool():
+    # Forking a process that runs threads, e.g. moto's, can deadlock the child.
+    return ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+
+@pytest.mark.parametrize("executor_factory", [lambda: ThreadPoolExecutor(max_workers=2), _process_pool])
+@pytest.mark.parametrize("base64_encode", [False, True])
+def test_pipeline_matches_inline_encryption(executor_factory, base64_encode):
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(256 * 1024 + 7)
+
+    with executor_factory() as executor:
+        with EncryptionPipeline(executor).encrypt(data_key, bytearray(plaintext), base64_encode) as body:
+            encrypted = body.read()
+
+    expected = data_key.encrypt(plaintext)
+    assert (base64.b64encode(expected) if base64_encode else expected) == encrypted
+
+
+def test_bucket_encrypts_on_process_pool(materials_provider, bucket):
+    with _process_pool() as executor:
+        crypto_bucket = EncryptedBucket(
+            bucket=bucket,
+            materials_provider=materials_provider,
+            executor=executor,
+        )
+
+        bodies = {"object-%d" % index: secrets.token_bytes(128 * 1024 + index) for index in range(4)}
+
+        items = [{"Key": key, "Body": body} for key, body in bodies.items()]
+        results = list(crypto_bucket.put_objects(items, max_workers=2))
+
+    assert all(result.ok for result in results)
+    for key, body in bodies.items():
+        assert body == crypto_bucket.Object(key).get()["Body"].read()
@@ -0,0 +1,76 @@
+import time
+
+import botocore
+import pytest
+
+from s3_encryption_sdk.exceptions import ThrottlingError
+from s3_encryption_sdk.rate_limiting import AdaptiveRateLimiter, is_throttling_error
+
+
+def _client_error(code):
+    return botocore.exceptions.ClientError({"Error": {"Code": code, "Message": code}}, "Decrypt")
+
+
+def test_throttling_limits_the_rate_and_recovers_beyond_the_rate_before():
+    rate_limiter = AdaptiveRateLimiter(min_rate=1, backoff=0.5, increase=1000)
+
+    assert rate_limiter.rate is None
+
+    for _ in range(20):
+        rate_limiter.acquire()
+    rate_limiter.throttled()
+    assert 10 == rate_limiter.rate
+
+    rate_limiter.acquire()
+    rate_limiter.succeeded()
+    assert 10 <= rate_limiter.rate < 20
+
+    # The cubic curve passes the rate before throttling after (20 * 0.5 / 1000) ** (1 / 3) seconds, about 0.22.
+    time.sleep(0.3)
+    rate_limiter.acquire()
+    rate_limiter.succeeded()
+    assert 20 < rate_limiter.rate <= 2 * 21
+
+
+def test_throttles_of_one_episode_cut_the_rate_once():
+    rate_limiter = AdaptiveRateLimiter(min_rate=1, backoff=0.5, throttle_window=0.1)
+
+    for _ in range(20):
+        rate_limiter.acquire()
+    for _ in range(8):
+        rate_limiter.throttled()
+    assert 10 == rate_limiter.rate
+
+    time.sleep(0.1)
+    rate_limiter.throttled()
+    assert 5 == rate_limiter.rate
+
+
+def test_only_throttling_errors_are_retried():
+    rate_limiter = AdaptiveRateLimiter(max_attempts=3, base_delay=0.001, min_rate=1000)
+    attempts = []
+
+    def denied():
+        attempts.append(1)
+        raise _client_error("AccessDeniedException")
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        rate_limiter.call(denied)
+
+    def throttled():
+        attempts.append(1)
+        raise _client_error("ThrottlingException")
+
+    with pytest.raises(ThrottlingError):
+        rate_limiter.call(throttled)
+
+    assert 4 == len(attempts)
+    assert is_throttling_error(_client_error("TooManyRequestsException"))
+    assert not is_throttling_error(ValueError())
+
+
+def test_retry_delays_are_jittered_and_bounded():
+    rate_limiter = AdaptiveRateLimiter(base_delay=0.1, max_delay=0.5)
+
+    assert all(0 <= rate_limiter.delay(attempt) <= 0.5 for attempt in range(10))
+    assert 1 < len({rate_limiter.delay(3) for _ in range(10)})
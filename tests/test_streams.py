@@ -0,0 +1,144 @@
+import base64
+import io
+import secrets
+import tracemalloc
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from s3_encryption_sdk.keys import DataKey, DataKeyAlgorithms
+from s3_encryption_sdk.streams import DecryptionStreamingBodyWrapper, EncryptionStreamingBody
+
+
+def _data_key():
+    algorithm = DataKeyAlgorithms.AES_256_GCM_IV12_TAG16
+    return DataKey(
+        algorithm=algorithm,
+        key=algorithm.generate_data_key(),
+        iv=algorithm.generate_iv(),
+    )
+
+
+def test_encryption_streaming_body_matches_one_shot_encryption():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+
+    body = EncryptionStreamingBody(body=plaintext, data_key=data_key, chunk_size=7)
+
+    encrypted = b"".join(iter(lambda: body.read(5), b""))
+
+    assert len(body) == len(encrypted)
+    assert data_key.encrypt(plaintext) == encrypted
+
+
+def test_encryption_streaming_body_base64_encodes_across_chunks():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+
+    body = EncryptionStreamingBody(body=plaintext, data_key=data_key, chunk_size=7, base64_encode=True)
+
+    encrypted = b"".join(iter(lambda: body.read(5), b""))
+
+    assert len(body) == len(encrypted)
+    assert data_key.encrypt(plaintext) == base64.b64decode(encrypted)
+
+
+def test_encryption_streaming_body_seek_restarts_encryption():
+    data_key = _data_key()
+
+    body = EncryptionStreamingBody(body=io.BytesIO(b"foo bar 4711"), data_key=data_key, chunk_size=4)
+
+    first = body.read()
+    body.seek(0)
+
+    assert body.seekable()
+    assert first == body.read()
+
+
+def _encrypted_body(data_key, plaintext):
+    return io.BytesIO(data_key.encrypt(plaintext))
+
+
+def test_decryption_streaming_body_reads_in_chunks():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+
+    body = DecryptionStreamingBodyWrapper(
+        streaming_body=_encrypted_body(data_key, plaintext),
+        data_key=data_key,
+        chunk_size=7,
+    )
+
+    assert plaintext == b"".join(body.iter_chunks(13))
+    assert len(plaintext) == body.tell()
+
+
+def test_decryption_streaming_body_decodes_base64_across_chunks():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+
+    body = DecryptionStreamingBodyWrapper(
+        streaming_body=io.BytesIO(base64.b64encode(data_key.encrypt(plaintext))),
+        data_key=data_key,
+        base64_encoded=True,
+        chunk_size=7,
+    )
+
+    assert plaintext == b"".join(body.iter_chunks(13))
+
+
+def test_decryption_streaming_body_iter_lines_and_readinto():
+    data_key = _data_key()
+    plaintext = b"foo\nbar\n4711"
+
+    body = DecryptionStreamingBodyWrapper(streaming_body=_encrypted_body(data_key, plaintext), data_key=data_key)
+
+    assert [b"foo", b"bar", b"4711"] == list(body.iter_lines(chunk_size=2))
+
+    body = DecryptionStreamingBodyWrapper(streaming_body=_encrypted_body(data_key, plaintext), data_key=data_key)
+    buffer = bytearray(5)
+
+    assert 5 == body.readinto(buffer)
+    assert b"foo\nb" == buffer
+
+
+def test_decryption_streaming_body_checks_tag_at_end_of_stream():
+    data_key = _data_key()
+    ciphertext = bytearray(data_key.encrypt(b"foo bar 4711"))
+    ciphertext[0] ^= 1
+
+    body = DecryptionStreamingBodyWrapper(
+        streaming_body=io.BytesIO(ciphertext),
+        data_key=data_key,
+    )
+
+    with pytest.raises(InvalidTag):
+        body.read()
+
+
+def test_decryption_streaming_body_readinto_decrypts_whole_body():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(1000)
+
+    body = DecryptionStreamingBodyWrapper(streaming_body=_encrypted_body(data_key, plaintext), data_key=data_key)
+    buffer = bytearray(len(plaintext) + 10)
+
+    assert len(plaintext) == body.readinto(buffer)
+    assert plaintext == buffer[: len(plaintext)]
+    assert 0 == body.readinto(buffer)
+
+
+def test_encryption_streaming_body_peak_memory_is_about_one_payload():
+    data_key = _data_key()
+    plaintext = secrets.token_bytes(4 * 1024 * 1024)
+
+    tracemalloc.start()
+    try:
+        body = EncryptionStreamingBody(body=plaintext, data_key=data_key)
+        encrypted = body.read()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert data_key.decrypt(encrypted) == plaintext
+    assert peak < 1.5 * len(plaintext)